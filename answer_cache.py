@@ -0,0 +1,168 @@
+"""
+Semantic answer cache: reuses generated answers for paraphrased questions that retrieve the same chunks.
+"""
+import copy
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+import numpy as np
+from llm_qa import ERROR_ANSWER
+import config
+
+
+class SemanticAnswerCache:
+    """Stores answers by question embedding; a hit needs cosine >= threshold and the same retrieved chunk ids."""
+
+    def __init__(self, threshold: float = config.ANSWER_CACHE_THRESHOLD,
+                 capacity: int = config.ANSWER_CACHE_SIZE) -> None:
+        self.threshold: float = threshold
+        self.capacity: int = capacity
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[Tuple[int, ...]] = []
+        self._results: List[Dict[str, Any]] = []
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._lock = threading.Lock()
+        self.index_version: Optional[Hashable] = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.lookup_ms: float = 0.0
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+        with self._lock:
+            self._vectors = None
+            self._keys = []
+            self._results = []
+
+    def _sync_version(self, index_version: Hashable) -> None:
+        """Invalidate all entries once the index they were answered from has changed."""
+        if index_version != self.index_version:
+            self._vectors = None
+            self._keys = []
+            self._results = []
+            self.index_version = index_version
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, embedding: List[float], chunk_ids: Tuple[int, ...],
+            index_version: Hashable) -> Optional[Dict[str, Any]]:
+        """Return a copy of the stored result for a similar question over the same chunks, or None."""
+        start = time.perf_counter()
+        with self._lock:
+            self._sync_version(index_version)
+            result = None
+            if self._keys:
+                similarities = self._vectors[:len(self._keys)] @ self._normalize(embedding)
+                for slot in np.flatnonzero(similarities >= self.threshold):
+                    if self._keys[slot] == chunk_ids:
+                        self._last_used[slot] = time.monotonic()
+                        result = copy.deepcopy(self._results[slot])
+                        break
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.lookup_ms += (time.perf_counter() - start) * 1000
+        return result
+
+    def put(self, embedding: List[float], chunk_ids: Tuple[int, ...], result: Dict[str, Any],
+            index_version: Hashable) -> None:
+        """Store a result, evicting the least recently used entry when full."""
+        if self.capacity <= 0:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._sync_version(index_version)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+            if len(self._keys) < self.capacity:
+                slot = len(self._keys)
+                self._keys.append(chunk_ids)
+                self._results.append(copy.deepcopy(result))
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._keys[slot] = chunk_ids
+                self._results[slot] = copy.deepcopy(result)
+            self._vectors[slot] = vector
+            self._last_used[slot] = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit/miss counts, hit rate and mean lookup time."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._keys),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'mean_lookup_ms': self.lookup_ms / lookups if lookups else 0.0,
+        }
+
+
+class CachedQA:
+    """Puts a semantic answer cache in front of a QA system's answer calls."""
+
+    def __init__(self, qa_system: Any, vector_store: Any,
+                 cache: Optional[SemanticAnswerCache] = None) -> None:
+        self.qa_system = qa_system
+        self.vector_store = vector_store
+        self.cache = cache or SemanticAnswerCache()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.qa_system, name)
+
+    def _cache_key(self, query: str, search_results: List[Dict[str, Any]]) -> Optional[Tuple[Any, ...]]:
+        """Query embedding, retrieved chunk ids and index version, or None if results lack chunk ids."""
+        chunk_ids = [result['chunk'].get('chunk_id') for result in search_results]
+        if not chunk_ids or None in chunk_ids:
+            return None
+        # The search just embedded this query, so this is a cache hit in the vector store.
+        return self.vector_store.embed_query(query), tuple(sorted(chunk_ids)), self.vector_store.index_version
+
+    def generate_answer_with_citations(self, query: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a cached answer for an equivalent question, or generate and store one."""
+        key = self._cache_key(query, search_results)
+        if key is not None:
+            cached = self.cache.get(*key)
+            if cached is not None:
+                return dict(cached, cached=True)
+
+        result = self.qa_system.generate_answer_with_citations(query, search_results)
+        if key is not None and result['answer'] != ERROR_ANSWER:
+            self.cache.put(key[0], key[1], result, key[2])
+        return result
+
+    def stream_answer_with_citations(self, query: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Stream a fresh answer, or replay a cached one as a single piece."""
+        key = self._cache_key(query, search_results)
+        if key is not None:
+            cached = self.cache.get(*key)
+            if cached is not None:
+                return {
+                    'answer_stream': iter([cached.pop('answer')]),
+                    'cached': True,
+                    **cached
+                }
+
+        result = self.qa_system.stream_answer_with_citations(query, search_results)
+        if key is not None:
+            stored = {name: value for name, value in result.items() if name != 'answer_stream'}
+            result['answer_stream'] = self._store_when_done(result['answer_stream'], stored, key)
+        return result
+
+    def _store_when_done(self, stream: Iterator[str], stored: Dict[str, Any],
+                         key: Tuple[Any, ...]) -> Iterator[str]:
+        """Pass the stream through and cache the full answer once it completes."""
+        pieces: List[str] = []
+        for piece in stream:
+            pieces.append(piece)
+            yield piece
+        answer = ''.join(pieces).strip()
+        if answer and ERROR_ANSWER not in answer:
+            self.cache.put(key[0], key[1], dict(stored, answer=answer), key[2])
+
+    def answer_cache_stats(self) -> Dict[str, Any]:
+        """Return hit rate and lookup time of the answer cache."""
+        return self.cache.stats()
@@ -0,0 +1,233 @@
+"""
+Headless asyncio HTTP API with /search, /ask and streaming /ask/stream endpoints.
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+from aiohttp import web
+from app_resources import SharedResources
+import config
+
+SEARCH_FIELDS = ('k', 'mode', 'types', 'pages', 'documents')
+SEARCH_MODES = ('dense', 'hybrid')
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_names(value: Any) -> bool:
+    return isinstance(value, str) or (isinstance(value, list) and all(isinstance(name, str) for name in value))
+
+
+def option_error(options: Dict[str, Any]) -> Optional[str]:
+    """Message for the first search option with a wrong type or value, or None when all are valid."""
+    if 'k' in options and not (_is_int(options['k']) and options['k'] >= 1):
+        return "'k' must be a positive integer"
+    if 'mode' in options and options['mode'] not in SEARCH_MODES:
+        return f"'mode' must be one of {', '.join(SEARCH_MODES)}"
+    for name in ('types', 'documents'):
+        if name in options and not _is_names(options[name]):
+            return f"'{name}' must be a string or a list of strings"
+    if 'pages' in options:
+        pages = options['pages']
+        if not (isinstance(pages, list) and len(pages) == 2 and all(_is_int(page) for page in pages)
+                and pages[0] <= pages[1]):
+            return "'pages' must be a [first, last] pair of page numbers"
+    return None
+
+
+def _bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=json.dumps({'error': message}), content_type='application/json')
+
+
+class AdmissionController:
+    """Caps in-flight requests; callers over the limit are turned away instead of queued."""
+
+    def __init__(self, max_pending: int) -> None:
+        self.max_pending: int = max_pending
+        self.in_flight: int = 0
+        self.admitted: int = 0
+        self.rejected: int = 0
+        self.abandoned: int = 0
+
+    def try_acquire(self) -> bool:
+        # Only touched from the event loop thread, so no lock is needed.
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def hold_until(self, work: asyncio.Future) -> None:
+        """Keep a slot taken until abandoned executor work finishes; a timeout cannot stop its thread."""
+        self.in_flight += 1
+        self.abandoned += 1
+        work.add_done_callback(lambda _: self.release())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': self.in_flight,
+            'max_pending': self.max_pending,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'abandoned': self.abandoned,
+        }
+
+
+class QueryService:
+    """Runs search and generation on a bounded thread pool behind admission control."""
+
+    def __init__(self, resources: Optional[SharedResources] = None,
+                 workers: int = config.API_WORKERS,
+                 max_pending: int = config.API_MAX_PENDING,
+                 timeout: float = config.API_TIMEOUT) -> None:
+        self.resources = resources or SharedResources()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-worker')
+        self.admission = AdmissionController(max_pending)
+        self.timeout: float = timeout
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run blocking model work on the executor so the event loop keeps accepting requests."""
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+        try:
+            # Shielded so a timeout leaves the future to track the thread that is still running.
+            return await asyncio.wait_for(asyncio.shield(work), self.timeout)
+        except asyncio.TimeoutError:
+            self.admission.hold_until(work)
+            raise
+
+    async def _parse(self, request: web.Request) -> Dict[str, Any]:
+        """Validate the JSON body and return the query plus search options."""
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise _bad_request('Body must be JSON')
+        query = body.get('query') if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise _bad_request("'query' is required")
+        options = {name: body[name] for name in SEARCH_FIELDS if body.get(name) is not None}
+        error = option_error(options)
+        if error:
+            raise _bad_request(error)
+        if 'pages' in options:
+            options['pages'] = tuple(options['pages'])
+        return {'query': query[:config.MAX_QUERY_LENGTH], 'options': options}
+
+    def _check_ready(self) -> None:
+        if self.resources.error:
+            raise web.HTTPServiceUnavailable(text=json.dumps({'error': self.resources.error}),
+                                             content_type='application/json')
+        if not self.resources.search_ready:
+            raise web.HTTPServiceUnavailable(text=json.dumps({'error': 'Index is still loading',
+                                                              'status': self.resources.status}),
+                                             content_type='application/json', headers={'Retry-After': '5'})
+
+    @web.middleware
+    async def admission_middleware(self, request: web.Request, handler: Callable) -> web.StreamResponse:
+        """Reject model requests with 503 once too many are in flight."""
+        if request.path == '/health':
+            return await handler(request)
+        if not self.admission.try_acquire():
+            return web.json_response({'error': 'Server busy, retry shortly'}, status=503,
+                                     headers={'Retry-After': '1'})
+        try:
+            return await handler(request)
+        except asyncio.TimeoutError:
+            return web.json_response({'error': 'Request timed out'}, status=504)
+        finally:
+            self.admission.release()
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': self.resources.status,
+            'search_ready': self.resources.search_ready,
+            'ready': self.resources.ready,
+            'admission': self.admission.stats(),
+        })
+
+    async def search(self, request: web.Request) -> web.Response:
+        parsed = await self._parse(request)
+        self._check_ready()
+        start = time.perf_counter()
+        results = await self._run(self.resources.search, parsed['query'], **parsed['options'])
+        return web.json_response({'results': results, 'elapsed_ms': (time.perf_counter() - start) * 1000})
+
+    async def ask(self, request: web.Request) -> web.Response:
+        parsed = await self._parse(request)
+        self._check_ready()
+        start = time.perf_counter()
+        results = await self._run(self.resources.search, parsed['query'], **parsed['options'])
+        answer = await self._run(self.resources.answerer.generate_answer_with_citations, parsed['query'], results)
+        answer['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        return web.json_response(answer)
+
+    async def ask_stream(self, request: web.Request) -> web.StreamResponse:
+        """Stream newline-delimited JSON: citations first, then answer pieces, then a done or error marker."""
+        parsed = await self._parse(request)
+        self._check_ready()
+        results = await self._run(self.resources.search, parsed['query'], **parsed['options'])
+        streamed = await self._run(self.resources.answerer.stream_answer_with_citations, parsed['query'], results)
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        await response.write(self._line({'citations': streamed['citations'],
+                                         'context_used': streamed['context_used']}))
+        pieces: Iterator[str] = streamed['answer_stream']
+        done = object()
+        try:
+            while True:
+                piece = await self._run(next, pieces, done)
+                if piece is done:
+                    break
+                await response.write(self._line({'token': piece}))
+        except asyncio.TimeoutError:
+            # Headers are already sent, so the timeout is reported in the stream instead of as a 504.
+            await response.write(self._line({'error': 'Request timed out'}))
+            await response.write_eof()
+            return response
+        await response.write(self._line({'done': True}))
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _line(payload: Dict[str, Any]) -> bytes:
+        return (json.dumps(payload) + "\n").encode('utf-8')
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.admission_middleware])
+        app.router.add_get('/health', self.health)
+        app.router.add_post('/search', self.search)
+        app.router.add_post('/ask', self.ask)
+        app.router.add_post('/ask/stream', self.ask_stream)
+        app.on_shutdown.append(self._shutdown)
+        return app
+
+    async def _shutdown(self, app: web.Application) -> None:
+        self.executor.shutdown(wait=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve search and question answering over HTTP")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS,
+                        help="threads running search and generation")
+    parser.add_argument("--max-pending", type=int, default=config.API_MAX_PENDING,
+                        help="in-flight requests before new ones get 503")
+    args = parser.parse_args()
+
+    service = QueryService(workers=args.workers, max_pending=args.max_pending)
+    web.run_app(service.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
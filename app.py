@@ -2,10 +2,8 @@
 Streamlit web application for the Multi-Modal RAG QA System.
 """
 import streamlit as st
-import os
 import json
-from vector_store import VectorStore
-from llm_qa import LLMQA, SimpleQA
+from app_resources import SharedResources
 import config
 
 st.set_page_config(
@@ -14,47 +12,37 @@ st.set_page_config(
     layout="wide"
 )
 
-if 'vector_store' not in st.session_state:
-    st.session_state.vector_store = None
-if 'qa_system' not in st.session_state:
-    st.session_state.qa_system = None
-if 'loaded' not in st.session_state:
-    st.session_state.loaded = False
+
+@st.cache_resource(show_spinner=False)
+def get_resources() -> SharedResources:
+    """Models and indexes load once per server process and are shared by every session."""
+    return SharedResources()
+
+
+resources = get_resources()
+
+# Only the conversation is per session.
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'query_count' not in st.session_state:
     st.session_state.query_count = 0
 
-if not st.session_state.loaded:
-    faiss_file = os.path.join(config.VECTOR_STORE_PATH, "index.faiss")
-    if os.path.exists(faiss_file) or os.path.exists(f"{config.VECTOR_STORE_PATH}.faiss"):
-        with st.spinner("Loading pre-processed data..."):
-            try:
-                vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
-                vector_store.load(config.VECTOR_STORE_PATH)
-                st.session_state.vector_store = vector_store
-                
-                try:
-                    qa_system = LLMQA(model_name=config.LLM_MODEL)
-                    st.session_state.qa_system = qa_system
-                except:
-                    st.warning("Using simple QA (LLM model failed to load)")
-                    st.session_state.qa_system = SimpleQA()
-                
-                st.session_state.loaded = True
-                
-            except Exception as e:
-                st.error(f"Error loading data: {e}")
-                st.session_state.loaded = False
-
 st.title("Multi-Modal RAG System")
 st.markdown("*Intelligent document Q&A powered by AI*")
 
 with st.sidebar:
     st.header("System Status")
 
-    if st.session_state.loaded:
-        st.success("System Ready")
+    if resources.search_ready:
+        if resources.ready:
+            st.success("System Ready")
+        else:
+            st.info(f"Warming up: {resources.status}...")
+            st.caption("Answers show matching passages until the LLM is ready.")
+            if st.button("Refresh status"):
+                st.rerun()
+        for warning in resources.warnings:
+            st.warning(warning)
 
         st.markdown("---")
         st.subheader("Try These Questions")
@@ -66,11 +54,12 @@ with st.sidebar:
         for q in sample_qs:
             st.caption(f"• {q}")
 
-        if st.session_state.vector_store:
-            total = len(st.session_state.vector_store.chunks)
-            text_count = sum(1 for c in st.session_state.vector_store.chunks if c['type'] == 'text')
-            table_count = sum(1 for c in st.session_state.vector_store.chunks if c['type'] == 'table')
-            image_count = sum(1 for c in st.session_state.vector_store.chunks if c['type'] == 'image')
+        if resources.vector_store:
+            type_counts = resources.vector_store.chunk_type_counts()
+            total = sum(type_counts.values())
+            text_count = type_counts.get('text', 0)
+            table_count = type_counts.get('table', 0)
+            image_count = type_counts.get('image', 0)
 
             st.markdown("---")
             st.subheader("Document Statistics")
@@ -80,9 +69,33 @@ with st.sidebar:
             col2.metric("Tables", table_count)
             col3.metric("Images", image_count)
 
+            st.markdown("---")
+            st.subheader("Search Filters")
+            st.session_state.filter_types = st.multiselect(
+                "Chunk types", sorted(type_counts), help="Leave empty to search every type"
+            ) or None
+            st.session_state.filter_pages = None
+            if st.checkbox("Limit page range"):
+                col1, col2 = st.columns(2)
+                first_page = col1.number_input("From page", min_value=1, value=1, step=1)
+                last_page = col2.number_input("To page", min_value=1, value=max(1, int(first_page)), step=1)
+                st.session_state.filter_pages = (int(first_page), int(last_page))
+
         st.markdown("---")
         st.subheader("Session Info")
         st.caption(f"Queries: {st.session_state.query_count}")
+        if resources.vector_store:
+            search_stats = resources.vector_store.cache_stats()['search']
+            st.caption(f"Search cache: {search_stats['hit_rate']:.0%} hit rate, "
+                       f"{search_stats['seconds_saved']:.2f}s saved")
+        if hasattr(resources.answerer, 'queue_stats'):
+            queue_stats = resources.answerer.queue_stats()
+            st.caption(f"Generation queue: depth {queue_stats['queue_depth']}, "
+                       f"mean batch {queue_stats['mean_batch_size']:.1f}")
+        if hasattr(resources.answerer, 'answer_cache_stats'):
+            answer_stats = resources.answerer.answer_cache_stats()
+            st.caption(f"Answer cache: {answer_stats['hit_rate']:.0%} hit rate, "
+                       f"{answer_stats['mean_lookup_ms']:.2f} ms per lookup")
 
         st.markdown("---")
         st.subheader("Model Info")
@@ -106,7 +119,14 @@ with st.sidebar:
                     "application/json"
                 )
 
+    elif not resources.missing_data and not resources.error:
+        st.info(f"Starting up: {resources.status}...")
+        if st.button("Refresh status"):
+            st.rerun()
+
     else:
+        if resources.error:
+            st.error(f"Error loading data: {resources.error}")
         st.error("Data Not Loaded")
         st.markdown("---")
         st.subheader("Setup Required")
@@ -123,15 +143,14 @@ python process_document.py
 python create_embeddings.py
 ```
 
-**Step 3: Restart App**
-```bash
-streamlit run app.py
-```
+**Step 3: Refresh this page**
 """)
+        if st.button("Check again"):
+            st.rerun()
         
 
 # Main chat interface
-if st.session_state.loaded:
+if resources.search_ready:
     st.markdown("---")
 
     if not st.session_state.chat_history:
@@ -144,8 +163,9 @@ if st.session_state.loaded:
                 with st.expander(f"View {len(message['citations'])} Citations"):
                     for i, cite in enumerate(message["citations"], 1):
                         score_pct = (1 - cite['relevance_score']) * 100
+                        label = f"{cite['document']} - {cite['source']}" if cite.get('document') else cite['source']
                         st.markdown(
-                            f"**[{i}] {cite['source']}**  \n"
+                            f"**[{i}] {label}**  \n"
                             f"Type: `{cite['type']}` | Relevance: {score_pct:.1f}%"
                         )
 
@@ -159,31 +179,45 @@ if st.session_state.loaded:
             st.markdown(query)
         
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing document and generating response..."):
-                search_results = st.session_state.vector_store.search(query, k=5)
-                
-                result = st.session_state.qa_system.generate_answer_with_citations(
+            with st.spinner("Searching the document..."):
+                search_results = resources.search(
+                    query,
+                    types=st.session_state.get('filter_types'),
+                    pages=st.session_state.get('filter_pages'),
+                )
+
+                result = resources.answerer.stream_answer_with_citations(
                     query, search_results
                 )
-                
-                st.markdown(result['answer'])
-                
-                with st.expander("View Citations"):
-                    for cite in result['citations']:
-                        st.markdown(
-                            f"**{cite['source']}** | "
-                            f"Type: {cite['type']} | "
-                            f"Relevance: {cite['relevance_score']:.3f}"
-                        )
-                
-                st.session_state.chat_history.append({
-                    "role": "assistant",
-                    "content": result['answer'],
-                    "citations": result['citations']
-                })
 
-else:
+            # Citations are known before generation starts, so render them while the answer streams in.
+            answer_placeholder = st.empty()
+            with st.expander("View Citations"):
+                for cite in result['citations']:
+                    label = f"{cite['document']} - {cite['source']}" if cite.get('document') else cite['source']
+                    st.markdown(
+                        f"**{label}** | "
+                        f"Type: {cite['type']} | "
+                        f"Relevance: {cite['relevance_score']:.3f}"
+                    )
+
+            answer = ""
+            for piece in result['answer_stream']:
+                answer += piece
+                answer_placeholder.markdown(answer + "▌")
+            answer = answer.strip()
+            answer_placeholder.markdown(answer)
+
+            st.session_state.chat_history.append({
+                "role": "assistant",
+                "content": answer,
+                "citations": result['citations']
+            })
+
+elif resources.missing_data or resources.error:
     st.info("Please follow the setup steps in the sidebar")
+else:
+    st.info("Loading the document index, this takes a few seconds on first start...")
 
 st.markdown("---")
 st.markdown(
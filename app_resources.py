@@ -0,0 +1,108 @@
+"""
+Process-wide models and indexes for the Streamlit app, loaded once in a background thread.
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional, Union
+from vector_store import VectorStore
+from corpus import ShardedVectorStore
+from llm_qa import LLMQA, SimpleQA
+from answer_cache import CachedQA
+from reranker import CrossEncoderReranker
+import config
+
+
+def index_exists() -> bool:
+    """True when a single-document index or a corpus manifest has been built."""
+    faiss_file = os.path.join(config.VECTOR_STORE_PATH, "index.faiss")
+    return (os.path.exists(config.CORPUS_MANIFEST_PATH) or os.path.exists(faiss_file)
+            or os.path.exists(f"{config.VECTOR_STORE_PATH}.faiss"))
+
+
+class SharedResources:
+    """Vector store, re-ranker and QA system shared by every session of one server process."""
+
+    def __init__(self) -> None:
+        self.vector_store: Optional[Union[VectorStore, ShardedVectorStore]] = None
+        self.reranker: Optional[CrossEncoderReranker] = None
+        self.qa_system: Optional[Any] = None
+        self.fallback_qa = SimpleQA()
+        self.status: str = "Starting"
+        self.error: Optional[str] = None
+        self.warnings: List[str] = []
+        self.search_ready: bool = False
+        self.ready: bool = False
+        # Search and re-ranking share one set of models; LLMQA locks each generated batch itself.
+        self.inference_lock = threading.Lock()
+
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_if_indexed()
+
+    def _start_if_indexed(self) -> bool:
+        """Start the background loader once an index exists; True when it has been started."""
+        if self._thread is None and index_exists():
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._load, name='resource-warmup', daemon=True)
+                    self._thread.start()
+        return self._thread is not None
+
+    @property
+    def missing_data(self) -> bool:
+        """Re-checked on every access, so an index built after the server started is picked up without a restart."""
+        return not self._start_if_indexed()
+
+    def _load(self) -> None:
+        """Load the index first so search works early, then the re-ranker and the LLM."""
+        try:
+            self.status = "Loading embedding model and index"
+            if os.path.exists(config.CORPUS_MANIFEST_PATH):
+                vector_store = ShardedVectorStore(model_name=config.EMBEDDING_MODEL)
+                vector_store.load(mmap=config.MMAP_INDEX)
+            else:
+                vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
+                vector_store.load(config.VECTOR_STORE_PATH, mmap=config.MMAP_INDEX)
+            vector_store.embed_query("warm up")
+            self.vector_store = vector_store
+            self.search_ready = True
+
+            if config.RERANK_ENABLED:
+                self.status = "Loading re-ranker"
+                try:
+                    self.reranker = CrossEncoderReranker()
+                except Exception:
+                    self.warnings.append("Re-ranker failed to load; using search order")
+
+            self.status = "Loading LLM"
+            try:
+                qa_system = LLMQA(model_name=config.LLM_MODEL)
+                self.status = "Warming up LLM"
+                qa_system.generate_batch(["Answer: warm up"])
+                if config.ANSWER_CACHE_ENABLED:
+                    qa_system = CachedQA(qa_system, vector_store)
+            except Exception:
+                self.warnings.append("Using simple QA (LLM model failed to load)")
+                qa_system = self.fallback_qa
+            self.qa_system = qa_system
+
+            self.ready = True
+            self.status = "Ready"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "Failed"
+
+    @property
+    def answerer(self) -> Any:
+        """The LLM once it is warm; snippet answers from SimpleQA until then."""
+        return self.qa_system if self.ready else self.fallback_qa
+
+    def search(self, query: str, k: int = config.DEFAULT_SEARCH_RESULTS, mode: Optional[str] = None,
+               **filters: Any) -> List[Dict[str, Any]]:
+        """Search, and re-rank when enabled, under the shared inference lock."""
+        k = max(1, min(k, config.MAX_SEARCH_RESULTS))
+        with self.inference_lock:
+            if self.reranker:
+                results = self.vector_store.search(query, k=max(k, config.RERANK_TOP_N), mode=mode, **filters)
+                return self.reranker.rerank(query, results, top_k=k)
+            return self.vector_store.search(query, k=k, mode=mode, **filters)
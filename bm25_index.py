@@ -0,0 +1,128 @@
+"""
+Inverted BM25 index over chunk text, aligned with FAISS positions, for lexical and hybrid search.
+"""
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from utils import replace_atomically
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens that keep numbers such as 2024, 5.2 and 1,234 intact."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over a CSR inverted index; document i is the chunk at FAISS position i."""
+
+    def __init__(self, vocabulary: Dict[str, int], term_offsets: np.ndarray, postings: np.ndarray,
+                 term_freqs: np.ndarray, doc_lengths: np.ndarray, k1: float = 1.5, b: float = 0.75) -> None:
+        self.vocabulary: Dict[str, int] = vocabulary
+        self.term_offsets = term_offsets
+        self.postings = postings
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1: float = k1
+        self.b: float = b
+        count = len(doc_lengths)
+        self.avg_length: float = float(np.mean(doc_lengths)) if count else 0.0
+        doc_freqs = np.diff(term_offsets).astype(np.float64)
+        self.idf = np.log(1.0 + (count - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        self.length_norm = k1 * (1.0 - b + b * np.asarray(doc_lengths) / max(self.avg_length, 1e-9))
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.5, b: float = 0.75) -> 'BM25Index':
+        """Tokenize texts and build the inverted index."""
+        vocabulary: Dict[str, int] = {}
+        term_docs: List[List[Tuple[int, int]]] = []
+        doc_lengths: List[int] = []
+
+        for position, text in enumerate(texts):
+            counts: Dict[int, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                term_id = vocabulary.setdefault(token, len(vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            for term_id, freq in counts.items():
+                if term_id == len(term_docs):
+                    term_docs.append([])
+                term_docs[term_id].append((position, freq))
+            doc_lengths.append(len(tokens))
+
+        term_offsets = np.zeros(len(term_docs) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([len(docs) for docs in term_docs])
+        postings = np.fromiter((position for docs in term_docs for position, _ in docs),
+                               dtype=np.int32, count=int(term_offsets[-1]))
+        term_freqs = np.fromiter((freq for docs in term_docs for _, freq in docs),
+                                 dtype=np.float32, count=int(term_offsets[-1]))
+        return cls(vocabulary, term_offsets, postings, term_freqs,
+                   np.asarray(doc_lengths, dtype=np.float32), k1, b)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def search(self, query: str, k: int = 10, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return the top-k (position, bm25 score) pairs for a query, optionally only among allowed positions."""
+        if len(self) == 0:
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+            docs = self.postings[start:end]
+            freqs = self.term_freqs[start:end]
+            scores[docs] += self.idf[term_id] * freqs * (self.k1 + 1.0) / (freqs + self.length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if allowed is not None:
+            matched = np.intersect1d(matched, allowed, assume_unique=True)
+        if len(matched) == 0:
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(int(position), float(scores[position])) for position in top]
+
+    def save(self, directory: str) -> None:
+        """Write the index arrays as .npy files plus the vocabulary, replacing rather than overwriting old files."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ('term_offsets', 'postings', 'term_freqs', 'doc_lengths'):
+            with replace_atomically(os.path.join(directory, f"{name}.npy")) as tmp_path:
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, np.asarray(getattr(self, name)))
+        with replace_atomically(os.path.join(directory, 'vocabulary.json')) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'k1': self.k1, 'b': self.b, 'vocabulary': self.vocabulary}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'BM25Index':
+        """Open a saved index; postings are memory-mapped when mmap is set."""
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ('term_offsets', 'postings', 'term_freqs', 'doc_lengths')
+        }
+        with open(os.path.join(directory, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(meta['vocabulary'], arrays['term_offsets'], arrays['postings'],
+                   arrays['term_freqs'], arrays['doc_lengths'], meta['k1'], meta['b'])
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, 'vocabulary.json'))
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked position lists by summing 1 / (rrf_k + rank)."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking, 1):
+            fused[position] = fused.get(position, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
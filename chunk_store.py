@@ -0,0 +1,280 @@
+"""
+Compact, columnar chunk storage with memory-mapped loading.
+"""
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from utils import replace_atomically
+
+CORE_FIELDS = ('content', 'page', 'type', 'source', 'document', 'chunk_id', 'content_hash')
+DEFAULT_TYPES: List[str] = ['text', 'table', 'image']
+COLUMNS = ('text', 'text_offsets', 'extras', 'extras_offsets', 'page', 'type_code',
+           'source_code', 'document_code', 'chunk_id', 'content_hash', 'id_to_position')
+
+
+def _pack_strings(values: List[bytes]) -> Dict[str, np.ndarray]:
+    """Concatenate byte strings into one uint8 blob plus a uint64 offsets array."""
+    offsets = np.zeros(len(values) + 1, dtype=np.uint64)
+    if values:
+        offsets[1:] = np.cumsum([len(value) for value in values], dtype=np.uint64)
+    blob = np.frombuffer(b''.join(values), dtype=np.uint8)
+    return {'blob': blob, 'offsets': offsets}
+
+
+class _ChunkEncoder:
+    """Encodes chunk dicts into column values, assigning type, source and document codes as it goes."""
+
+    def __init__(self) -> None:
+        self.type_names: List[str] = list(DEFAULT_TYPES)
+        self.sources: List[str] = []
+        self.documents: List[str] = []
+        self.source_codes: Dict[str, int] = {}
+        self.document_codes: Dict[str, int] = {}
+
+    def encode(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Text and extras byte strings plus the typed per-chunk columns for a run of chunks."""
+        count = len(chunks)
+        columns: Dict[str, Any] = {
+            'text': [],
+            'extras': [],
+            'page': np.zeros(count, dtype=np.int32),
+            'type_code': np.zeros(count, dtype=np.uint8),
+            'source_code': np.zeros(count, dtype=np.int32),
+            'document_code': np.full(count, -1, dtype=np.int32),
+            'chunk_id': np.zeros(count, dtype=np.int64),
+            'content_hash': np.zeros((count, 32), dtype=np.uint8),
+        }
+        for i, chunk in enumerate(chunks):
+            columns['text'].append(chunk['content'].encode('utf-8'))
+            columns['page'][i] = chunk['page']
+
+            if chunk['type'] not in self.type_names:
+                self.type_names.append(chunk['type'])
+            columns['type_code'][i] = self.type_names.index(chunk['type'])
+
+            source = chunk['source']
+            if source not in self.source_codes:
+                self.source_codes[source] = len(self.sources)
+                self.sources.append(source)
+            columns['source_code'][i] = self.source_codes[source]
+
+            document = chunk.get('document')
+            if document is not None:
+                if document not in self.document_codes:
+                    self.document_codes[document] = len(self.documents)
+                    self.documents.append(document)
+                columns['document_code'][i] = self.document_codes[document]
+
+            columns['chunk_id'][i] = chunk.get('chunk_id', i)
+            if chunk.get('content_hash'):
+                columns['content_hash'][i] = np.frombuffer(bytes.fromhex(chunk['content_hash']), dtype=np.uint8)
+
+            extra = {key: value for key, value in chunk.items() if key not in CORE_FIELDS}
+            columns['extras'].append(json.dumps(extra, ensure_ascii=False).encode('utf-8') if extra else b'')
+        return columns
+
+    def meta(self, type_code: np.ndarray) -> Dict[str, Any]:
+        counts = np.bincount(type_code, minlength=len(self.type_names))
+        return {
+            'count': len(type_code),
+            'type_names': self.type_names,
+            'type_counts': {name: int(counts[code]) for code, name in enumerate(self.type_names)},
+            'sources': self.sources,
+            'documents': self.documents,
+        }
+
+
+def _save_column(directory: str, name: str, column: np.ndarray) -> None:
+    with replace_atomically(os.path.join(directory, f"{name}.npy")) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(column))
+
+
+def _save_meta(directory: str, meta: Dict[str, Any]) -> None:
+    with replace_atomically(os.path.join(directory, 'meta.json')) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+
+def _id_to_position(chunk_id: np.ndarray) -> np.ndarray:
+    id_to_position = np.full(int(chunk_id.max()) + 1 if len(chunk_id) else 0, -1, dtype=np.int64)
+    id_to_position[chunk_id] = np.arange(len(chunk_id), dtype=np.int64)
+    return id_to_position
+
+
+class ColumnarChunkStore:
+    """Chunks stored as one text blob with offsets and typed per-chunk columns, in FAISS position order."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], meta: Dict[str, Any],
+                 directory: Optional[str] = None) -> None:
+        self.columns: Dict[str, np.ndarray] = columns
+        self.meta: Dict[str, Any] = meta
+        # Set when the columns were loaded from disk, so a save over the same files can be skipped.
+        self.directory: Optional[str] = directory
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> 'ColumnarChunkStore':
+        """Build a store from chunk dicts; list order becomes position order."""
+        encoder = _ChunkEncoder()
+        encoded = encoder.encode(chunks)
+        text_columns = _pack_strings(encoded.pop('text'))
+        extra_columns = _pack_strings(encoded.pop('extras'))
+        columns = dict(encoded, text=text_columns['blob'], text_offsets=text_columns['offsets'],
+                       extras=extra_columns['blob'], extras_offsets=extra_columns['offsets'],
+                       id_to_position=_id_to_position(encoded['chunk_id']))
+        return cls(columns, encoder.meta(encoded['type_code']))
+
+    def save(self, directory: str) -> None:
+        """Write every column as a .npy file plus meta.json, replacing rather than overwriting old files."""
+        os.makedirs(directory, exist_ok=True)
+        for name in COLUMNS:
+            _save_column(directory, name, self.columns[name])
+        _save_meta(directory, self.meta)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'ColumnarChunkStore':
+        """Open a saved store; with mmap the columns stay on disk and are paged in on access."""
+        mmap_mode = 'r' if mmap else None
+        columns = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in COLUMNS
+        }
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(columns, meta, directory)
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, 'meta.json'))
+
+    def close(self) -> None:
+        """Drop the column arrays so memory-mapped files are unmapped; the store is empty afterwards."""
+        self.columns = {}
+        self.meta = dict(self.meta, count=0)
+
+    def __len__(self) -> int:
+        return self.meta['count']
+
+    def _string(self, blob: str, position: int) -> str:
+        offsets = self.columns[f"{blob}_offsets"]
+        start, end = int(offsets[position]), int(offsets[position + 1])
+        return self.columns[blob][start:end].tobytes().decode('utf-8')
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        """Materialize the chunk dict at a FAISS position."""
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(f"chunk position {position} out of range")
+
+        document_code = int(self.columns['document_code'][position])
+        chunk: Dict[str, Any] = {
+            'content': self._string('text', position),
+            'page': int(self.columns['page'][position]),
+            'type': self.meta['type_names'][int(self.columns['type_code'][position])],
+            'source': self.meta['sources'][int(self.columns['source_code'][position])],
+            'chunk_id': int(self.columns['chunk_id'][position]),
+            'content_hash': self.columns['content_hash'][position].tobytes().hex(),
+        }
+        if document_code >= 0:
+            chunk['document'] = self.meta['documents'][document_code]
+        extras = self._string('extras', position)
+        if extras:
+            chunk.update(json.loads(extras))
+        return chunk
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def position_of(self, chunk_id: int) -> int:
+        """Return the position of chunk_id, or -1 if it is not stored."""
+        id_to_position = self.columns['id_to_position']
+        if not 0 <= chunk_id < len(id_to_position):
+            return -1
+        return int(id_to_position[chunk_id])
+
+    def get(self, chunk_id: int) -> Optional[Dict[str, Any]]:
+        """Return the chunk with the given chunk_id in O(1), or None."""
+        position = self.position_of(chunk_id)
+        return self[position] if position >= 0 else None
+
+    @property
+    def type_counts(self) -> Dict[str, int]:
+        """Precomputed number of chunks per type."""
+        return dict(self.meta['type_counts'])
+
+    def document_chunk_ids(self) -> Dict[str, List[int]]:
+        """Group chunk ids by document without materializing chunk dicts."""
+        grouped: Dict[str, List[int]] = {}
+        document_code = np.asarray(self.columns['document_code'])
+        chunk_id = np.asarray(self.columns['chunk_id'])
+        for code, document in enumerate(self.meta['documents']):
+            grouped[document] = chunk_id[document_code == code].tolist()
+        return grouped
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Materialize every chunk as a dict, for in-place modification."""
+        return list(self)
+
+
+class ColumnarChunkWriter:
+    """Appends chunks to a columnar store on disk batch by batch.
+
+    Text and extras go straight to disk; only the small fixed-size columns stay in memory until close.
+    """
+
+    BLOBS = ('text', 'extras')
+
+    def __init__(self, directory: str) -> None:
+        self.directory: str = directory
+        os.makedirs(directory, exist_ok=True)
+        self.encoder = _ChunkEncoder()
+        self.parts: Dict[str, List[np.ndarray]] = {}
+        self.blob_files = {name: open(os.path.join(directory, f"{name}.bin"), 'wb') for name in self.BLOBS}
+        self.lengths: Dict[str, List[np.ndarray]] = {name: [] for name in self.BLOBS}
+
+    def append(self, chunks: List[Dict[str, Any]]) -> None:
+        """Encode a batch and write its text to disk."""
+        encoded = self.encoder.encode(chunks)
+        for name in self.BLOBS:
+            values = encoded.pop(name)
+            self.blob_files[name].write(b''.join(values))
+            self.lengths[name].append(np.asarray([len(value) for value in values], dtype=np.uint64))
+        for name, column in encoded.items():
+            self.parts.setdefault(name, []).append(column)
+
+    def _write_blob(self, name: str) -> None:
+        """Turn a raw blob file into its .npy column and offsets, copying in blocks."""
+        self.blob_files[name].close()
+        raw_path = os.path.join(self.directory, f"{name}.bin")
+        lengths = np.concatenate(self.lengths[name]) if self.lengths[name] else np.zeros(0, dtype=np.uint64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum(lengths, dtype=np.uint64)
+        _save_column(self.directory, f"{name}_offsets", offsets)
+
+        total = int(offsets[-1])
+        with replace_atomically(os.path.join(self.directory, f"{name}.npy")) as tmp_path:
+            blob = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(total,))
+            with open(raw_path, 'rb') as f:
+                position = 0
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    blob[position:position + len(block)] = np.frombuffer(block, dtype=np.uint8)
+                    position += len(block)
+            blob.flush()
+            del blob
+        os.remove(raw_path)
+
+    def close(self, mmap: bool = True) -> ColumnarChunkStore:
+        """Write the remaining columns and meta.json, then open the finished store."""
+        for name in self.BLOBS:
+            self._write_blob(name)
+        empty = self.encoder.encode([])
+        columns = {name: np.concatenate(self.parts[name]) if name in self.parts else empty[name]
+                   for name in empty if name not in self.BLOBS}
+        columns['id_to_position'] = _id_to_position(columns['chunk_id'])
+        for name, column in columns.items():
+            _save_column(self.directory, name, column)
+        _save_meta(self.directory, self.encoder.meta(columns['type_code']))
+        return ColumnarChunkStore.load(self.directory, mmap=mmap)
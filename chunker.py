@@ -0,0 +1,191 @@
+"""
+Layout-aware chunking: packs a page's lines into size-bounded chunks with overlap and bounding boxes,
+and splits detected tables into Markdown chunks that repeat the header row.
+
+Extraction emits 'page_lines' and 'table_rows' elements; chunk_elements turns them into chunks, so
+chunk sizes can change without extracting the PDF again.
+"""
+import textwrap
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import config
+
+BBox = Tuple[float, float, float, float]
+
+
+def _inside(bbox: BBox, areas: Sequence[BBox]) -> bool:
+    """True when the centre of bbox lies in one of the areas."""
+    x, y = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+    return any(area[0] <= x <= area[2] and area[1] <= y <= area[3] for area in areas)
+
+
+def page_lines(blocks: List[Dict[str, Any]], exclude: Sequence[BBox] = ()) -> List[Tuple[str, BBox]]:
+    """Text and bounding box of every non-empty line in a page's get_text("dict") blocks, in reading order,
+    leaving out lines inside the exclude areas (detected tables)."""
+    lines: List[Tuple[str, BBox]] = []
+    for block in blocks:
+        for line in block.get("lines", []):
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if text and not _inside(line["bbox"], exclude):
+                lines.append((text, tuple(line["bbox"])))
+    return lines
+
+
+def clean_rows(rows: List[List[Optional[str]]]) -> List[List[str]]:
+    """Table rows with None cells as empty strings, cell line breaks flattened and empty rows dropped."""
+    cleaned = [[" ".join((cell or "").split()) for cell in row] for row in rows]
+    return [row for row in cleaned if any(row)]
+
+
+def table_rows(rows: List[List[Optional[str]]]) -> Optional[List[List[str]]]:
+    """Cleaned rows of a detected table, or None when it has fewer than two rows or columns."""
+    rows = clean_rows(rows)
+    if len(rows) < 2 or max(len(row) for row in rows) < 2:
+        return None
+    return rows
+
+
+def markdown_row(row: List[str]) -> str:
+    return "| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |"
+
+
+def union_bbox(boxes: List[BBox]) -> List[float]:
+    """Smallest box containing all boxes, rounded to 0.1 pt."""
+    return [
+        round(min(box[0] for box in boxes), 1),
+        round(min(box[1] for box in boxes), 1),
+        round(max(box[2] for box in boxes), 1),
+        round(max(box[3] for box in boxes), 1),
+    ]
+
+
+class TextChunker:
+    """Packs whole lines into chunks of at most max_size characters, repeating up to overlap characters."""
+
+    def __init__(self, max_size: int = config.MAX_CHUNK_SIZE, min_size: int = config.MIN_CHUNK_SIZE,
+                 overlap: int = config.CHUNK_OVERLAP) -> None:
+        if not 0 <= min_size <= max_size or overlap >= max_size:
+            raise ValueError("Chunk sizes must satisfy 0 <= min_size <= max_size and overlap < max_size")
+        self.max_size: int = max_size
+        self.min_size: int = min_size
+        self.overlap: int = overlap
+
+    def _units(self, lines: List[Tuple[str, BBox]]) -> List[Tuple[str, BBox]]:
+        """Lines, with any line longer than max_size wrapped at word boundaries."""
+        units: List[Tuple[str, BBox]] = []
+        for text, bbox in lines:
+            if len(text) <= self.max_size:
+                units.append((text, bbox))
+            else:
+                units.extend((piece, bbox) for piece in textwrap.wrap(text, self.max_size))
+        return units
+
+    @staticmethod
+    def _size(units: List[Tuple[str, BBox]]) -> int:
+        return sum(len(text) for text, _ in units) + max(len(units) - 1, 0)
+
+    def _overlap_tail(self, units: List[Tuple[str, BBox]]) -> List[Tuple[str, BBox]]:
+        """Trailing lines of a finished chunk that fit in the overlap, never the whole chunk."""
+        tail: List[Tuple[str, BBox]] = []
+        for unit in reversed(units[1:]):
+            if self._size([unit] + tail) > self.overlap:
+                break
+            tail.insert(0, unit)
+        return tail
+
+    def split(self, lines: List[Tuple[str, BBox]]) -> List[List[Tuple[str, BBox]]]:
+        """Group lines into chunks in a single pass over the page."""
+        groups: List[List[Tuple[str, BBox]]] = []
+        current: List[Tuple[str, BBox]] = []
+        carried = 0
+        for unit in self._units(lines):
+            if current and self._size(current + [unit]) > self.max_size:
+                groups.append(current)
+                current = self._overlap_tail(current)
+                if self._size(current + [unit]) > self.max_size:
+                    current = []
+                carried = len(current)
+            current.append(unit)
+
+        fresh = current[carried:]
+        if fresh:
+            # A short remainder joins the previous chunk instead of becoming a chunk of its own,
+            # unless that would take the previous chunk past max_size.
+            if (groups and self._size(fresh) < self.min_size
+                    and self._size(groups[-1] + fresh) <= self.max_size):
+                groups[-1].extend(fresh)
+            else:
+                groups.append(current)
+        return groups
+
+    def chunk_page(self, blocks: List[Dict[str, Any]], page: int, document: Optional[str] = None,
+                   exclude: Sequence[BBox] = ()) -> List[Dict[str, Any]]:
+        """Text chunks with page and bounding-box metadata for one page's get_text("dict") blocks."""
+        return self.chunk_lines(page_lines(blocks, exclude), page, document)
+
+    def chunk_lines(self, lines: List[Tuple[str, BBox]], page: int,
+                    document: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Text chunks with page and bounding-box metadata for one page's lines."""
+        chunks: List[Dict[str, Any]] = []
+        for group in self.split(lines):
+            chunks.append({
+                'type': 'text',
+                'content': "\n".join(text for text, _ in group),
+                'page': page,
+                'source': f'Page {page}',
+                'document': document,
+                'bbox': union_bbox([bbox for _, bbox in group]),
+            })
+        return chunks
+
+    def split_table(self, rows: List[List[str]]) -> List[List[List[str]]]:
+        """Group table rows into pieces whose Markdown fits max_size, each starting with the header row."""
+        header, body = rows[0], rows[1:]
+        base = len(markdown_row(header)) + 1 + len(markdown_row(["---"] * len(header)))
+        pieces: List[List[List[str]]] = []
+        current: List[List[str]] = []
+        size = base
+        for row in body:
+            row_size = len(markdown_row(row)) + 1
+            if current and size + row_size > self.max_size:
+                pieces.append([header] + current)
+                current, size = [], base
+            current.append(row)
+            size += row_size
+        if current or not pieces:
+            pieces.append([header] + current)
+        return pieces
+
+    def chunk_table(self, rows: List[List[Optional[str]]], bbox: BBox, page: int,
+                    document: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Markdown chunks of a detected table, keeping its cells as structured rows."""
+        rows = table_rows(rows)
+        if rows is None:
+            return []
+        chunks: List[Dict[str, Any]] = []
+        for piece in self.split_table(rows):
+            lines = [markdown_row(piece[0]), markdown_row(["---"] * len(piece[0]))]
+            lines.extend(markdown_row(row) for row in piece[1:])
+            chunks.append({
+                'type': 'table',
+                'content': "\n".join(lines),
+                'page': page,
+                'source': f'Table on Page {page}',
+                'document': document,
+                'bbox': union_bbox([bbox]),
+                'rows': piece,
+            })
+        return chunks
+
+    def chunk_elements(self, elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Chunks for extracted elements, in order; elements that are already chunks (image text) pass through."""
+        chunks: List[Dict[str, Any]] = []
+        for element in elements:
+            if element['type'] == 'page_lines':
+                lines = [(text, tuple(bbox)) for text, bbox in element['lines']]
+                chunks.extend(self.chunk_lines(lines, element['page'], element.get('document')))
+            elif element['type'] == 'table_rows':
+                chunks.extend(self.chunk_table(element['rows'], tuple(element['bbox']),
+                                               element['page'], element.get('document')))
+            else:
+                chunks.append(element)
+        return chunks
@@ -20,12 +20,102 @@ PDF_PATH: str = os.path.join(RAW_DATA_DIR, 'qatar_test_doc.pdf')
 CHUNKS_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'extracted_chunks.json')
 VECTOR_STORE_PATH: str = os.path.join(VECTOR_STORE_DIR, 'faiss_index')
 
+# Intermediate outputs of the in-process pipeline (run_pipeline.py) and its record of
+# stage input hashes, used to skip stages whose inputs have not changed
+EXTRACTED_ELEMENTS_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'extracted_elements.json')
+SPLIT_CHUNKS_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'split_chunks.json')
+CHUNK_EMBEDDINGS_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'chunk_embeddings.npy')
+CHUNK_HASHES_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'chunk_embeddings.json')
+PIPELINE_STATE_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'pipeline_state.json')
+
+# Multi-document corpus: manifest of ingested PDFs and per-group index shards
+CORPUS_MANIFEST_PATH: str = os.path.join(VECTOR_STORE_DIR, 'corpus_manifest.json')
+SHARDS_DIR: str = os.path.join(VECTOR_STORE_DIR, 'shards')
+CORPUS_SHARDS: int = 4
+SHARD_SEARCH_WORKERS: int = 4
+
+# FAISS index type: 'flat' (exact), 'ivf_flat', 'ivf_pq' or 'hnsw', with per-type parameters
+INDEX_TYPE: str = 'flat'
+IVF_NLIST: int = 256
+IVF_NPROBE: int = 16
+PQ_M: int = 48
+PQ_NBITS: int = 8
+HNSW_M: int = 32
+HNSW_EF_CONSTRUCTION: int = 200
+HNSW_EF_SEARCH: int = 64
+
+# Serve the index and chunk records through mmap (read-only, shared page cache)
+MMAP_INDEX: bool = True
+
+# LRU caches for query embeddings and search results (TTL in seconds, 0 = never expire)
+QUERY_CACHE_SIZE: int = 1024
+QUERY_CACHE_TTL: float = 3600.0
+
+# Default retrieval mode: 'dense' (FAISS only) or 'hybrid' (FAISS + BM25 fused with reciprocal
+# rank fusion). Hybrid is opt-in per call (mode='hybrid'): its results are ordered by
+# 'fusion_score', while 'score' stays the L2 distance that dense results are ranked by
+SEARCH_MODE: str = 'dense'
+HYBRID_CANDIDATES: int = 50
+RRF_K: int = 60
+
+# Filtered searches over at most this many chunks score just those vectors exactly;
+# larger filters walk the index with a FAISS ID selector
+FILTER_EXACT_MAX: int = 20000
+
+# Optional cross-encoder re-ranking between search and generation
+RERANK_ENABLED: bool = False
+RERANKER_MODEL: str = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+RERANK_TOP_N: int = 20
+RERANK_BUDGET_MS: float = 150.0
+
+# Micro-batched generation: concurrent prompts wait up to GENERATION_MAX_WAIT_MS
+# for up to GENERATION_BATCH_SIZE prompts and are generated as one padded batch
+GENERATION_BATCH_SIZE: int = 8
+GENERATION_MAX_WAIT_MS: float = 10.0
+
+# CPU inference backends: 'torch' (fp32), 'int8' (dynamic int8 quantized PyTorch) or
+# 'onnx' (ONNX Runtime, exported once into MODEL_EXPORT_DIR; needs the optional
+# optimum[onnxruntime] extra and sentence-transformers>=3.2). Changing the embedding
+# backend shifts the vectors slightly, so re-run create_embeddings.py after switching it.
+LLM_BACKEND: str = 'torch'
+EMBEDDING_BACKEND: str = 'torch'
+MODEL_EXPORT_DIR: str = os.path.join(DATA_DIR, 'models')
+
+# Context packing: prompt token budget (capped by the model's input window), share of
+# word trigrams above which a lower-ranked chunk counts as overlapping, and token cache size
+CONTEXT_TOKEN_BUDGET: int = 512
+CONTEXT_OVERLAP_THRESHOLD: float = 0.8
+TOKEN_CACHE_SIZE: int = 4096
+
+# Semantic answer cache: a new question reuses a stored answer when its embedding has
+# cosine similarity >= ANSWER_CACHE_THRESHOLD and it retrieved the same chunk ids
+ANSWER_CACHE_ENABLED: bool = True
+ANSWER_CACHE_THRESHOLD: float = 0.92
+ANSWER_CACHE_SIZE: int = 512
+
+# Headless HTTP API (api_server.py). Worker threads run search and generation; keep them
+# at least GENERATION_BATCH_SIZE so concurrent /ask calls can share a batch. Requests past
+# API_MAX_PENDING in flight get 503, and each request times out after API_TIMEOUT seconds.
+API_HOST: str = '127.0.0.1'
+API_PORT: int = 8000
+API_WORKERS: int = 8
+API_MAX_PENDING: int = 32
+API_TIMEOUT: float = 120.0
+
 EMBEDDING_MODEL: str = 'sentence-transformers/all-MiniLM-L6-v2'
 EMBEDDING_DIMENSION: int = 384
 LLM_MODEL: str = 'google/flan-t5-base'
 
+# Text chunk bounds in characters; consecutive chunks of a page repeat up to CHUNK_OVERLAP
+# characters of whole lines, and a page's short remainder joins its previous chunk
 MAX_CHUNK_SIZE: int = 500
 MIN_CHUNK_SIZE: int = 50
+CHUNK_OVERLAP: int = 100
+
+# Ingest-time deduplication: drop exact repeats, and image chunks whose OCR word trigrams
+# are at least DEDUP_CONTAINMENT_THRESHOLD contained in the same page's text chunks
+DEDUP_ENABLED: bool = True
+DEDUP_CONTAINMENT_THRESHOLD: float = 0.8
 DEFAULT_SEARCH_RESULTS: int = 5
 MAX_SEARCH_RESULTS: int = 10
 MAX_CHAT_HISTORY: int = 50
@@ -35,6 +125,28 @@ MAX_CONTEXT_CHUNKS: int = 3
 MAX_CITATIONS: int = 3
 DEBUG_MODE: bool = False
 SIMILARITY_THRESHOLD: float = 0.5
+
+# Number of worker processes used to extract pages in parallel (1 = serial)
+EXTRACTION_WORKERS: int = min(4, os.cpu_count() or 1)
+
+# Number of chunks embedded and added to the index per batch when streaming
+EMBEDDING_BATCH_SIZE: int = 64
+
+# Pages per extraction task when streaming with several workers; at most two tasks per
+# worker are in flight, which bounds how many extracted pages wait in memory
+STREAM_PAGES_PER_TASK: int = 4
+
+# OCR settings and persistent OCR result cache
+OCR_LANG: str = 'eng'
+OCR_CONFIG: str = ''
+OCR_CACHE_PATH: str = os.path.join(PROCESSED_DATA_DIR, 'ocr_cache.sqlite')
+OCR_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+# Concurrent Tesseract pool: max parallel OCR processes, per-image timeout (seconds),
+# and minimum image area (width * height) worth sending to OCR
+OCR_WORKERS: int = min(4, os.cpu_count() or 1)
+OCR_TIMEOUT: float = 30.0
+OCR_MIN_PIXEL_AREA: int = 0
 FILE_ENCODING: str = 'utf-8'
 
 def create_directories() -> None:
@@ -44,6 +156,7 @@ def create_directories() -> None:
         RAW_DATA_DIR,
         PROCESSED_DATA_DIR,
         VECTOR_STORE_DIR,
+        SHARDS_DIR,
         IMAGES_DIR
     ]
 
@@ -0,0 +1,129 @@
+"""
+Token-budget context packing: fills the model's input window with ranked chunks,
+skipping overlapping chunks and trimming at sentence boundaries.
+"""
+import hashlib
+import re
+from typing import Any, Dict, FrozenSet, List, Set, Tuple
+from bm25_index import tokenize
+from lru_cache import LRUCache
+import config
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|(?<=\n)')
+MIN_PARTIAL_TOKENS = 32
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text after sentence punctuation and at line breaks (table rows stay whole)."""
+    return [piece for piece in SENTENCE_BREAK.split(text) if piece.strip()]
+
+
+def join_sentences(sentences: List[str]) -> str:
+    """Rejoin split sentences, keeping line breaks where the text had them."""
+    return ''.join(s if s.endswith('\n') else s + ' ' for s in sentences).strip()
+
+
+class ContextPacker:
+    """Packs ranked chunks into a token budget using the model's own tokenizer."""
+
+    def __init__(self, tokenizer: Any, budget: int = config.CONTEXT_TOKEN_BUDGET,
+                 overlap_threshold: float = config.CONTEXT_OVERLAP_THRESHOLD,
+                 cache_size: int = config.TOKEN_CACHE_SIZE,
+                 header: str = "[Source: {source}]\n", separator: str = "\n\n") -> None:
+        self.tokenizer = tokenizer
+        window = getattr(tokenizer, 'model_max_length', budget)
+        # Tokenizers without a fixed window report a huge sentinel value.
+        self.budget: int = min(budget, window) if window < 1_000_000 else budget
+        self.overlap_threshold: float = overlap_threshold
+        self.header: str = header
+        self.separator: str = separator
+        self.separator_tokens: int = self.count_tokens(separator)
+        self.token_cache = LRUCache(cache_size)
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens the model sees for text, without special tokens."""
+        return len(self.tokenizer(text, add_special_tokens=False)['input_ids'])
+
+    def _analyze(self, chunk: Dict[str, Any]) -> Tuple[List[Tuple[str, int]], FrozenSet]:
+        """Return per-sentence token counts and word shingles, tokenizing each chunk only once."""
+        key = chunk.get('content_hash') or hashlib.sha256(chunk['content'].encode('utf-8')).hexdigest()
+        cached = self.token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        sentences = [(sentence, self.count_tokens(sentence)) for sentence in split_sentences(chunk['content'])]
+        words = tokenize(chunk['content'])
+        shingles = frozenset(zip(words, words[1:], words[2:])) if len(words) >= 3 else frozenset(words)
+        analysis = (sentences, shingles)
+        self.token_cache.put(key, analysis)
+        return analysis
+
+    def _header_tokens(self, source: str) -> int:
+        """Token count of a chunk's source header, cached per source."""
+        key = ('header', source)
+        tokens = self.token_cache.get(key)
+        if tokens is None:
+            tokens = self.count_tokens(self.header.format(source=source))
+            self.token_cache.put(key, tokens)
+        return tokens
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to its first max_tokens tokens."""
+        ids = self.tokenizer(text, add_special_tokens=False)['input_ids'][:max_tokens]
+        return self.tokenizer.decode(ids, skip_special_tokens=True)
+
+    def _overlaps(self, shingles: FrozenSet, packed_shingles: List[FrozenSet]) -> bool:
+        """True when most of a chunk's shingles already appear in one packed chunk."""
+        if not shingles:
+            # Text without [a-z0-9] words (Arabic, symbol-only cells) has nothing to compare.
+            return False
+        return any(
+            len(shingles & other) / min(len(shingles), len(other)) >= self.overlap_threshold
+            for other in packed_shingles if other
+        )
+
+    def pack(self, chunks: List[Dict[str, Any]], reserved_tokens: int = 0) -> List[Dict[str, Any]]:
+        """Select chunks in rank order until the budget is spent, returning copies with trimmed content."""
+        remaining = self.budget - reserved_tokens
+        packed: List[Dict[str, Any]] = []
+        packed_shingles: List[FrozenSet] = []
+        seen_sentences: Set[str] = set()
+
+        for chunk in chunks:
+            sentences, shingles = self._analyze(chunk)
+            if self._overlaps(shingles, packed_shingles):
+                continue
+
+            cost = self._header_tokens(chunk['source'])
+            if packed:
+                cost += self.separator_tokens
+            kept: List[str] = []
+            trimmed = False
+            for sentence, tokens in sentences:
+                normalized = ' '.join(tokenize(sentence)) or sentence.strip()
+                if normalized in seen_sentences:
+                    continue
+                if cost + tokens > remaining:
+                    trimmed = True
+                    if not kept and remaining - cost >= MIN_PARTIAL_TOKENS:
+                        # A single sentence longer than the space left is cut by tokens rather than dropped.
+                        kept.append(self._truncate(sentence, remaining - cost))
+                        cost = remaining
+                    break
+                kept.append(sentence)
+                seen_sentences.add(normalized)
+                cost += tokens
+
+            if kept:
+                packed.append(dict(chunk, content=join_sentences(kept)))
+                packed_shingles.append(shingles)
+                remaining -= cost
+            if trimmed:
+                break
+        return packed
+
+    def render(self, packed: List[Dict[str, Any]]) -> str:
+        """Format packed chunks as the prompt's context section."""
+        return self.separator.join(
+            self.header.format(source=chunk['source']) + chunk['content'] for chunk in packed
+        )
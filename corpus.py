@@ -0,0 +1,326 @@
+"""
+Multi-document corpus support: a manifest of ingested PDFs and sharded vector indexes.
+"""
+import copy
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Union
+from document_processor import DocumentProcessor
+from vector_store import VectorStore, load_embeddings
+from bm25_index import reciprocal_rank_fusion
+from lru_cache import LRUCache
+from metadata_filter import make_filters, filter_key
+from utils import normalize_query
+import config
+
+
+def file_hash(filepath: str, block_size: int = 1024 * 1024) -> str:
+    """Return the sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def shard_for(document_id: str, num_shards: int) -> str:
+    """Assign a document to a shard group by a stable hash of its id."""
+    bucket = int(hashlib.sha1(document_id.encode('utf-8')).hexdigest(), 16) % max(1, num_shards)
+    return f"shard_{bucket:03d}"
+
+
+class CorpusManifest:
+    """Records each ingested document's path, hash, page count, shard and chunk range."""
+
+    def __init__(self, path: str = config.CORPUS_MANIFEST_PATH) -> None:
+        self.path: str = path
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.next_chunk_id: int = 0
+
+    def load(self) -> None:
+        """Load the manifest from disk if it exists."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding=config.FILE_ENCODING) as f:
+            data = json.load(f)
+        self.documents = data.get('documents', {})
+        self.next_chunk_id = data.get('next_chunk_id', 0)
+
+    def save(self) -> None:
+        """Write the manifest to disk."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding=config.FILE_ENCODING) as f:
+            json.dump({'documents': self.documents, 'next_chunk_id': self.next_chunk_id},
+                      f, indent=2, ensure_ascii=False)
+
+    def shards(self) -> List[str]:
+        """Return the names of all shards referenced by the manifest."""
+        return sorted({entry['shard'] for entry in self.documents.values()})
+
+
+class ShardedVectorStore:
+    """Corpus-wide vector store that fans searches out across per-group FAISS shards."""
+
+    def __init__(self, model_name: str = config.EMBEDDING_MODEL,
+                 shards_dir: str = config.SHARDS_DIR,
+                 manifest_path: str = config.CORPUS_MANIFEST_PATH,
+                 num_shards: int = config.CORPUS_SHARDS,
+                 search_workers: int = config.SHARD_SEARCH_WORKERS) -> None:
+        print(f"Loading embedding model: {model_name}")
+        self.embeddings = load_embeddings(model_name)
+        self.shards_dir: str = shards_dir
+        self.num_shards: int = num_shards
+        self.search_workers: int = search_workers
+        self.manifest = CorpusManifest(manifest_path)
+        self.shards: Dict[str, VectorStore] = {}
+        self.embedding_cache = LRUCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+        self.search_cache = LRUCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+
+    @property
+    def index_version(self) -> Tuple[Tuple[str, int], ...]:
+        """Per-shard index versions; changes whenever any shard's chunks change."""
+        return tuple((name, self.shards[name].index_version) for name in sorted(self.shards))
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query once for all shards, reusing cached embeddings."""
+        start = time.perf_counter()
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(key)
+            self.embedding_cache.put(key, embedding, time.perf_counter() - start)
+        return embedding
+
+    def chunk_type_counts(self) -> Dict[str, int]:
+        """Sum the per-type chunk counts of every shard."""
+        totals: Dict[str, int] = {}
+        for shard in self.shards.values():
+            for chunk_type, count in shard.chunk_type_counts().items():
+                totals[chunk_type] = totals.get(chunk_type, 0) + count
+        return totals
+
+    def _shard(self, name: str) -> VectorStore:
+        """Return the named shard, creating an empty one on first use."""
+        if name not in self.shards:
+            self.shards[name] = VectorStore(embeddings=self.embeddings)
+        return self.shards[name]
+
+    def index_document(self, pdf_path: str, document_id: str, digest: Optional[str] = None) -> str:
+        """Extract a PDF and index it into its shard, re-embedding changed chunks only.
+
+        digest is the file's sha256 when the caller already has it; returns the shard name.
+        """
+        entry = self.manifest.documents.get(document_id)
+        shard_name = entry['shard'] if entry else shard_for(document_id, self.num_shards)
+        image_folder = os.path.join(config.IMAGES_DIR, os.path.splitext(document_id)[0])
+
+        with DocumentProcessor(pdf_path, document_id=document_id) as processor:
+            chunks = processor.process_document(output_folder=image_folder)
+            page_count = len(processor.doc)
+
+        # Chunk ids are allocated from the manifest so they stay unique across shards.
+        self.search_cache.clear()
+        shard = self._shard(shard_name)
+        shard.next_chunk_id = self.manifest.next_chunk_id
+        shard.replace_document(document_id, chunks)
+        self.manifest.next_chunk_id = shard.next_chunk_id
+
+        chunk_ids = shard.document_chunks.get(document_id, [])
+        self.manifest.documents[document_id] = {
+            'path': pdf_path,
+            'hash': digest or file_hash(pdf_path),
+            'page_count': page_count,
+            'shard': shard_name,
+            'chunk_count': len(chunk_ids),
+            'chunk_range': [min(chunk_ids), max(chunk_ids)] if chunk_ids else None
+        }
+        return shard_name
+
+    def remove_document(self, document_id: str) -> Optional[str]:
+        """Remove a document from its shard and the manifest, returning the shard name."""
+        entry = self.manifest.documents.pop(document_id, None)
+        self.search_cache.clear()
+        if entry and entry['shard'] in self.shards:
+            self.shards[entry['shard']].remove_document(document_id)
+        return entry['shard'] if entry else None
+
+    def _checkpoint(self, shard_name: Optional[str]) -> None:
+        """Save the changed shard, then the manifest, so an interrupted sync keeps finished documents."""
+        if shard_name in self.shards:
+            os.makedirs(self.shards_dir, exist_ok=True)
+            self.shards[shard_name].save(os.path.join(self.shards_dir, shard_name))
+        self.manifest.save()
+
+    def sync(self, raw_dir: str = config.RAW_DATA_DIR) -> Dict[str, int]:
+        """Bring the corpus in line with the PDFs under raw_dir, saving after every document."""
+        found: Dict[str, str] = {}
+        for root, _, files in os.walk(raw_dir):
+            for filename in sorted(files):
+                if filename.lower().endswith('.pdf'):
+                    pdf_path = os.path.join(root, filename)
+                    found[os.path.relpath(pdf_path, raw_dir)] = pdf_path
+
+        stats = {'indexed': 0, 'unchanged': 0, 'removed': 0}
+        for document_id in sorted(set(self.manifest.documents) - set(found)):
+            self._checkpoint(self.remove_document(document_id))
+            stats['removed'] += 1
+
+        for document_id, pdf_path in sorted(found.items()):
+            entry = self.manifest.documents.get(document_id)
+            digest = file_hash(pdf_path)
+            if entry and entry['hash'] == digest:
+                stats['unchanged'] += 1
+                continue
+            print(f"\nIndexing {document_id}")
+            self._checkpoint(self.index_document(pdf_path, document_id, digest))
+            stats['indexed'] += 1
+
+        return stats
+
+    def _shards_for(self, filters: Optional[Dict[str, Any]]) -> List[VectorStore]:
+        """Shards that can hold matches; a document filter skips shards without those documents."""
+        if filters is None or filters['documents'] is None:
+            return list(self.shards.values())
+        names = {self.manifest.documents[document]['shard'] for document in filters['documents']
+                 if document in self.manifest.documents}
+        return [shard for name, shard in self.shards.items() if name in names]
+
+    def search(self, query: str, k: int = 5, mode: Optional[str] = None,
+               types: Optional[Union[str, List[str]]] = None, pages: Optional[Tuple[int, int]] = None,
+               documents: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
+        """Embed the query once, search every shard in parallel and merge the top-k."""
+        if not self.shards:
+            print("Vectorstore not created")
+            return []
+        if not query or not query.strip():
+            print("Empty query provided")
+            return []
+        if k < 1:
+            k = 1
+        mode = mode or config.SEARCH_MODE
+
+        filters = make_filters(types, pages, documents)
+        start = time.perf_counter()
+        key = (normalize_query(query), k, mode, filter_key(filters))
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        embedding = self.embed_query(query)
+
+        shards = self._shards_for(filters)
+        if mode == 'hybrid':
+            merged = self._hybrid_search(query.strip(), embedding, k, filters, shards)
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.search_workers, len(shards)))) as executor:
+                shard_results = list(executor.map(
+                    lambda shard: shard.search_by_vector(embedding, k, filters), shards))
+            merged = sorted((result for results in shard_results for result in results),
+                            key=lambda result: result['score'])[:k]
+        for i, result in enumerate(merged):
+            result['rank'] = i + 1
+        self.search_cache.put(key, copy.deepcopy(merged), time.perf_counter() - start)
+        return merged
+
+    def _hybrid_search(self, query: str, embedding: List[float], k: int, filters: Optional[Dict[str, Any]],
+                       shards: List[VectorStore]) -> List[Dict[str, Any]]:
+        """Merge every shard's dense and BM25 candidates into two global rankings, then fuse once.
+
+        RRF scores depend only on rank, so fusing inside each shard would tie the top hit of an
+        irrelevant shard with the top hit of the relevant one.
+        """
+        candidates = max(k, config.HYBRID_CANDIDATES)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.search_workers, len(shards)))) as executor:
+            shard_candidates = list(executor.map(
+                lambda shard: shard.hybrid_candidates(query, embedding, candidates, filters), shards))
+
+        dense = sorted(((s, position, distance) for s, (hits, _) in enumerate(shard_candidates)
+                        for position, distance in hits), key=lambda hit: hit[2])[:candidates]
+        lexical = sorted(((s, position, score) for s, (_, hits) in enumerate(shard_candidates)
+                          for position, score in hits), key=lambda hit: -hit[2])[:candidates]
+        fused = reciprocal_rank_fusion([[(s, position) for s, position, _ in dense],
+                                        [(s, position) for s, position, _ in lexical]], config.RRF_K)[:k]
+
+        distance_of = {(s, position): distance for s, position, distance in dense}
+        worst = max(distance_of.values(), default=0.0)
+        hits = [shards[s].hybrid_hit(position, embedding, distance_of.get((s, position)), worst)
+                for (s, position), _ in fused]
+        results = VectorStore._format_results(hits)
+        for result, (_, fusion_score) in zip(results, fused):
+            result['fusion_score'] = fusion_score
+        return results
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hit rate and latency saved for the embedding and search caches."""
+        return {'embedding': self.embedding_cache.stats(), 'search': self.search_cache.stats()}
+
+    def search_batch(self, queries: List[str], k: int = 5,
+                     types: Optional[Union[str, List[str]]] = None, pages: Optional[Tuple[int, int]] = None,
+                     documents: Optional[Union[str, List[str]]] = None) -> List[List[Dict[str, Any]]]:
+        """Embed all queries in one pass, batch-search every shard in parallel and merge per query."""
+        batch_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        valid = [i for i, query in enumerate(queries) if query and query.strip()]
+        if not self.shards or not valid:
+            return batch_results
+
+        vectors = np.asarray(
+            self.embeddings.embed_documents([queries[i].strip() for i in valid]),
+            dtype='float32'
+        )
+        filters = make_filters(types, pages, documents)
+        shards = self._shards_for(filters)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.search_workers, len(shards)))) as executor:
+            shard_results = list(executor.map(lambda shard: shard.search_by_vectors(vectors, k, filters), shards))
+
+        for row, i in enumerate(valid):
+            merged = sorted((result for results in shard_results for result in results[row]),
+                            key=lambda result: result['score'])[:max(1, k)]
+            for rank, result in enumerate(merged, 1):
+                result['rank'] = rank
+            batch_results[i] = merged
+        return batch_results
+
+    def save(self) -> None:
+        """Save every shard and the manifest."""
+        os.makedirs(self.shards_dir, exist_ok=True)
+        for name, shard in self.shards.items():
+            shard.save(os.path.join(self.shards_dir, name))
+        self.manifest.save()
+
+    def load(self, mmap: bool = False) -> None:
+        """Load the manifest and every shard it references."""
+        self.manifest.load()
+        self.search_cache.clear()
+        for name in self.manifest.shards():
+            shard_path = os.path.join(self.shards_dir, name)
+            if os.path.exists(os.path.join(shard_path, "index.faiss")):
+                self._shard(name).load(shard_path, mmap=mmap)
+
+        print(f"Loaded corpus with {len(self.manifest.documents)} documents "
+              f"in {len(self.shards)} shards")
+
+
+def main() -> None:
+    print("=" * 50)
+    print("Corpus Ingestion")
+    print("=" * 50)
+
+    config.create_directories()
+    store = ShardedVectorStore()
+    store.load()
+    # sync saves each shard and the manifest as it goes.
+    stats = store.sync(config.RAW_DATA_DIR)
+
+    print("\n" + "=" * 50)
+    print("CORPUS INGESTION COMPLETE")
+    print(f"Indexed: {stats['indexed']} | Unchanged: {stats['unchanged']} | Removed: {stats['removed']}")
+    print(f"Documents in corpus: {len(store.manifest.documents)}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
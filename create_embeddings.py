@@ -1,10 +1,42 @@
+import argparse
 import json
 import os
 from typing import List, Dict, Any
 from vector_store import VectorStore
+from utils import count_chunks_by_type
 import config
 
+def update_incrementally(chunks: List[Dict[str, Any]]) -> None:
+    """Re-index only the documents in chunks, re-embedding changed chunks only."""
+    vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
+    vector_store.load(config.VECTOR_STORE_PATH)
+
+    by_document: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        by_document.setdefault(chunk.get('document', os.path.basename(config.PDF_PATH)), []).append(chunk)
+
+    for document, document_chunks in by_document.items():
+        vector_store.replace_document(document, document_chunks)
+
+    print(f"\nSaving vector store to {config.VECTOR_STORE_PATH}...")
+    vector_store.save(config.VECTOR_STORE_PATH)
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Create embeddings for extracted chunks")
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the existing index per document instead of rebuilding it")
+    parser.add_argument("--remove", metavar="DOCUMENT",
+                        help="remove a document from the existing index and exit")
+    args = parser.parse_args()
+
+    if args.remove:
+        vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
+        vector_store.load(config.VECTOR_STORE_PATH)
+        vector_store.remove_document(args.remove)
+        vector_store.save(config.VECTOR_STORE_PATH)
+        return
+
     print("=" * 50)
     print("STEP 2: Creating Embeddings")
     print("=" * 50)
@@ -20,15 +52,22 @@ def main() -> None:
 
     print(f"Loaded {len(chunks)} chunks successfully")
 
-    text_count = sum(1 for c in chunks if c['type'] == 'text')
-    table_count = sum(1 for c in chunks if c['type'] == 'table')
-    image_count = sum(1 for c in chunks if c['type'] == 'image')
+    counts = count_chunks_by_type(chunks)
+    text_count = counts['text']
+    table_count = counts['table']
+    image_count = counts['image']
 
     print(f"\nChunk breakdown:")
     print(f"  - Text chunks: {text_count}")
     print(f"  - Tables: {table_count}")
     print(f"  - Images: {image_count}")
 
+    index_exists = os.path.exists(os.path.join(config.VECTOR_STORE_PATH, "index.faiss"))
+    if args.incremental and index_exists:
+        print(f"\nUpdating existing index using {config.EMBEDDING_MODEL}...")
+        update_incrementally(chunks)
+        return
+
     print(f"\nCreating embeddings using {config.EMBEDDING_MODEL}...")
 
     vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
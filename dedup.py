@@ -0,0 +1,72 @@
+"""
+Ingest-time deduplication: drops repeated chunks and image chunks whose OCR text the page's text chunks already hold.
+"""
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from bm25_index import tokenize
+import config
+
+
+def shingles(words: List[str], size: int = 3) -> Set[int]:
+    """Hashed word n-grams of a token list (the whole list when it is shorter than size)."""
+    if len(words) < size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(gram) for gram in zip(*(words[i:] for i in range(size)))}
+
+
+class ChunkDeduplicator:
+    """Filters chunks in extraction order, where each page's text chunks come before its images.
+
+    Tables are only checked for exact repeats: their area is cut out of the page text, so the text
+    never contains them.
+    """
+
+    def __init__(self, containment_threshold: float = config.DEDUP_CONTAINMENT_THRESHOLD,
+                 contained_types: Tuple[str, ...] = ('image',)) -> None:
+        self.containment_threshold: float = containment_threshold
+        self.contained_types: Tuple[str, ...] = contained_types
+        self.seen_hashes: Set[str] = set()
+        self.page_shingles: Dict[Tuple[Optional[str], int], Set[int]] = {}
+        self.stats: Dict[str, int] = {'kept': 0, 'exact': 0, 'contained': 0}
+
+    def is_duplicate(self, chunk: Dict[str, Any]) -> bool:
+        """Check one chunk and record it when it is kept."""
+        words = tokenize(chunk['content'])
+        # Hashing the tokens ignores case, whitespace and punctuation differences.
+        normalized = ' '.join(words) if words else chunk['content'].strip()
+        digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        if digest in self.seen_hashes:
+            self.stats['exact'] += 1
+            return True
+
+        page_key = (chunk.get('document'), chunk['page'])
+        chunk_shingles = shingles(words)
+        if chunk['type'] in self.contained_types and chunk_shingles:
+            page_text = self.page_shingles.get(page_key)
+            if page_text and len(chunk_shingles & page_text) / len(chunk_shingles) >= self.containment_threshold:
+                self.stats['contained'] += 1
+                return True
+
+        self.seen_hashes.add(digest)
+        if chunk['type'] == 'text':
+            self.page_shingles.setdefault(page_key, set()).update(chunk_shingles)
+        self.stats['kept'] += 1
+        return False
+
+    def filter(self, chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield only the chunks that are not duplicates."""
+        for chunk in chunks:
+            if not self.is_duplicate(chunk):
+                yield chunk
+
+    def deduplicate(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the chunks that are not duplicates, in order."""
+        return list(self.filter(chunks))
+
+    def removed(self) -> int:
+        return self.stats['exact'] + self.stats['contained']
+
+    def report(self) -> str:
+        """One-line summary of removed chunks."""
+        return (f"Removed {self.removed()} duplicate chunks "
+                f"({self.stats['exact']} exact, {self.stats['contained']} contained in page text)")
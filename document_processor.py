@@ -6,15 +6,102 @@ from PIL import Image
 import pytesseract
 import io
 import os
-from typing import List, Dict, Any, Optional
+import hashlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterator
+from ocr_cache import OCRCache
+from chunker import TextChunker, page_lines, table_rows
+from dedup import ChunkDeduplicator
+
+PageResult = Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def _resolve_output_folder(output_folder: Optional[str] = None) -> str:
+    """Return the image output folder, creating it if needed."""
+    if output_folder is None:
+        try:
+            import config
+            output_folder = config.IMAGES_DIR
+        except ImportError:
+            output_folder = 'extracted_images'
+
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder, exist_ok=True)
+
+    return output_folder
+
+
+def _process_page_range(pdf_path: str, document_id: str, start: int, end: int,
+                        output_folder: Optional[str], ocr_workers: int) -> Tuple[PageResult, Dict[str, int]]:
+    """Worker entry point: open a private fitz handle and process pages [start, end).
+
+    ocr_workers is this process's share of OCR_WORKERS, so the workers together run about OCR_WORKERS
+    Tesseract processes rather than that many each (one each when there are more workers than that).
+    """
+    with DocumentProcessor(pdf_path, document_id=document_id, ocr_workers=ocr_workers) as processor:
+        result = processor.process_pages(start, end, output_folder)
+        cache_stats = processor.ocr_cache.stats() if processor.ocr_cache else {}
+        return result, cache_stats
+
+
+def _write_image(image_path: str, image_bytes: bytes) -> None:
+    """Write extracted image bytes to disk."""
+    with open(image_path, "wb") as image_file:
+        image_file.write(image_bytes)
+
+
+def _run_tesseract(image_bytes: bytes, lang: str, ocr_config: str, timeout: float) -> str:
+    """Run a single Tesseract process on image bytes, killing it after timeout seconds."""
+    img_pil = Image.open(io.BytesIO(image_bytes))
+    return pytesseract.image_to_string(img_pil, lang=lang, config=ocr_config, timeout=timeout)
+
+
+def _default_ocr_cache() -> Optional[OCRCache]:
+    """Open the OCR cache configured in config.py, if available."""
+    try:
+        import config
+    except ImportError:
+        return None
+    settings = f"lang={config.OCR_LANG};config={config.OCR_CONFIG}"
+    return OCRCache(config.OCR_CACHE_PATH, config.OCR_CACHE_MAX_BYTES, settings)
 
 
 class DocumentProcessor:
     """Processes PDF documents to extract text, tables, and images with OCR."""
 
-    def __init__(self, pdf_path: str) -> None:
+    def __init__(self, pdf_path: str, use_ocr_cache: bool = True,
+                 document_id: Optional[str] = None,
+                 chunker: Optional[TextChunker] = None,
+                 ocr_workers: Optional[int] = None) -> None:
         self.pdf_path: str = pdf_path
+        self.document_id: str = document_id or os.path.basename(pdf_path)
         self.doc = fitz.open(pdf_path)
+        self.chunker: TextChunker = chunker or TextChunker()
+        self.ocr_cache: Optional[OCRCache] = _default_ocr_cache() if use_ocr_cache else None
+        try:
+            import config
+            self.ocr_lang: str = config.OCR_LANG
+            self.ocr_config: str = config.OCR_CONFIG
+            self.ocr_workers: int = config.OCR_WORKERS
+            self.ocr_timeout: float = config.OCR_TIMEOUT
+            self.ocr_min_pixel_area: int = config.OCR_MIN_PIXEL_AREA
+            self.deduplicate: bool = config.DEDUP_ENABLED
+        except ImportError:
+            self.ocr_lang = 'eng'
+            self.ocr_config = ''
+            self.ocr_workers = 1
+            self.ocr_timeout = 0
+            self.ocr_min_pixel_area = 0
+            self.deduplicate = True
+        if ocr_workers is not None:
+            self.ocr_workers = ocr_workers
+        self.dedup_stats: Dict[str, int] = {}
+        # Per-document image memo: (output folder, xref) -> first image path, pixel area and OCR key,
+        # so an image repeated on many pages (a logo) is extracted, written and hashed once.
+        self._image_memo: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._ocr_texts: Dict[str, str] = {}
+        self._ocr_failed: Set[str] = set()
 
     def __enter__(self):
         return self
@@ -23,121 +110,315 @@ class DocumentProcessor:
         self.close()
         return False
 
+    def _page_elements(self, page, page_num: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Detect a page's tables, then collect the text lines outside them, so no table is embedded twice."""
+        tables: List[Dict[str, Any]] = []
+        table_areas: List[Tuple[float, float, float, float]] = []
+        for table in page.find_tables().tables:
+            rows = table.extract()
+            if table.header.external:
+                rows = [table.header.names] + rows
+            rows = table_rows(rows)
+            if rows is not None:
+                tables.append({'type': 'table_rows', 'rows': rows, 'bbox': list(table.bbox),
+                               'page': page_num + 1, 'document': self.document_id})
+                table_areas.append(tuple(table.bbox))
+
+        lines = page_lines(page.get_text("dict")["blocks"], exclude=table_areas)
+        text: List[Dict[str, Any]] = []
+        if lines:
+            text.append({'type': 'page_lines', 'lines': [[line, list(bbox)] for line, bbox in lines],
+                         'page': page_num + 1, 'document': self.document_id})
+        return text, tables
+
+    def _page_image_jobs(self, page, page_num: int, output_folder: str) -> List[Dict[str, Any]]:
+        """Collect the embedded images of a single page as OCR jobs.
+
+        Repeats of an image already seen in this document carry no bytes; they reuse the first
+        occurrence's file and OCR result.
+        """
+        jobs: List[Dict[str, Any]] = []
+        image_list = page.get_images()
+
+        for img_index, img in enumerate(image_list):
+            xref = img[0]
+            memo = self._image_memo.get((output_folder, xref))
+            if memo is not None:
+                jobs.append({'page': page_num + 1, 'memo': memo,
+                             'pixel_area': memo['pixel_area'], 'image_path': memo['image_path']})
+                continue
+            base_image = self.doc.extract_image(xref)
+            memo = {
+                'pixel_area': base_image.get("width", 0) * base_image.get("height", 0),
+                'image_path': f"{output_folder}/page{page_num+1}_img{img_index+1}.png"
+            }
+            self._image_memo[(output_folder, xref)] = memo
+            jobs.append({
+                'page': page_num + 1,
+                'memo': memo,
+                'image_bytes': base_image["image"],
+                'pixel_area': memo['pixel_area'],
+                'image_path': memo['image_path']
+            })
+
+        return jobs
+
+    def _job_key(self, job: Dict[str, Any]) -> Optional[str]:
+        """OCR key of a job's image, hashed once per image; None when it is too small to OCR."""
+        memo = job['memo']
+        if 'key' not in memo:
+            # The first occurrence, which carries the bytes, always comes before its repeats.
+            memo['key'] = (self._ocr_key(job['image_bytes'])
+                           if job['pixel_area'] >= self.ocr_min_pixel_area else None)
+        return memo['key']
+
+    def _ocr_key(self, image_bytes: bytes) -> str:
+        """Return the content key used to deduplicate and cache OCR work."""
+        if self.ocr_cache is not None:
+            return self.ocr_cache.make_key(image_bytes)
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _ocr_image_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """OCR image jobs through a bounded Tesseract pool while images are written in the background."""
+        images_data: List[Dict[str, Any]] = []
+        if not jobs:
+            return images_data
+
+        with ThreadPoolExecutor(max_workers=1) as writer, \
+                ThreadPoolExecutor(max_workers=self.ocr_workers) as ocr_pool:
+            writes = [writer.submit(_write_image, job['image_path'], job['image_bytes'])
+                      for job in jobs if 'image_bytes' in job]
+
+            # Cache lookups stay on this thread; Tesseract runs once per distinct image.
+            keys: List[Optional[str]] = []
+            texts = self._ocr_texts
+            futures: Dict[str, Future] = {}
+            for job in jobs:
+                key = self._job_key(job)
+                keys.append(key)
+                if key is None or key in texts or key in futures or key in self._ocr_failed:
+                    continue
+                cached = self.ocr_cache.get(key) if self.ocr_cache is not None else None
+                if cached is not None:
+                    texts[key] = cached
+                else:
+                    futures[key] = ocr_pool.submit(
+                        _run_tesseract, job['image_bytes'],
+                        self.ocr_lang, self.ocr_config, self.ocr_timeout
+                    )
+
+            for job, key in zip(jobs, keys):
+                if key is None or key in self._ocr_failed:
+                    continue
+                if key not in texts:
+                    try:
+                        texts[key] = futures[key].result()
+                    except (IOError, RuntimeError, pytesseract.TesseractError) as e:
+                        print(f"OCR failed on page {job['page']}: {e}")
+                        self._ocr_failed.add(key)
+                        continue
+                    if self.ocr_cache is not None:
+                        self.ocr_cache.put(key, texts[key])
+
+                ocr_text = texts[key]
+                if ocr_text.strip():
+                    images_data.append({
+                        'type': 'image',
+                        'content': ocr_text,
+                        'page': job['page'],
+                        'image_path': job['image_path'],
+                        'source': f"Image on Page {job['page']}",
+                        'document': self.document_id
+                    })
+
+            for write in writes:
+                write.result()
+
+        return images_data
+
     def extract_text_chunks(self) -> List[Dict[str, Any]]:
-        """Extract text content from each page of the PDF."""
+        """Extract text content outside detected tables from each page of the PDF."""
         chunks: List[Dict[str, Any]] = []
-
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            text = page.get_text()
-            
-            if text.strip():
-                chunks.append({
-                    'type': 'text',
-                    'content': text,
-                    'page': page_num + 1,
-                    'source': f'Page {page_num + 1}'
-                })
-        
+            chunks.extend(self.chunker.chunk_elements(self._page_elements(self.doc[page_num], page_num)[0]))
         return chunks
 
     def extract_tables(self) -> List[Dict[str, Any]]:
-        """Extract table-like content from PDF using block analysis."""
+        """Extract tables found by PyMuPDF's table detection as Markdown chunks."""
         tables: List[Dict[str, Any]] = []
-
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            
-            blocks = page.get_text("dict")["blocks"]
-            
-            for block in blocks:
-                if "lines" in block:
-                    lines = block["lines"]
-                    if len(lines) > 2:
-                        table_text = ""
-                        for line in lines:
-                            for span in line["spans"]:
-                                table_text += span["text"] + " "
-                            table_text += "\n"
-                        
-                        if table_text.strip():
-                            tables.append({
-                                'type': 'table',
-                                'content': table_text,
-                                'page': page_num + 1,
-                                'source': f'Table on Page {page_num + 1}'
-                            })
-        
+            tables.extend(self.chunker.chunk_elements(self._page_elements(self.doc[page_num], page_num)[1]))
         return tables
 
     def extract_images_with_ocr(self, output_folder: Optional[str] = None) -> List[Dict[str, Any]]:
         """Extract images from PDF and perform OCR to get text content."""
-        if output_folder is None:
+        output_folder = _resolve_output_folder(output_folder)
+
+        images_data: List[Dict[str, Any]] = []
+        jobs: List[Dict[str, Any]] = []
+        for page_num in range(len(self.doc)):
+            jobs.extend(self._page_image_jobs(self.doc[page_num], page_num, output_folder))
+            if len(jobs) >= self._ocr_batch_size():
+                images_data.extend(self._ocr_image_jobs(jobs))
+                jobs = []
+        images_data.extend(self._ocr_image_jobs(jobs))
+        return images_data
+
+    def _ocr_batch_size(self) -> int:
+        """Image jobs collected before OCR starts: enough to keep the pool busy, few enough that
+        only a handful of decoded images are held at once."""
+        return 2 * self.ocr_workers
+
+    def process_pages(self, start: int, end: int, output_folder: Optional[str] = None) -> PageResult:
+        """Extract page lines, table rows and image text for pages [start, end) in a single pass."""
+        output_folder = _resolve_output_folder(output_folder)
+        text: List[Dict[str, Any]] = []
+        tables: List[Dict[str, Any]] = []
+        images: List[Dict[str, Any]] = []
+        image_jobs: List[Dict[str, Any]] = []
+
+        for page_num in range(start, min(end, len(self.doc))):
+            page = self.doc[page_num]
+            page_text, page_tables = self._page_elements(page, page_num)
+            text.extend(page_text)
+            tables.extend(page_tables)
+            image_jobs.extend(self._page_image_jobs(page, page_num, output_folder))
+            if len(image_jobs) >= self._ocr_batch_size():
+                images.extend(self._ocr_image_jobs(image_jobs))
+                image_jobs = []
+
+        images.extend(self._ocr_image_jobs(image_jobs))
+        return text, tables, images
+
+    def _iter_page_elements(self, workers: int, output_folder: str) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the elements of successive page ranges in page order, extracting ahead in worker processes."""
+        if workers == 1:
+            for page_num in range(len(self.doc)):
+                text, tables, images = self.process_pages(page_num, page_num + 1, output_folder)
+                yield text + tables + images
+            return
+
+        try:
+            import config
+            pages_per_task = config.STREAM_PAGES_PER_TASK
+        except ImportError:
+            pages_per_task = 4
+        ranges = deque((start, min(start + pages_per_task, len(self.doc)))
+                       for start in range(0, len(self.doc), pages_per_task))
+        pending: deque = deque()
+        ocr_workers = max(1, self.ocr_workers // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while ranges or pending:
+                while ranges and len(pending) < 2 * workers:
+                    start, end = ranges.popleft()
+                    pending.append(executor.submit(_process_page_range, self.pdf_path, self.document_id,
+                                                   start, end, output_folder, ocr_workers))
+                (text, tables, images), cache_stats = pending.popleft().result()
+                if self.ocr_cache is not None:
+                    self.ocr_cache.merge_stats(cache_stats)
+                # Regroup by page so the order matches serial extraction: text, tables, then images per page.
+                yield sorted(text + tables + images, key=lambda element: element['page'])
+
+    def iter_chunks(self, output_folder: Optional[str] = None,
+                    workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield text, table and image chunks page by page without holding the whole document."""
+        output_folder = _resolve_output_folder(output_folder)
+        workers = self._worker_count(workers)
+
+        deduplicator = ChunkDeduplicator() if self.deduplicate else None
+        if deduplicator:
+            # The live counts, so they are accurate even when the caller stops early.
+            self.dedup_stats = deduplicator.stats
+        for elements in self._iter_page_elements(workers, output_folder):
+            chunks = self.chunker.chunk_elements(elements)
+            yield from deduplicator.filter(chunks) if deduplicator else chunks
+
+        if deduplicator:
+            print(deduplicator.report())
+
+    def _extract_parallel(self, workers: int, output_folder: Optional[str] = None) -> PageResult:
+        """Split the page range across worker processes and merge in page order."""
+        total_pages = len(self.doc)
+        batch = max(1, -(-total_pages // workers))
+        ranges = [(start, min(start + batch, total_pages)) for start in range(0, total_pages, batch)]
+        output_folder = _resolve_output_folder(output_folder)
+
+        text: List[Dict[str, Any]] = []
+        tables: List[Dict[str, Any]] = []
+        images: List[Dict[str, Any]] = []
+
+        ocr_workers = max(1, self.ocr_workers // len(ranges))
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(_process_page_range, self.pdf_path, self.document_id,
+                                start, end, output_folder, ocr_workers)
+                for start, end in ranges
+            ]
+            # Futures are consumed in submission order, which keeps page order deterministic.
+            for future in futures:
+                (range_text, range_tables, range_images), cache_stats = future.result()
+                if self.ocr_cache is not None:
+                    self.ocr_cache.merge_stats(cache_stats)
+                text.extend(range_text)
+                tables.extend(range_tables)
+                images.extend(range_images)
+
+        return text, tables, images
+
+    def _worker_count(self, workers: Optional[int]) -> int:
+        """Extraction worker processes to use, from config.EXTRACTION_WORKERS by default."""
+        if workers is None:
             try:
                 import config
-                output_folder = config.IMAGES_DIR
+                workers = config.EXTRACTION_WORKERS
             except ImportError:
-                output_folder = 'extracted_images'
-        
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-        
-        images_data = []
-        
-        for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            image_list = page.get_images()
-            
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = self.doc.extract_image(xref)
-                image_bytes = base_image["image"]
-              
-                image_filename = f"{output_folder}/page{page_num+1}_img{img_index+1}.png"
-                with open(image_filename, "wb") as image_file:
-                    image_file.write(image_bytes)
-              
-                try:
-                    img_pil = Image.open(io.BytesIO(image_bytes))
-                    ocr_text = pytesseract.image_to_string(img_pil)
-
-                    if ocr_text.strip():
-                        images_data.append({
-                            'type': 'image',
-                            'content': ocr_text,
-                            'page': page_num + 1,
-                            'image_path': image_filename,
-                            'source': f'Image on Page {page_num + 1}'
-                        })
-                except (IOError, pytesseract.TesseractError) as e:
-                    print(f"OCR failed on page {page_num + 1}: {e}")
-        
-        return images_data
+                workers = 1
+        return max(1, min(workers, len(self.doc)))
+
+    def extract_elements(self, workers: Optional[int] = None,
+                         output_folder: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Page lines, table rows and image text for the whole document, before chunking."""
+        workers = self._worker_count(workers)
 
-    def process_document(self) -> List[Dict[str, Any]]:
-        """Process entire document and return all extracted chunks."""
         print(f"Processing document: {self.pdf_path}")
         print(f"Total pages: {len(self.doc)}")
 
-        text_chunks = self.extract_text_chunks()
-        print(f"Extracted {len(text_chunks)} text chunks")
-        
-        tables = self.extract_tables()
-        print(f"Extracted {len(tables)} tables")
-        
-        images = self.extract_images_with_ocr()
-        print(f"Extracted {len(images)} images with OCR")
-        
-        all_chunks = text_chunks + tables + images
+        if workers > 1:
+            print(f"Extracting pages with {workers} worker processes")
+            text, tables, images = self._extract_parallel(workers, output_folder)
+        else:
+            text, tables, images = self.process_pages(0, len(self.doc), output_folder)
+
+        if self.ocr_cache is not None:
+            cache_stats = self.ocr_cache.stats()
+            print(f"OCR cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        return text + tables + images
+
+    def process_document(self, workers: Optional[int] = None,
+                         output_folder: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Process entire document and return all extracted chunks."""
+        all_chunks = self.chunker.chunk_elements(self.extract_elements(workers, output_folder))
+
+        print(f"Extracted {sum(chunk['type'] == 'text' for chunk in all_chunks)} text chunks")
+        print(f"Extracted {sum(chunk['type'] == 'table' for chunk in all_chunks)} tables")
+        print(f"Extracted {sum(chunk['type'] == 'image' for chunk in all_chunks)} images with OCR")
+
+        if self.deduplicate:
+            deduplicator = ChunkDeduplicator()
+            all_chunks = deduplicator.deduplicate(all_chunks)
+            self.dedup_stats = dict(deduplicator.stats)
+            print(deduplicator.report())
         print(f" Total chunks: {len(all_chunks)}")
         
         return all_chunks
 
     def close(self) -> None:
         self.doc.close()
+        if self.ocr_cache is not None:
+            self.ocr_cache.close()
 
 if __name__ == "__main__":
     processor = DocumentProcessor("qatar_test_doc.pdf")
     chunks = processor.process_document()
     print(f"\nSample chunk: {chunks[0]}")
-    processor.close()
\ No newline at end of file
+    processor.close()
@@ -0,0 +1,208 @@
+"""
+FAISS index construction for flat and approximate (IVF-Flat, IVF-PQ, HNSW) search.
+"""
+import argparse
+import os
+import time
+from typing import List, Dict, Any, Tuple
+import faiss
+import numpy as np
+import config
+
+INDEX_TYPES: Tuple[str, ...] = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+
+
+def default_index_settings() -> Dict[str, Any]:
+    """Return the index settings configured in config.py."""
+    return {
+        'index_type': config.INDEX_TYPE,
+        'nlist': config.IVF_NLIST,
+        'nprobe': config.IVF_NPROBE,
+        'pq_m': config.PQ_M,
+        'pq_nbits': config.PQ_NBITS,
+        'hnsw_m': config.HNSW_M,
+        'ef_construction': config.HNSW_EF_CONSTRUCTION,
+        'ef_search': config.HNSW_EF_SEARCH,
+    }
+
+
+def min_training_size(settings: Dict[str, Any]) -> int:
+    """Return the number of vectors needed to train the configured index type."""
+    index_type = settings['index_type']
+    if index_type == 'ivf_flat':
+        return settings['nlist'] * 39
+    if index_type == 'ivf_pq':
+        return max(settings['nlist'] * 39, 2 ** settings['pq_nbits'])
+    return 0
+
+
+def factory_string(settings: Dict[str, Any]) -> str:
+    """Translate index settings into a FAISS index_factory description."""
+    index_type = settings['index_type']
+    if index_type == 'flat':
+        return 'Flat'
+    if index_type == 'ivf_flat':
+        return f"IVF{settings['nlist']},Flat"
+    if index_type == 'ivf_pq':
+        return f"IVF{settings['nlist']},PQ{settings['pq_m']}x{settings['pq_nbits']}"
+    if index_type == 'hnsw':
+        return f"HNSW{settings['hnsw_m']}"
+    raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def apply_search_params(index: faiss.Index, settings: Dict[str, Any]) -> None:
+    """Set query-time parameters (nprobe, efSearch) on an index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = settings['nprobe']
+    if hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = settings['ef_search']
+
+
+def filtered_search(index: faiss.Index, vectors: np.ndarray, k: int, positions: np.ndarray,
+                    exact_max: int = config.FILTER_EXACT_MAX) -> Tuple[np.ndarray, np.ndarray]:
+    """Search only the given positions: exact distances for small subsets, an ID selector otherwise."""
+    if len(positions) == 0:
+        return (np.full((len(vectors), k), np.inf, dtype='float32'),
+                np.full((len(vectors), k), -1, dtype='int64'))
+
+    positions = np.ascontiguousarray(positions, dtype='int64')
+    if len(positions) <= exact_max:
+        try:
+            subset = index.reconstruct_batch(positions)
+        except RuntimeError:
+            # IVF indexes without a direct map cannot reconstruct; use the selector instead.
+            subset = None
+        if subset is not None:
+            distances, rows = faiss.knn(vectors, subset, min(k, len(positions)))
+            return distances, np.where(rows >= 0, positions[rows], -1)
+
+    selector = faiss.IDSelectorBatch(len(positions), faiss.swig_ptr(positions))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    elif hasattr(index, 'hnsw'):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(vectors, k, params=params)
+
+
+def build_index(training_vectors: np.ndarray, settings: Dict[str, Any]) -> Tuple[faiss.Index, str]:
+    """Create and train an empty index; fall back to flat when there is too little data to train."""
+    index_type = settings['index_type']
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    if len(training_vectors) < min_training_size(settings):
+        print(f"Only {len(training_vectors)} vectors, too few to train {index_type}; using flat index")
+        index_type = 'flat'
+
+    dimension = training_vectors.shape[1]
+    index = faiss.index_factory(dimension, factory_string(dict(settings, index_type=index_type)), faiss.METRIC_L2)
+    if hasattr(index, 'hnsw'):
+        index.hnsw.efConstruction = settings['ef_construction']
+    if not index.is_trained:
+        index.train(training_vectors)
+    apply_search_params(index, settings)
+    return index, index_type
+
+
+def read_index_mmap(index_file: str) -> faiss.Index:
+    """Open a saved index read-only through mmap.
+
+    IO_FLAG_MMAP_IFC also maps the vector arrays of flat and HNSW indexes, but FAISS rejects it for
+    IVF inverted lists ("mmap only supported for File objects"); those are read with IO_FLAG_MMAP alone.
+    """
+    flags = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP
+    ifc_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+    if ifc_flag:
+        try:
+            return faiss.read_index(index_file, flags | ifc_flag)
+        except RuntimeError:
+            pass
+    return faiss.read_index(index_file, flags)
+
+
+def reconstruct_vectors(index: faiss.Index) -> np.ndarray:
+    """Return all stored vectors in insertion order (approximate for PQ indexes)."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype='float32')
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def recall_latency_report(vectors: np.ndarray, queries: np.ndarray, k: int,
+                          candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Measure recall@k and per-query latency of each candidate against an exact flat index."""
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    rows: List[Dict[str, Any]] = []
+    for settings in candidates:
+        start = time.perf_counter()
+        index, built_type = build_index(vectors, settings)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+
+        found = np.empty_like(truth)
+        start = time.perf_counter()
+        for i in range(len(queries)):
+            _, found[i:i + 1] = index.search(queries[i:i + 1], k)
+        latency_ms = (time.perf_counter() - start) * 1000 / max(1, len(queries))
+
+        hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+        rows.append({
+            'index': factory_string(dict(settings, index_type=built_type)),
+            'nprobe': settings['nprobe'] if built_type.startswith('ivf') else None,
+            'ef_search': settings['ef_search'] if built_type == 'hnsw' else None,
+            'recall': hits / float(len(queries) * k),
+            'latency_ms': latency_ms,
+            'build_s': build_seconds,
+        })
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], k: int) -> None:
+    """Print a recall-versus-latency table."""
+    print(f"{'Index':<22}{'nprobe':>8}{'efSearch':>10}{f'Recall@{k}':>12}{'ms/query':>10}{'Build s':>9}")
+    print("-" * 71)
+    for row in rows:
+        nprobe = '-' if row['nprobe'] is None else row['nprobe']
+        ef_search = '-' if row['ef_search'] is None else row['ef_search']
+        print(f"{row['index']:<22}{nprobe:>8}{ef_search:>10}"
+              f"{row['recall']:>12.3f}{row['latency_ms']:>10.3f}{row['build_s']:>9.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall vs latency report for FAISS index types")
+    parser.add_argument("--queries", type=int, default=200, help="number of sampled query vectors")
+    parser.add_argument("-k", type=int, default=config.DEFAULT_SEARCH_RESULTS)
+    args = parser.parse_args()
+
+    index_file = os.path.join(config.VECTOR_STORE_PATH, "index.faiss")
+    if not os.path.exists(index_file):
+        print(f"Error: no index found at {index_file}")
+        print("Please run create_embeddings.py first")
+        return
+
+    vectors = np.ascontiguousarray(reconstruct_vectors(faiss.read_index(index_file)), dtype='float32')
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = vectors[sample] + rng.normal(0, 0.01, size=(len(sample), vectors.shape[1])).astype('float32')
+
+    base = default_index_settings()
+    candidates = [dict(base, index_type='flat')]
+    candidates += [dict(base, index_type='ivf_flat', nprobe=nprobe) for nprobe in (1, 4, 16, 64)]
+    candidates += [dict(base, index_type='ivf_pq', nprobe=nprobe) for nprobe in (4, 16, 64)]
+    candidates += [dict(base, index_type='hnsw', ef_search=ef_search) for ef_search in (16, 64, 128)]
+
+    print(f"Benchmarking {len(candidates)} configurations on {len(vectors)} vectors, "
+          f"{len(queries)} queries")
+    print_report(recall_latency_report(vectors, queries, args.k, candidates), args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Dynamic micro-batching queue that groups concurrent generation requests into padded batches.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Receives decoded text pieces of one streamed request, then None once its batch has finished.
+TokenSink = Callable[[Optional[str]], None]
+
+
+class MicroBatchQueue:
+    """Collects prompts for up to max_wait_ms or max_batch_size and runs them as one batch.
+
+    Streamed requests carry a sink; batches containing one call generate_batch(prompts, sinks).
+    """
+
+    def __init__(self, generate_batch: Callable[..., List[str]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0) -> None:
+        self.generate_batch = generate_batch
+        self.max_batch_size: int = max(1, max_batch_size)
+        self.max_wait_ms: float = max(0.0, max_wait_ms)
+        self._requests: "queue.Queue[Tuple[str, Future, float, Optional[TokenSink]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {
+            'requests': 0,
+            'streamed': 0,
+            'completed': 0,
+            'failed': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'max_batch_size_seen': 0,
+            'max_queue_depth': 0,
+            'queue_wait_ms': 0.0,
+            'generation_ms': 0.0,
+        }
+        self._worker = threading.Thread(target=self._run, name='generation-queue', daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str, sink: Optional[TokenSink] = None) -> Future:
+        """Queue a prompt; the returned future resolves to its generated text.
+
+        With a sink, text pieces are passed to it while the batch decodes, followed by None.
+        """
+        future: Future = Future()
+        self._requests.put((prompt, future, time.perf_counter(), sink))
+        with self._lock:
+            self._metrics['requests'] += 1
+            self._metrics['streamed'] += sink is not None
+            self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], self._requests.qsize())
+        return future
+
+    def generate(self, prompt: str) -> str:
+        """Submit a prompt and block until its batch has been generated."""
+        return self.submit(prompt).result()
+
+    def _collect(self) -> List[Tuple[str, Future, float, Optional[TokenSink]]]:
+        """Block for one request, then gather more until the batch is full or the wait runs out."""
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._requests.get(timeout=remaining) if remaining > 0
+                             else self._requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            prompts = [prompt for prompt, _, _, _ in batch]
+            sinks = [sink for _, _, _, sink in batch]
+            start = time.perf_counter()
+            try:
+                outputs = self.generate_batch(prompts, sinks) if any(sinks) else self.generate_batch(prompts)
+            except Exception as e:
+                for _, future, _, sink in batch:
+                    future.set_exception(e)
+                    if sink is not None:
+                        sink(None)
+                with self._lock:
+                    self._metrics['failed'] += len(batch)
+                continue
+            finished = time.perf_counter()
+
+            for (_, future, _, sink), output in zip(batch, outputs):
+                future.set_result(output)
+                if sink is not None:
+                    sink(None)
+            with self._lock:
+                self._metrics['batches'] += 1
+                self._metrics['completed'] += len(batch)
+                self._metrics['last_batch_size'] = len(batch)
+                self._metrics['max_batch_size_seen'] = max(self._metrics['max_batch_size_seen'], len(batch))
+                self._metrics['queue_wait_ms'] += sum((start - queued) * 1000 for _, _, queued, _ in batch)
+                self._metrics['generation_ms'] += (finished - start) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch size and latency counters."""
+        with self._lock:
+            stats = dict(self._metrics)
+        batches, completed = stats['batches'], stats['completed']
+        stats['queue_depth'] = self._requests.qsize()
+        stats['mean_batch_size'] = completed / batches if batches else 0.0
+        stats['mean_queue_wait_ms'] = stats['queue_wait_ms'] / completed if completed else 0.0
+        stats['mean_batch_ms'] = stats['generation_ms'] / batches if batches else 0.0
+        return stats
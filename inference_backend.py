@@ -0,0 +1,204 @@
+"""
+Selectable CPU inference backends (fp32 PyTorch, dynamic int8 PyTorch, ONNX Runtime)
+for the seq2seq LLM and the sentence embedder.
+"""
+import argparse
+import gc
+import json
+import os
+import re
+import time
+from typing import List, Dict, Tuple, Any, Optional
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from langchain_huggingface import HuggingFaceEmbeddings
+from utils import memory_usage_mb
+import config
+
+BACKENDS: Tuple[str, ...] = ('torch', 'int8', 'onnx')
+
+
+def _check_backend(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+
+def export_path(model_name: str, backend: str) -> str:
+    """Directory holding the cached export of a model for a backend."""
+    return os.path.join(config.MODEL_EXPORT_DIR, backend, re.sub(r'[^A-Za-z0-9_.-]+', '--', model_name))
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamically quantize the Linear layers of a model to int8 weights, in place."""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _require_optimum() -> None:
+    try:
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError("The 'onnx' backend needs optimum with ONNX Runtime: "
+                          "pip install 'optimum[onnxruntime]'") from e
+
+
+def _require_onnx_sentence_transformers() -> None:
+    import sentence_transformers
+    version = tuple(int(part) for part in re.findall(r'\d+', sentence_transformers.__version__)[:2])
+    if version < (3, 2):
+        raise ImportError(f"The 'onnx' embedding backend needs sentence-transformers>=3.2 "
+                          f"(found {sentence_transformers.__version__}): pip install -U sentence-transformers")
+
+
+def load_seq2seq(model_name: str, backend: str = config.LLM_BACKEND) -> Tuple[Any, Any]:
+    """Load the tokenizer and seq2seq model for a backend; ONNX exports are made once and reused."""
+    _check_backend(backend)
+    if backend != 'onnx':
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        if backend == 'int8':
+            model = quantize_int8(model.eval())
+        return tokenizer, model
+
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    export_dir = export_path(model_name, backend)
+    if os.path.exists(os.path.join(export_dir, 'config.json')):
+        return AutoTokenizer.from_pretrained(export_dir), ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+
+    print(f"Exporting {model_name} to ONNX (one-time) at {export_dir}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+    model.save_pretrained(export_dir)
+    tokenizer.save_pretrained(export_dir)
+    return tokenizer, model
+
+
+def load_embeddings(model_name: str, backend: str = config.EMBEDDING_BACKEND) -> HuggingFaceEmbeddings:
+    """Load the sentence embedder for a backend; ONNX exports are made once and reused."""
+    _check_backend(backend)
+    model_kwargs = {'device': 'cpu'}
+    if backend == 'onnx':
+        _require_optimum()
+        _require_onnx_sentence_transformers()
+        from sentence_transformers import SentenceTransformer
+        export_dir = export_path(model_name, backend)
+        if not os.path.exists(os.path.join(export_dir, 'modules.json')):
+            print(f"Exporting {model_name} to ONNX (one-time) at {export_dir}")
+            SentenceTransformer(model_name, device='cpu', backend='onnx').save(export_dir)
+        model_name = export_dir
+        model_kwargs['backend'] = 'onnx'
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    if backend == 'int8':
+        # HuggingFaceEmbeddings keeps its SentenceTransformer in _client.
+        quantize_int8(embeddings._client)
+    return embeddings
+
+
+def benchmark_embeddings(model_name: str, texts: List[str], backends: List[str]) -> List[Dict[str, Any]]:
+    """Time each embedding backend and compare its vectors with the first backend's (cosine)."""
+    rows: List[Dict[str, Any]] = []
+    baseline: Optional[np.ndarray] = None
+    for backend in backends:
+        gc.collect()
+        memory_before = memory_usage_mb()
+        start = time.perf_counter()
+        embeddings = load_embeddings(model_name, backend)
+        load_seconds = time.perf_counter() - start
+        embeddings.embed_query("warm up")
+
+        start = time.perf_counter()
+        vectors = np.asarray([embeddings.embed_query(text) for text in texts], dtype='float32')
+        latency_ms = (time.perf_counter() - start) * 1000 / len(texts)
+        if baseline is None:
+            baseline = vectors
+        cosine = np.sum(vectors * baseline, axis=1)
+
+        rows.append({
+            'backend': backend,
+            'load_s': load_seconds,
+            'memory_mb': memory_usage_mb() - memory_before,
+            'latency_ms': latency_ms,
+            'agreement': float(np.mean(cosine)),
+            'worst': float(np.min(cosine)),
+        })
+        del embeddings
+    return rows
+
+
+def benchmark_llm(model_name: str, prompts: List[str], backends: List[str]) -> List[Dict[str, Any]]:
+    """Time each LLM backend and count answers identical to the first backend's."""
+    rows: List[Dict[str, Any]] = []
+    baseline: Optional[List[str]] = None
+    for backend in backends:
+        gc.collect()
+        memory_before = memory_usage_mb()
+        start = time.perf_counter()
+        tokenizer, model = load_seq2seq(model_name, backend)
+        load_seconds = time.perf_counter() - start
+
+        answers: List[str] = []
+        start = time.perf_counter()
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors='pt', truncation=True, max_length=512)
+            output = model.generate(**inputs, max_length=512)
+            answers.append(tokenizer.decode(output[0], skip_special_tokens=True).strip())
+        latency_ms = (time.perf_counter() - start) * 1000 / len(prompts)
+        if baseline is None:
+            baseline = answers
+
+        rows.append({
+            'backend': backend,
+            'load_s': load_seconds,
+            'memory_mb': memory_usage_mb() - memory_before,
+            'latency_ms': latency_ms,
+            'agreement': sum(a == b for a, b in zip(answers, baseline)) / len(prompts),
+            'worst': None,
+        })
+        del model
+    return rows
+
+
+def print_report(title: str, rows: List[Dict[str, Any]], agreement_label: str) -> None:
+    """Print a backend comparison table."""
+    print(f"\n{title}")
+    print(f"{'backend':<8} {'load s':>7} {'mem MB':>8} {'ms/item':>9} {agreement_label:>12}")
+    for row in rows:
+        worst = f" (min {row['worst']:.4f})" if row['worst'] is not None else ""
+        print(f"{row['backend']:<8} {row['load_s']:>7.1f} {row['memory_mb']:>8.0f} "
+              f"{row['latency_ms']:>9.1f} {row['agreement']:>12.4f}{worst}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency, memory and agreement of CPU inference backends")
+    parser.add_argument("--backends", nargs='+', default=list(BACKENDS), choices=BACKENDS,
+                        help="backends to compare; the first one is the reference")
+    parser.add_argument("--samples", type=int, default=20, help="number of chunks used as inputs")
+    parser.add_argument("--skip-llm", action="store_true", help="only benchmark the embedder")
+    args = parser.parse_args()
+
+    if not os.path.exists(config.CHUNKS_PATH):
+        print(f"Error: Processed data not found at {config.CHUNKS_PATH}")
+        print("Please run process_document.py first")
+        return
+    with open(config.CHUNKS_PATH, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)[:args.samples]
+    texts = [chunk['content'][:500] for chunk in chunks]
+
+    print(f"Benchmarking {', '.join(args.backends)} on {len(texts)} chunks")
+    print_report(f"Embeddings ({config.EMBEDDING_MODEL})",
+                 benchmark_embeddings(config.EMBEDDING_MODEL, texts, args.backends), 'cosine')
+
+    if not args.skip_llm:
+        prompts = [f"Summarize the following text.\n\n{text}" for text in texts]
+        print_report(f"LLM ({config.LLM_MODEL})",
+                     benchmark_llm(config.LLM_MODEL, prompts, args.backends), 'same answer')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Streaming ingestion from PDF straight into the vector index.
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional
+from document_processor import DocumentProcessor
+from vector_store import VectorStore
+import config
+
+
+def write_chunks_streaming(chunks: Iterable[Dict[str, Any]], filepath: str) -> Iterator[Dict[str, Any]]:
+    """Pass chunks through while appending them to a JSON array on disk."""
+    with open(filepath, 'w', encoding=config.FILE_ENCODING) as f:
+        f.write('[\n')
+        first = True
+        for chunk in chunks:
+            if not first:
+                f.write(',\n')
+            json.dump(chunk, f, indent=2, ensure_ascii=False)
+            first = False
+            yield chunk
+        f.write('\n]')
+
+
+def stream_ingest(pdf_path: str = config.PDF_PATH,
+                  index_path: str = config.VECTOR_STORE_PATH,
+                  batch_size: int = config.EMBEDDING_BATCH_SIZE,
+                  vector_store: Optional[VectorStore] = None,
+                  chunks_path: Optional[str] = config.CHUNKS_PATH) -> VectorStore:
+    """Extract chunks page by page and embed them in batches as they are produced.
+
+    Embedded batches are spilled to the chunk store under index_path, so memory holds the vectors
+    but not the chunks; the returned store is read-only.
+    """
+    if vector_store is None:
+        vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
+
+    with DocumentProcessor(pdf_path) as processor:
+        print(f"Streaming document: {pdf_path}")
+        print(f"Total pages: {len(processor.doc)}")
+
+        chunks = processor.iter_chunks()
+        if chunks_path:
+            chunks = write_chunks_streaming(chunks, chunks_path)
+        vector_store.create_embeddings_streaming(chunks, batch_size=batch_size, filepath=index_path)
+
+        if processor.ocr_cache is not None:
+            cache_stats = processor.ocr_cache.stats()
+            print(f"OCR cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    return vector_store
+
+
+def main() -> None:
+    print("=" * 50)
+    print("Streaming Ingestion")
+    print("=" * 50)
+
+    config.create_directories()
+    if not os.path.exists(config.PDF_PATH):
+        print(f"\nERROR: PDF not found at {config.PDF_PATH}")
+        return
+
+    vector_store = stream_ingest()
+
+    print("\n" + "=" * 50)
+    print("STREAMING INGESTION COMPLETE")
+    print(f"Total vectors created: {len(vector_store.chunks)}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
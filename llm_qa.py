@@ -1,30 +1,93 @@
 """
 Question answering module using LLM for generating responses.
 """
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+from transformers.generation.streamers import BaseStreamer
+import queue
+import threading
 import torch
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from generation_queue import MicroBatchQueue, TokenSink
+from inference_backend import load_seq2seq
+from context_packer import ContextPacker
+import config
+
+ERROR_ANSWER = "Sorry, I encountered an error generating the answer."
+
+
+def build_citations(search_results: List[Dict[str, Any]], limit: int = 3) -> List[Dict[str, Any]]:
+    """Build citation dicts for the top search results."""
+    citations = []
+    for i, result in enumerate(search_results[:limit]):
+        chunk = result['chunk']
+        citations.append({
+            'rank': i + 1,
+            'source': chunk['source'],
+            'document': chunk.get('document'),
+            'page': chunk['page'],
+            'type': chunk['type'],
+            'relevance_score': result['score']
+        })
+    return citations
+
+
+class BatchStreamer(BaseStreamer):
+    """Splits each decoding step of a batch by row and sends every streamed row's new text to its sink."""
+
+    def __init__(self, tokenizer: Any, sinks: List[Optional[TokenSink]]) -> None:
+        self.tokenizer = tokenizer
+        self.sinks = sinks
+        self.tokens: List[List[int]] = [[] for _ in sinks]
+        self.printed: List[int] = [0] * len(sinks)
+        self.prompt_seen: bool = False
+
+    def _decode(self, row: int) -> str:
+        return self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+
+    def put(self, value: torch.Tensor) -> None:
+        # The first call carries the prompt (decoder start tokens for seq2seq); later calls one token per row.
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        for row, token in enumerate(value.reshape(len(self.sinks), -1)[:, -1].tolist()):
+            sink = self.sinks[row]
+            if sink is None:
+                continue
+            self.tokens[row].append(token)
+            text = self._decode(row)
+            # Hold back the last partial word, which may still change with the next token.
+            end = len(text) if text.endswith("\n") else text.rfind(" ") + 1
+            if end > self.printed[row]:
+                sink(text[self.printed[row]:end])
+                self.printed[row] = end
+
+    def end(self) -> None:
+        for row, sink in enumerate(self.sinks):
+            if sink is not None and self.tokens[row]:
+                rest = self._decode(row)[self.printed[row]:]
+                if rest:
+                    sink(rest)
+                self.printed[row] += len(rest)
 
 
 class LLMQA:
     """LLM-based question answering system with citation support."""
-    def __init__(self, model_name: str = 'google/flan-t5-base') -> None:
-        print(f"Loading LLM model: {model_name}")
+    def __init__(self, model_name: str = 'google/flan-t5-base',
+                 batch_size: int = config.GENERATION_BATCH_SIZE,
+                 max_wait_ms: float = config.GENERATION_MAX_WAIT_MS,
+                 backend: str = config.LLM_BACKEND) -> None:
+        print(f"Loading LLM model: {model_name} ({backend} backend)")
 
-        device = 0 if torch.cuda.is_available() else -1
-        device_name = 'GPU' if device == 0 else 'CPU'
+        # Quantized and ONNX Runtime models are CPU-only; fp32 PyTorch uses a GPU when present.
+        use_gpu = backend == 'torch' and torch.cuda.is_available()
+        device_name = 'GPU' if use_gpu else 'CPU'
 
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-
-            self.pipe = pipeline(
-                "text2text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                max_length=512,
-                device=device
-            )
+            self.tokenizer, self.model = load_seq2seq(model_name, backend)
+            if use_gpu:
+                self.model.to('cuda')
+            self.backend: str = backend
+            # One generate() at a time: the queue worker and the warm-up call share the model.
+            self.inference_lock = threading.Lock()
 
             self.prompt_template = """You are a helpful assistant analyzing a document. Answer the question based only on the provided context. Be concise and accurate. If the information is not available in the context, say "This information is not found in the provided context."
 
@@ -35,35 +98,57 @@ Question: {question}
 
 Answer:"""
 
+            self.packer = ContextPacker(self.tokenizer)
+            # build_prompt packs to this budget, so truncation is only a guard for the query itself.
+            self.max_input_tokens: int = self.packer.budget
+            self.batch_size: int = batch_size
+            self.queue = MicroBatchQueue(self.generate_batch, batch_size, max_wait_ms)
+
             print(f"LLM loaded on {device_name}")
 
         except Exception as e:
             print(f"Error loading model: {e}")
             raise
 
-    def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
-        """Generate an answer based on query and context chunks."""
+    def generate_batch(self, prompts: List[str], sinks: Optional[List[Optional[TokenSink]]] = None) -> List[str]:
+        """Generate answers for several prompts in one padded pass, streaming rows that have a sink."""
+        inputs = self.tokenizer(prompts, return_tensors='pt', padding=True, truncation=True,
+                                max_length=self.max_input_tokens)
+        streamer = BatchStreamer(self.tokenizer, sinks) if sinks and any(sinks) else None
+        with self.inference_lock:
+            outputs = self.model.generate(**inputs.to(self.model.device), max_length=config.MAX_OUTPUT_TOKENS,
+                                          streamer=streamer)
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """Return generation queue depth and batch size metrics."""
+        return self.queue.stats()
+
+    def build_prompt(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
+        """Fill the prompt template with the query and as many ranked chunks as fit the token budget."""
         max_query_length = 500
         if len(query) > max_query_length:
             query = query[:max_query_length]
 
-        context_text = "\n\n".join([
-            f"[Source: {chunk['source']}]\n{chunk['content'][:500]}"
-            for chunk in context_chunks[:3]
-        ])
+        # The template and question are counted first; context fills what is left (minus the EOS token).
+        reserved = self.packer.count_tokens(self.prompt_template.format(context='', question=query)) + 1
+        packed = self.packer.pack(context_chunks, reserved)
 
-        prompt = self.prompt_template.format(
-            context=context_text,
+        return self.prompt_template.format(
+            context=self.packer.render(packed),
             question=query
         )
 
+    def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
+        """Generate an answer based on query and context chunks, batched with concurrent requests."""
+        prompt = self.build_prompt(query, context_chunks)
+
         try:
-            result = self.pipe(prompt)[0]['generated_text']
-            answer = result.strip()
+            answer = self.queue.generate(prompt).strip()
 
         except Exception as e:
             print(f"Error generating answer: {e}")
-            answer = "Sorry, I encountered an error generating the answer."
+            answer = ERROR_ANSWER
 
         return answer
 
@@ -73,16 +158,7 @@ Answer:"""
 
         answer = self.generate_answer(query, context_chunks)
 
-        citations = []
-        for i, result in enumerate(search_results[:3]):
-            chunk = result['chunk']
-            citations.append({
-                'rank': i + 1,
-                'source': chunk['source'],
-                'page': chunk['page'],
-                'type': chunk['type'],
-                'relevance_score': result['score']
-            })
+        citations = build_citations(search_results)
 
         return {
             'answer': answer,
@@ -90,6 +166,30 @@ Answer:"""
             'context_used': len(context_chunks)
         }
 
+    def stream_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> Iterator[str]:
+        """Yield the answer in pieces as its micro-batch decodes."""
+        pieces: "queue.Queue[Optional[str]]" = queue.Queue()
+        future = self.queue.submit(self.build_prompt(query, context_chunks), sink=pieces.put)
+        while True:
+            piece = pieces.get()
+            if piece is None:
+                break
+            yield piece
+
+        error = future.exception()
+        if error is not None:
+            print(f"Error generating answer: {error}")
+            yield ERROR_ANSWER
+
+    def stream_answer_with_citations(self, query: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return citations right away and the answer as a token stream."""
+        context_chunks = [result['chunk'] for result in search_results]
+        return {
+            'answer_stream': self.stream_answer(query, context_chunks),
+            'citations': build_citations(search_results),
+            'context_used': len(context_chunks)
+        }
+
 
 class SimpleQA:
     """Simple QA fallback without LLM for basic document retrieval."""
@@ -116,16 +216,7 @@ class SimpleQA:
 
         answer = "\n\n".join(answer_parts) if answer_parts else "No relevant information found in the document."
 
-        citations = []
-        for i, result in enumerate(top_chunks):
-            chunk = result['chunk']
-            citations.append({
-                'rank': i + 1,
-                'source': chunk['source'],
-                'page': chunk['page'],
-                'type': chunk['type'],
-                'relevance_score': result['score']
-            })
+        citations = build_citations(top_chunks)
 
         return {
             'answer': answer,
@@ -133,6 +224,14 @@ class SimpleQA:
             'context_used': len(search_results)
         }
 
+    def stream_answer_with_citations(self, query: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Same interface as LLMQA; the snippets arrive as a single piece."""
+        result = self.generate_answer_with_citations(query, search_results)
+        return {
+            'answer_stream': iter([result.pop('answer')]),
+            **result
+        }
+
 
 if __name__ == "__main__":
     test_results = [
@@ -0,0 +1,68 @@
+"""
+Thread-safe, size-bounded LRU cache with optional TTL and hit/latency counters.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Bounded LRU cache whose entries expire after ttl seconds (0 disables expiry)."""
+
+    def __init__(self, capacity: int = 1024, ttl: float = 0) -> None:
+        self.capacity: int = capacity
+        self.ttl: float = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.seconds_saved: float = 0.0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at, cost = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += cost
+            return value
+
+    def put(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        """Store value; cost is the seconds it took to compute, credited on every later hit."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic(), cost)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit/miss counts, hit rate and total latency saved."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'seconds_saved': self.seconds_saved,
+        }
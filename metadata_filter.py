@@ -0,0 +1,97 @@
+"""
+Precomputed position sets per chunk type, page and document for filtered vector search.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from chunk_store import ColumnarChunkStore
+
+
+def make_filters(types: Optional[Union[str, Sequence[str]]] = None,
+                 pages: Optional[Tuple[int, int]] = None,
+                 documents: Optional[Union[str, Sequence[str]]] = None) -> Optional[Dict[str, Any]]:
+    """Normalize filter arguments; returns None when nothing is filtered."""
+    if types is None and pages is None and documents is None:
+        return None
+    if isinstance(types, str):
+        types = [types]
+    if isinstance(documents, str):
+        documents = [documents]
+    return {
+        'types': tuple(sorted(types)) if types is not None else None,
+        'pages': (int(pages[0]), int(pages[1])) if pages is not None else None,
+        'documents': tuple(sorted(documents)) if documents is not None else None,
+    }
+
+
+def filter_key(filters: Optional[Dict[str, Any]]) -> Optional[Tuple]:
+    """Hashable form of normalized filters, for cache keys."""
+    if filters is None:
+        return None
+    return filters['types'], filters['pages'], filters['documents']
+
+
+class MetadataFilterIndex:
+    """Maps metadata filters to sorted FAISS positions without touching chunk text."""
+
+    def __init__(self, pages: np.ndarray, type_codes: np.ndarray, type_names: List[str],
+                 document_codes: np.ndarray, document_names: List[str]) -> None:
+        self.count: int = len(pages)
+        self.by_type: Dict[str, np.ndarray] = {
+            name: np.flatnonzero(type_codes == code) for code, name in enumerate(type_names)
+        }
+        self.by_document: Dict[str, np.ndarray] = {
+            name: np.flatnonzero(document_codes == code) for code, name in enumerate(document_names)
+        }
+        self.page_order = np.argsort(pages, kind='stable')
+        self.sorted_pages = np.asarray(pages)[self.page_order]
+
+    @classmethod
+    def from_chunks(cls, chunks: Union[List[Dict[str, Any]], ColumnarChunkStore]) -> 'MetadataFilterIndex':
+        """Build the position sets from a chunk list or columnar store in FAISS position order."""
+        if isinstance(chunks, ColumnarChunkStore):
+            return cls(np.asarray(chunks.columns['page']), np.asarray(chunks.columns['type_code']),
+                       chunks.meta['type_names'], np.asarray(chunks.columns['document_code']),
+                       chunks.meta['documents'])
+
+        type_names: List[str] = []
+        document_names: List[str] = []
+        pages = np.zeros(len(chunks), dtype=np.int32)
+        type_codes = np.zeros(len(chunks), dtype=np.int32)
+        document_codes = np.full(len(chunks), -1, dtype=np.int32)
+        for position, chunk in enumerate(chunks):
+            pages[position] = chunk['page']
+            if chunk['type'] not in type_names:
+                type_names.append(chunk['type'])
+            type_codes[position] = type_names.index(chunk['type'])
+            document = chunk.get('document')
+            if document is not None:
+                if document not in document_names:
+                    document_names.append(document)
+                document_codes[position] = document_names.index(document)
+        return cls(pages, type_codes, type_names, document_codes, document_names)
+
+    def _union(self, groups: Dict[str, np.ndarray], names: Tuple[str, ...]) -> np.ndarray:
+        selected = [groups[name] for name in names if name in groups]
+        if not selected:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(selected))
+
+    def positions(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Return the sorted positions matching every given filter."""
+        sets: List[np.ndarray] = []
+        if filters['types'] is not None:
+            sets.append(self._union(self.by_type, filters['types']))
+        if filters['documents'] is not None:
+            sets.append(self._union(self.by_document, filters['documents']))
+        if filters['pages'] is not None:
+            first, last = filters['pages']
+            start = np.searchsorted(self.sorted_pages, first, side='left')
+            end = np.searchsorted(self.sorted_pages, last, side='right')
+            sets.append(np.sort(self.page_order[start:end]))
+
+        if not sets:
+            return np.arange(self.count, dtype=np.int64)
+        result = sets[0]
+        for other in sets[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result.astype(np.int64)
@@ -0,0 +1,117 @@
+"""
+Persistent, content-addressed cache for OCR results.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+
+class OCRCache:
+    """SQLite-backed OCR cache keyed by image bytes plus OCR settings, with LRU eviction."""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, settings: str = '',
+                 touch_batch: int = 256) -> None:
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.settings: str = settings
+        self.hits: int = 0
+        self.misses: int = 0
+        # Access times of hits, written in batches instead of one UPDATE and commit per hit.
+        self.touch_batch: int = touch_batch
+        self._touched: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ocr_last_access ON ocr_cache(last_access)"
+        )
+        self.conn.commit()
+
+    def make_key(self, image_bytes: bytes) -> str:
+        """Build the cache key from the OCR settings and the raw image bytes."""
+        digest = hashlib.sha256()
+        digest.update(self.settings.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached OCR text for key, or None on a miss."""
+        row = self.conn.execute(
+            "SELECT text FROM ocr_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.touch_batch:
+            self.flush()
+        return row[0]
+
+    def _write_touches(self) -> None:
+        """Apply the pending access times of cache hits."""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE ocr_cache SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def flush(self) -> None:
+        """Write pending access times to disk."""
+        self._write_touches()
+        self.conn.commit()
+
+    def put(self, key: str, text: str) -> None:
+        """Store OCR text for key and evict least recently used entries over the size bound."""
+        size = len(text.encode('utf-8')) + len(key)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ocr_cache (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, text, size, time.time())
+        )
+        # Recent hits must be recorded before eviction picks the least recently used entries.
+        self._write_touches()
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self) -> None:
+        """Drop the oldest entries until the cache fits in max_bytes."""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self.conn.execute(
+            "SELECT key, size FROM ocr_cache ORDER BY last_access ASC"
+        ).fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM ocr_cache WHERE key = ?", stale)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def merge_stats(self, stats: Dict[str, int]) -> None:
+        """Add counters reported by another process."""
+        self.hits += stats.get('hits', 0)
+        self.misses += stats.get('misses', 0)
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,243 @@
+"""
+In-process ingestion pipeline with content-hashed stages that are skipped when their inputs are unchanged.
+"""
+import gc
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+from document_processor import DocumentProcessor
+from chunker import TextChunker
+from dedup import ChunkDeduplicator
+from vector_store import VectorStore, load_embeddings
+from faiss_index import default_index_settings
+from utils import memory_usage_mb
+import config
+
+
+def path_hash(path: str) -> Optional[str]:
+    """sha256 of a file, or of every file under a directory; None if the path does not exist."""
+    if not os.path.exists(path):
+        return None
+    files = [path]
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+    digest = hashlib.sha256()
+    for filepath in files:
+        digest.update(os.path.relpath(filepath, path).encode('utf-8'))
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_json(path: str) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: Any) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+class PipelineContext:
+    """State shared by the stages of one run; the embedding model is loaded at most once."""
+
+    def __init__(self, model_name: str = config.EMBEDDING_MODEL) -> None:
+        self.model_name: str = model_name
+        self._embeddings: Optional[HuggingFaceEmbeddings] = None
+
+    @property
+    def embeddings(self) -> HuggingFaceEmbeddings:
+        if self._embeddings is None:
+            print(f"Loading embedding model: {self.model_name}")
+            self._embeddings = load_embeddings(self.model_name)
+        return self._embeddings
+
+
+class Stage:
+    """A pipeline step with input and output paths; inputs=None means it always runs.
+
+    run may return a dict of counts, which the report shows next to the stage.
+    """
+
+    def __init__(self, name: str, run: Callable[[PipelineContext], Optional[Dict[str, int]]],
+                 inputs: Optional[List[str]], outputs: List[str],
+                 params: Optional[Dict[str, Any]] = None) -> None:
+        self.name: str = name
+        self.run = run
+        self.inputs: Optional[List[str]] = inputs
+        self.outputs: List[str] = outputs
+        self.params: Dict[str, Any] = params or {}
+
+
+class PipelineRunner:
+    """Runs stages in order, skipping those whose input hashes and outputs match the last run."""
+
+    def __init__(self, state_path: str = config.PIPELINE_STATE_PATH,
+                 context: Optional[PipelineContext] = None) -> None:
+        self.state_path: str = state_path
+        self.context = context or PipelineContext()
+        self.state: Dict[str, Dict[str, Any]] = _read_json(state_path) if os.path.exists(state_path) else {}
+
+    def fingerprint(self, stage: Stage) -> str:
+        """Hash of the stage's input contents and parameters."""
+        payload = {
+            'inputs': {path: path_hash(path) for path in stage.inputs or []},
+            'params': stage.params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def is_current(self, stage: Stage, fingerprint: str) -> bool:
+        """True when the inputs are unchanged and the recorded outputs are still on disk as written."""
+        entry = self.state.get(stage.name)
+        if stage.inputs is None or entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        return all(path_hash(path) == digest for path, digest in entry['outputs'].items())
+
+    def run(self, stages: List[Stage], force: bool = False) -> List[Dict[str, Any]]:
+        """Run or skip each stage, returning per-stage time and memory figures."""
+        report: List[Dict[str, Any]] = []
+        for i, stage in enumerate(stages, 1):
+            print(f"\n[Stage {i}/{len(stages)}] {stage.name}")
+            print("-" * 40)
+            missing = [path for path in stage.inputs or [] if not os.path.exists(path)]
+            if missing:
+                raise FileNotFoundError(f"{stage.name}: missing input {missing[0]}")
+
+            fingerprint = self.fingerprint(stage)
+            if not force and self.is_current(stage, fingerprint):
+                print("Inputs unchanged, skipping")
+                report.append({'stage': stage.name, 'status': 'skipped', 'seconds': 0.0,
+                               'memory_delta_mb': 0.0, 'memory_mb': memory_usage_mb(),
+                               'metrics': self.state[stage.name].get('metrics', {})})
+                continue
+
+            gc.collect()
+            memory_before = memory_usage_mb()
+            start = time.perf_counter()
+            metrics = stage.run(self.context) or {}
+            seconds = time.perf_counter() - start
+            memory_after = memory_usage_mb()
+
+            self.state[stage.name] = {
+                'fingerprint': fingerprint,
+                'outputs': {path: path_hash(path) for path in stage.outputs},
+                'seconds': seconds,
+                'metrics': metrics,
+            }
+            # Save after every stage so a later failure keeps the finished work.
+            _write_json(self.state_path, self.state)
+            report.append({'stage': stage.name, 'status': 'ran', 'seconds': seconds,
+                           'memory_delta_mb': memory_after - memory_before, 'memory_mb': memory_after,
+                           'metrics': metrics})
+        return report
+
+
+def print_report(report: List[Dict[str, Any]]) -> None:
+    """Print per-stage status, wall time, resident memory and any counts the stage returned."""
+    print(f"\n{'stage':<12} {'status':<8} {'seconds':>8} {'mem +MB':>8} {'RSS MB':>8}  counts")
+    for row in report:
+        counts = ", ".join(f"{name} {value}" for name, value in row.get('metrics', {}).items())
+        print(f"{row['stage']:<12} {row['status']:<8} {row['seconds']:>8.1f} "
+              f"{row['memory_delta_mb']:>8.0f} {row['memory_mb']:>8.0f}  {counts}")
+
+
+def chunk_elements(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn extracted page lines, table rows and image text into size-bounded chunks."""
+    chunker = TextChunker(config.MAX_CHUNK_SIZE, config.MIN_CHUNK_SIZE, config.CHUNK_OVERLAP)
+    return [chunk for chunk in chunker.chunk_elements(elements) if chunk['content'].strip()]
+
+
+def dedup_chunks(chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Drop repeated chunks and image text already on the page, returning the kept chunks and the counts."""
+    if not config.DEDUP_ENABLED:
+        return chunks, {'kept': len(chunks), 'exact': 0, 'contained': 0}
+    deduplicator = ChunkDeduplicator(config.DEDUP_CONTAINMENT_THRESHOLD)
+    chunks = deduplicator.deduplicate(chunks)
+    print(deduplicator.report())
+    return chunks, dict(deduplicator.stats)
+
+
+def embed_chunks(context: PipelineContext, chunks: List[Dict[str, Any]],
+                 vectors_path: str, hashes_path: str) -> np.ndarray:
+    """Embed chunks, reusing vectors from the previous run for unchanged chunk text."""
+    hashes = [VectorStore.content_hash(chunk) for chunk in chunks]
+    model = {'model': context.model_name, 'backend': config.EMBEDDING_BACKEND}
+    # Vectors from another model or backend are not comparable, so they are never reused.
+
+    previous: Dict[str, np.ndarray] = {}
+    if os.path.exists(vectors_path) and os.path.exists(hashes_path):
+        saved = _read_json(hashes_path)
+        if {name: saved.get(name) for name in model} == model:
+            previous = dict(zip(saved['hashes'], np.load(vectors_path)))
+
+    texts = {digest: chunk['content'] for digest, chunk in zip(hashes, chunks) if digest not in previous}
+    new_hashes = list(texts)
+    batch_size = config.EMBEDDING_BATCH_SIZE
+    for start in range(0, len(new_hashes), batch_size):
+        batch = new_hashes[start:start + batch_size]
+        for digest, vector in zip(batch, context.embeddings.embed_documents([texts[d] for d in batch])):
+            previous[digest] = np.asarray(vector, dtype='float32')
+    print(f"Embedded {len(new_hashes)} new chunks, reused {len(set(hashes)) - len(new_hashes)}")
+
+    vectors = np.asarray([previous[digest] for digest in hashes], dtype='float32')
+    np.save(vectors_path, vectors)
+    _write_json(hashes_path, dict(model, hashes=hashes))
+    return vectors
+
+
+def document_stages(pdf_path: str = config.PDF_PATH,
+                    index_path: str = config.VECTOR_STORE_PATH) -> List[Stage]:
+    """Extraction, chunking, deduplication, embedding and indexing stages for a single PDF."""
+    elements_path = config.EXTRACTED_ELEMENTS_PATH
+    split_path = config.SPLIT_CHUNKS_PATH
+    chunks_path = config.CHUNKS_PATH
+    vectors_path = config.CHUNK_EMBEDDINGS_PATH
+    hashes_path = config.CHUNK_HASHES_PATH
+
+    def extract(context: PipelineContext) -> None:
+        with DocumentProcessor(pdf_path) as processor:
+            elements = processor.extract_elements()
+        _write_json(elements_path, elements)
+
+    def chunk(context: PipelineContext) -> Dict[str, int]:
+        chunks = chunk_elements(_read_json(elements_path))
+        print(f"{len(chunks)} chunks")
+        _write_json(split_path, chunks)
+        return {'chunks': len(chunks)}
+
+    def dedup(context: PipelineContext) -> Dict[str, int]:
+        chunks, stats = dedup_chunks(_read_json(split_path))
+        _write_json(chunks_path, chunks)
+        return stats
+
+    def embed(context: PipelineContext) -> None:
+        embed_chunks(context, _read_json(chunks_path), vectors_path, hashes_path)
+
+    def index(context: PipelineContext) -> None:
+        vector_store = VectorStore(embeddings=context.embeddings)
+        vector_store.create_embeddings(_read_json(chunks_path), np.load(vectors_path))
+        vector_store.save(index_path)
+
+    return [
+        Stage('extract', extract, [pdf_path], [elements_path],
+              {'ocr_lang': config.OCR_LANG, 'ocr_config': config.OCR_CONFIG,
+               'ocr_min_pixel_area': config.OCR_MIN_PIXEL_AREA, 'tables': 'find_tables'}),
+        Stage('chunk', chunk, [elements_path], [split_path],
+              {'min_chunk_size': config.MIN_CHUNK_SIZE, 'max_chunk_size': config.MAX_CHUNK_SIZE,
+               'chunk_overlap': config.CHUNK_OVERLAP}),
+        Stage('dedup', dedup, [split_path], [chunks_path],
+              {'dedup': config.DEDUP_ENABLED, 'dedup_threshold': config.DEDUP_CONTAINMENT_THRESHOLD,
+               'contained_types': ['image']}),
+        Stage('embed', embed, [chunks_path], [vectors_path, hashes_path],
+              {'model': config.EMBEDDING_MODEL, 'backend': config.EMBEDDING_BACKEND}),
+        Stage('index', index, [chunks_path, vectors_path],
+              [index_path, f"{index_path}_chunks", f"{index_path}_index.json", f"{index_path}_bm25"],
+              default_index_settings()),
+    ]
@@ -2,6 +2,7 @@ import json
 import os
 from typing import List, Dict, Any
 from document_processor import DocumentProcessor
+from utils import count_chunks_by_type
 import config
 
 def main() -> None:
@@ -23,13 +24,16 @@ def main() -> None:
     
     print(f"\n Extracted {len(chunks)} chunks")
     
-    text_count = sum(1 for c in chunks if c['type'] == 'text')
-    table_count = sum(1 for c in chunks if c['type'] == 'table')
-    image_count = sum(1 for c in chunks if c['type'] == 'image')
+    counts = count_chunks_by_type(chunks)
+    text_count = counts['text']
+    table_count = counts['table']
+    image_count = counts['image']
     
     print(f"  - Text chunks: {text_count}")
     print(f"  - Tables: {table_count}")
     print(f"  - Images (OCR): {image_count}")
+    if processor.dedup_stats:
+        print(f"  - Duplicates removed: {processor.dedup_stats['exact'] + processor.dedup_stats['contained']}")
     
     print(f"\nSaving data ")
     with open(config.CHUNKS_PATH, 'w', encoding='utf-8') as f:
@@ -0,0 +1,74 @@
+"""
+Cross-encoder re-ranking of search results under a per-query latency budget.
+"""
+import time
+from typing import List, Dict, Any, Optional
+from sentence_transformers import CrossEncoder
+import config
+
+
+class CrossEncoderReranker:
+    """Re-scores (query, chunk) pairs with a small local cross-encoder within a CPU time budget."""
+
+    def __init__(self, model_name: str = config.RERANKER_MODEL,
+                 budget_ms: float = config.RERANK_BUDGET_MS,
+                 max_candidates: int = config.RERANK_TOP_N) -> None:
+        print(f"Loading re-ranker: {model_name}")
+        self.model = CrossEncoder(model_name, device='cpu', max_length=512)
+        self.budget_ms: float = budget_ms
+        self.max_candidates: int = max_candidates
+        self.ms_per_pair: Optional[float] = None
+        self.last_stats: Dict[str, Any] = {}
+
+        # One warm-up batch gives a first per-pair cost estimate for the budget.
+        self._score("warm up query", ["warm up passage"] * 4)
+        print(f"Re-ranker loaded (~{self.ms_per_pair:.1f} ms per pair)")
+
+    def _score(self, query: str, passages: List[str]) -> List[float]:
+        """Score passages in one batch and update the running per-pair cost estimate."""
+        start = time.perf_counter()
+        scores = self.model.predict([(query, passage) for passage in passages], batch_size=len(passages))
+        per_pair = (time.perf_counter() - start) * 1000 / len(passages)
+        if self.ms_per_pair is None:
+            self.ms_per_pair = per_pair
+        else:
+            self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * per_pair
+        return [float(score) for score in scores]
+
+    def affordable_pairs(self, available: int) -> int:
+        """Number of candidates that fit in the latency budget at the current per-pair cost."""
+        if not self.ms_per_pair:
+            return available
+        return max(1, min(available, int(self.budget_ms / self.ms_per_pair)))
+
+    def rerank(self, query: str, search_results: List[Dict[str, Any]],
+               top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Reorder the top-N search results by cross-encoder score, keeping the search result format."""
+        if not search_results:
+            return []
+
+        candidates = search_results[:self.max_candidates]
+        scored_count = self.affordable_pairs(len(candidates))
+        head, tail = candidates[:scored_count], candidates[scored_count:]
+
+        start = time.perf_counter()
+        scores = self._score(query, [result['chunk']['content'] for result in head])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        reranked = [
+            dict(result, rerank_score=score)
+            for result, score in sorted(zip(head, scores), key=lambda pair: pair[1], reverse=True)
+        ]
+        # Candidates the budget could not cover keep their retrieval order after the scored ones.
+        reranked += [dict(result) for result in tail]
+        if top_k is not None:
+            reranked = reranked[:top_k]
+        for i, result in enumerate(reranked, 1):
+            result['rank'] = i
+
+        self.last_stats = {
+            'candidates': len(candidates),
+            'scored': scored_count,
+            'elapsed_ms': elapsed_ms,
+        }
+        return reranked
@@ -1,19 +1,27 @@
-import subprocess
+import argparse
+import os
 import sys
 import time
-from typing import List, Tuple
+from typing import List
+from pipeline import PipelineContext, PipelineRunner, Stage, document_stages, print_report
+from vector_store import VectorStore
+import config
 
-def run_command(command: str, description: str) -> bool:
-    print(f"\n{description}")
-    print("-" * 40)
-    result = subprocess.run(command, shell=True)
+def streaming_stage() -> Stage:
+    """Page-by-page extraction and embedding into the index; it always runs."""
+    def run(context: PipelineContext) -> None:
+        from ingest import stream_ingest
+        stream_ingest(vector_store=VectorStore(embeddings=context.embeddings))
 
-    if result.returncode != 0:
-        print(f"Error: {description} failed")
-        return False
+    return Stage('stream', run, None, [config.VECTOR_STORE_PATH])
 
-    print(f"Completed: {description}")
-    return True
+def corpus_stage() -> Stage:
+    """Sync every PDF under data/raw into the sharded corpus; the corpus skips unchanged files itself."""
+    def run(context: PipelineContext) -> None:
+        import corpus
+        corpus.main()
+
+    return Stage('corpus', run, None, [config.CORPUS_MANIFEST_PATH])
 
 def main() -> None:
     start_time = time.time()
@@ -21,19 +29,34 @@ def main() -> None:
     print("Multi-Modal RAG Pipeline")
     print("=" * 50)
 
-    steps: List[Tuple[str, str]] = [
-        ("python config.py", "Creating directories"),
-        ("python process_document.py", "Extracting document data"),
-        ("python create_embeddings.py", "Creating embeddings"),
-    ]
-
-    total_steps = len(steps)
-    for i, (command, description) in enumerate(steps, 1):
-        print(f"\n[Step {i}/{total_steps}]")
-        if not run_command(command, description):
-            print(f"\nPipeline failed at step {i}/{total_steps}: {description}")
-            print("Please check the error messages above and fix the issue.")
+    parser = argparse.ArgumentParser(description="Run the Multi-Modal RAG ingestion pipeline")
+    parser.add_argument("--stream", action="store_true",
+                        help="extract and embed page by page in batches instead of in separate passes")
+    parser.add_argument("--corpus", action="store_true",
+                        help="index every PDF under data/raw into the sharded corpus")
+    parser.add_argument("--force", action="store_true",
+                        help="re-run every stage even when its inputs are unchanged")
+    args = parser.parse_args()
+
+    config.create_directories()
+    if args.corpus:
+        stages: List[Stage] = [corpus_stage()]
+    elif args.stream:
+        stages = [streaming_stage()]
+    else:
+        if not os.path.exists(config.PDF_PATH):
+            print(f"\nERROR: PDF not found at {config.PDF_PATH}")
             sys.exit(1)
+        stages = document_stages()
+
+    runner = PipelineRunner()
+    try:
+        report = runner.run(stages, force=args.force)
+    except Exception as e:
+        print(f"\nPipeline failed: {e}")
+        print("Please check the error messages above and fix the issue.")
+        sys.exit(1)
+    print_report(report)
 
     elapsed = time.time() - start_time
     print("\n" + "=" * 50)
@@ -43,4 +66,4 @@ def main() -> None:
     print("=" * 50)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
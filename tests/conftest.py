@@ -0,0 +1,43 @@
+import hashlib
+import os
+import sys
+from typing import List
+import fitz
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DIMENSION = 16
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic random vectors seeded by the text, so equal texts embed identically."""
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(DIMENSION).astype('float32').tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@pytest.fixture
+def embeddings() -> HashEmbeddings:
+    return HashEmbeddings()
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> str:
+    """Write a PDF with one line of text per string, one page per list."""
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((72, 72 + i * 20), line)
+    doc.save(path)
+    doc.close()
+    return path
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Iterator, List
+from aiohttp.test_utils import TestClient, TestServer
+from api_server import QueryService
+
+
+class SlowAnswerer:
+    def __init__(self, release: threading.Event) -> None:
+        self.release = release
+
+    def _pieces(self) -> Iterator[str]:
+        yield "Growth "
+        self.release.wait(5)
+        yield "slowed."
+
+    def stream_answer_with_citations(self, query: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {'citations': [], 'context_used': 0, 'answer_stream': self._pieces()}
+
+
+class FakeResources:
+    """Stands in for SharedResources: searches block until released when the query asks them to."""
+
+    def __init__(self) -> None:
+        self.error = None
+        self.search_ready = True
+        self.ready = True
+        self.status = 'Ready'
+        self.release = threading.Event()
+        self.answerer = SlowAnswerer(self.release)
+
+    def search(self, query: str, **options: Any) -> List[Dict[str, Any]]:
+        if query == 'slow':
+            self.release.wait(5)
+        return [{'query': query, 'options': {name: list(value) if isinstance(value, tuple) else value
+                                             for name, value in options.items()}}]
+
+
+def run(service: QueryService, scenario) -> Any:
+    async def main() -> Any:
+        async with TestClient(TestServer(service.make_app())) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_bad_option_types_get_400():
+    service = QueryService(resources=FakeResources(), workers=2, max_pending=4, timeout=5)
+
+    async def scenario(client: TestClient) -> List[int]:
+        statuses = []
+        for options in ({'pages': 3}, {'k': '5'}, {'k': 0}, {'mode': 'sparse'}, {'types': [1]},
+                        {'pages': [4, 2]}, {'documents': {'a': 1}}):
+            response = await client.post('/search', json=dict(options, query='growth'))
+            statuses.append(response.status)
+        good = await client.post('/search', json={'query': 'growth', 'k': 3, 'pages': [1, 2], 'types': 'text'})
+        statuses.append(good.status)
+        assert (await good.json())['results'][0]['options'] == {'k': 3, 'pages': [1, 2], 'types': 'text'}
+        return statuses
+
+    assert run(service, scenario) == [400] * 7 + [200]
+
+
+def test_timed_out_work_keeps_its_admission_slot():
+    resources = FakeResources()
+    service = QueryService(resources=resources, workers=2, max_pending=4, timeout=0.2)
+
+    async def scenario(client: TestClient) -> None:
+        response = await client.post('/search', json={'query': 'slow'})
+        assert response.status == 504
+        # The executor thread is still blocked in search, so its slot stays taken.
+        assert service.admission.stats()['in_flight'] == 1
+        resources.release.set()
+        for _ in range(50):
+            if service.admission.in_flight == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert service.admission.stats()['in_flight'] == 0
+        assert service.admission.stats()['abandoned'] == 1
+
+    run(service, scenario)
+
+
+def test_stream_timeout_is_reported_in_the_stream():
+    resources = FakeResources()
+    service = QueryService(resources=resources, workers=2, max_pending=4, timeout=0.2)
+
+    async def scenario(client: TestClient) -> List[Dict[str, Any]]:
+        response = await client.post('/ask/stream', json={'query': 'growth'})
+        assert response.status == 200
+        lines = [json.loads(line) for line in (await response.text()).splitlines()]
+        resources.release.set()
+        return lines
+
+    lines = run(service, scenario)
+    assert lines[1] == {'token': "Growth "}
+    assert lines[-1] == {'error': 'Request timed out'}
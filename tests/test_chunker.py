@@ -0,0 +1,74 @@
+from typing import List, Tuple
+import pytest
+from chunker import TextChunker, table_rows
+from conftest import write_pdf
+from document_processor import DocumentProcessor
+
+BOX = (72.0, 72.0, 540.0, 84.0)
+
+
+def lines_of(*lengths: int) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+    return [(chr(ord('a') + i) * length, BOX) for i, length in enumerate(lengths)]
+
+
+def test_short_remainder_never_exceeds_max_size():
+    chunker = TextChunker(max_size=500, min_size=50, overlap=0)
+    groups = chunker.split(lines_of(245, 245, 40))
+    assert all(chunker._size(group) <= 500 for group in groups)
+    assert [text for group in groups for text, _ in group] == [text for text, _ in lines_of(245, 245, 40)]
+
+
+@pytest.mark.parametrize('overlap', [0, 100])
+def test_chunks_respect_max_size_and_keep_every_line(overlap):
+    chunker = TextChunker(max_size=200, min_size=50, overlap=overlap)
+    lines = lines_of(*[37, 80, 12, 150, 60, 45, 199, 8, 70, 90, 30, 20])
+    chunks = chunker.chunk_lines(lines, page=3, document='a.pdf')
+    assert all(len(chunk['content']) <= 200 for chunk in chunks)
+    seen = {line for chunk in chunks for line in chunk['content'].split("\n")}
+    assert seen == {text for text, _ in lines}
+    assert all(chunk['page'] == 3 and chunk['source'] == 'Page 3' for chunk in chunks)
+
+
+def test_consecutive_chunks_overlap():
+    chunker = TextChunker(max_size=100, min_size=10, overlap=40)
+    chunks = chunker.chunk_lines(lines_of(30, 30, 30, 30, 30), page=1)
+    first, second = chunks[0]['content'].split("\n"), chunks[1]['content'].split("\n")
+    assert first[-1] == second[0]
+
+
+def test_long_line_is_wrapped():
+    chunker = TextChunker(max_size=50, min_size=0, overlap=0)
+    text = " ".join(["word"] * 40)
+    chunks = chunker.chunk_lines([(text, BOX)], page=1)
+    assert len(chunks) > 1 and all(len(chunk['content']) <= 50 for chunk in chunks)
+
+
+def test_table_pieces_repeat_the_header():
+    chunker = TextChunker(max_size=120, min_size=0, overlap=0)
+    rows = [["Year", "GDP"]] + [[str(2000 + i), f"{i}.5 %"] for i in range(20)]
+    chunks = chunker.chunk_table(rows, BOX, page=2, document='a.pdf')
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk['content'].startswith("| Year | GDP |\n| --- | --- |")
+        assert chunk['rows'][0] == ["Year", "GDP"]
+    assert [row for chunk in chunks for row in chunk['rows'][1:]] == rows[1:]
+
+
+def test_table_rows_rejects_single_column_tables():
+    assert table_rows([["a"], ["b"]]) is None
+    assert table_rows([["a", None], [None, None], ["b", "c\nd"]]) == [["a", ""], ["b", "c d"]]
+
+
+def test_chunk_elements_can_rechunk_extracted_pages(tmp_path):
+    pdf_path = write_pdf(str(tmp_path / "report.pdf"),
+                         [[f"Page {page} line {i} about fiscal policy and growth" for i in range(30)]
+                          for page in range(2)])
+
+    with DocumentProcessor(pdf_path, use_ocr_cache=False) as processor:
+        elements = processor.extract_elements(workers=1, output_folder=str(tmp_path / "images"))
+        chunks = processor.process_document(workers=1, output_folder=str(tmp_path / "images"))
+
+    assert {element['type'] for element in elements} == {'page_lines'}
+    assert TextChunker().chunk_elements(elements) == chunks
+    small = TextChunker(max_size=200, min_size=20, overlap=0).chunk_elements(elements)
+    assert len(small) > len(chunks) and all(len(chunk['content']) <= 200 for chunk in small)
@@ -0,0 +1,51 @@
+from typing import Any, Dict, List
+from context_packer import ContextPacker
+
+
+class WhitespaceTokenizer:
+    """One token per whitespace-separated word."""
+
+    model_max_length = 512
+
+    def __call__(self, text: str, add_special_tokens: bool = False) -> Dict[str, List[str]]:
+        return {'input_ids': text.split()}
+
+    def decode(self, ids: List[str], skip_special_tokens: bool = True) -> str:
+        return ' '.join(ids)
+
+
+def chunk(content: str, source: str) -> Dict[str, Any]:
+    return {'content': content, 'source': source, 'page': 1, 'type': 'text'}
+
+
+def test_budget_truncates_at_a_sentence_boundary():
+    packer = ContextPacker(WhitespaceTokenizer(), budget=20)
+    chunks = [chunk("One two three four. Five six seven eight.", "Page 1"),
+              chunk("Nine ten eleven twelve. Thirteen fourteen fifteen sixteen.", "Page 2")]
+    packed = packer.pack(chunks)
+    # Headers cost 3 tokens and the separator none, leaving room for three four-word sentences.
+    assert [c['content'] for c in packed] == ["One two three four. Five six seven eight.", "Nine ten eleven twelve."]
+    assert sum(packer.count_tokens(packer.header.format(source=c['source']) + c['content'])
+               for c in packed) <= 20
+
+
+def test_overlapping_chunks_and_repeated_sentences_are_dropped():
+    packer = ContextPacker(WhitespaceTokenizer(), budget=200)
+    chunks = [chunk("Growth slowed in 2023. Banks remain healthy.", "Page 1"),
+              chunk("Growth slowed in 2023. Banks remain healthy!", "Page 2"),
+              chunk("Banks remain healthy. Inflation eased to 2.5 percent.", "Page 3")]
+    packed = packer.pack(chunks)
+    assert [c['source'] for c in packed] == ["Page 1", "Page 3"]
+    assert packed[1]['content'] == "Inflation eased to 2.5 percent."
+
+
+def test_text_without_ascii_words_is_kept():
+    packer = ContextPacker(WhitespaceTokenizer(), budget=200)
+    chunks = [chunk("Das Wachstum verlangsamte sich deutlich.", "Page 1"),
+              chunk("تباطأ النمو الاقتصادي. القطاع المصرفي سليم.", "Page 2"),
+              chunk("— | — | —\n★ ★ ★", "Page 3"),
+              chunk("Growth slowed markedly this year.", "Page 4")]
+    packed = packer.pack(chunks)
+    assert [c['source'] for c in packed] == ["Page 1", "Page 2", "Page 3", "Page 4"]
+    assert packed[1]['content'] == "تباطأ النمو الاقتصادي. القطاع المصرفي سليم."
+    assert packed[2]['content'] == "— | — | —\n★ ★ ★"
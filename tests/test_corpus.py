@@ -0,0 +1,101 @@
+import os
+from typing import List
+import numpy as np
+import pytest
+import config
+import corpus
+from conftest import HashEmbeddings, write_pdf
+
+
+@pytest.fixture
+def corpus_store(tmp_path, monkeypatch) -> corpus.ShardedVectorStore:
+    monkeypatch.setattr(corpus, 'load_embeddings', lambda model_name: HashEmbeddings())
+    monkeypatch.setattr(config, 'IMAGES_DIR', str(tmp_path / "images"))
+    monkeypatch.setattr(config, 'OCR_CACHE_PATH', str(tmp_path / "ocr.sqlite"))
+    monkeypatch.setattr(config, 'EXTRACTION_WORKERS', 1)
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        write_pdf(str(raw / name), [[f"{name} line {i} about the budget" for i in range(20)]])
+    return corpus.ShardedVectorStore(shards_dir=str(tmp_path / "shards"),
+                                     manifest_path=str(tmp_path / "manifest.json"), num_shards=2)
+
+
+def reopen(store: corpus.ShardedVectorStore) -> corpus.ShardedVectorStore:
+    reopened = corpus.ShardedVectorStore(shards_dir=store.shards_dir, manifest_path=store.manifest.path,
+                                         num_shards=store.num_shards)
+    reopened.load()
+    return reopened
+
+
+def test_sync_saves_after_each_document(corpus_store, tmp_path, monkeypatch):
+    raw_dir = str(tmp_path / "raw")
+    index_document = corpus.ShardedVectorStore.index_document
+
+    def fail_on_b(self, pdf_path, document_id, digest=None):
+        if document_id == "b.pdf":
+            raise RuntimeError("extraction crashed")
+        return index_document(self, pdf_path, document_id, digest)
+
+    monkeypatch.setattr(corpus.ShardedVectorStore, 'index_document', fail_on_b)
+    with pytest.raises(RuntimeError):
+        corpus_store.sync(raw_dir)
+    monkeypatch.setattr(corpus.ShardedVectorStore, 'index_document', index_document)
+
+    resumed = reopen(corpus_store)
+    assert set(resumed.manifest.documents) == {"a.pdf"}
+    assert resumed.search("a.pdf line 3 about the budget", k=1, mode='dense')[0]['chunk']['document'] == "a.pdf"
+    assert resumed.sync(raw_dir) == {'indexed': 1, 'unchanged': 1, 'removed': 0}
+
+    os.remove(os.path.join(raw_dir, "a.pdf"))
+    assert reopen(resumed).sync(raw_dir) == {'indexed': 0, 'unchanged': 1, 'removed': 1}
+    assert set(reopen(resumed).manifest.documents) == {"b.pdf"}
+
+
+def test_sync_hashes_each_pdf_once(corpus_store, tmp_path, monkeypatch):
+    hashed: List[str] = []
+    file_hash = corpus.file_hash
+
+    def counting(filepath, block_size=1024 * 1024):
+        hashed.append(os.path.basename(filepath))
+        return file_hash(filepath, block_size)
+
+    monkeypatch.setattr(corpus, 'file_hash', counting)
+    corpus_store.sync(str(tmp_path / "raw"))
+    assert sorted(hashed) == ["a.pdf", "b.pdf"]
+
+
+class TopicEmbeddings(HashEmbeddings):
+    """Deficit texts embed next to one point, economy texts a little further out, everything else far away."""
+
+    def _vector(self, text: str) -> List[float]:
+        noise = np.asarray(super()._vector(text))
+        base = np.ones(len(noise), dtype='float32')
+        if 'deficit' in text:
+            return (base + 0.01 * noise).tolist()
+        if 'economy' in text:
+            return (base + 0.5 * noise).tolist()
+        return (-base + noise).tolist()
+
+
+def test_hybrid_search_fuses_across_shards(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus, 'load_embeddings', lambda model_name: TopicEmbeddings())
+    store = corpus.ShardedVectorStore(shards_dir=str(tmp_path / "shards"),
+                                      manifest_path=str(tmp_path / "manifest.json"), num_shards=2)
+    relevant = [f"the budget deficit narrowed in {2020 + i}" for i in range(3)]
+    documents = {
+        'a.pdf': relevant + [f"economy note {i}" for i in range(20)],
+        'b.pdf': [f"weather note {i}" for i in range(20)],
+    }
+    for shard_name, (document, texts) in zip(("shard_000", "shard_001"), documents.items()):
+        shard = store._shard(shard_name)
+        shard.next_chunk_id = store.manifest.next_chunk_id
+        shard.add_document(document, [{'content': text, 'page': 1, 'type': 'text', 'source': 'Page 1'}
+                                      for text in texts])
+        store.manifest.next_chunk_id = shard.next_chunk_id
+
+    results = store.search("budget deficit", k=5, mode='hybrid')
+    # Shard b only has far, lexically unrelated chunks, so none of them may outrank shard a's.
+    assert [result['chunk']['document'] for result in results] == ['a.pdf'] * 5
+    assert {result['chunk']['content'] for result in results[:3]} == set(relevant)
+    assert [result['score'] for result in results[3:]] == sorted(result['score'] for result in results[3:])
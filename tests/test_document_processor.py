@@ -0,0 +1,108 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import fitz
+from PIL import Image
+import document_processor
+from document_processor import DocumentProcessor
+from ocr_cache import OCRCache
+
+
+def write_image_pdf(path: str, pages: int) -> str:
+    doc = fitz.open()
+    for i in range(pages):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 20), (i * 20 % 256, 80, 160)).save(buffer, format='PNG')
+        page = doc.new_page()
+        page.insert_text((72, 72), f"page {i} text")
+        page.insert_image(fitz.Rect(72, 100, 272, 200), stream=buffer.getvalue())
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_serial_ocr_runs_in_bounded_batches(tmp_path, monkeypatch):
+    pdf_path = write_image_pdf(str(tmp_path / "images.pdf"), 9)
+    monkeypatch.setattr(document_processor, '_run_tesseract', lambda image_bytes, *args: "chart text")
+    batches: List[int] = []
+    ocr_image_jobs = DocumentProcessor._ocr_image_jobs
+
+    def recording(self, jobs):
+        batches.append(len(jobs))
+        return ocr_image_jobs(self, jobs)
+
+    monkeypatch.setattr(DocumentProcessor, '_ocr_image_jobs', recording)
+    with DocumentProcessor(pdf_path, use_ocr_cache=False, ocr_workers=2) as processor:
+        text, tables, images = processor.process_pages(0, 9, str(tmp_path / "images"))
+
+    assert len(images) == 9 and len(text) == 9
+    assert max(batches) <= 4 and sum(batches) == 9
+
+
+def test_parallel_workers_share_the_ocr_budget(tmp_path, monkeypatch):
+    pdf_path = write_image_pdf(str(tmp_path / "images.pdf"), 8)
+    shares: List[int] = []
+
+    def page_range(pdf_path, document_id, start, end, output_folder, ocr_workers):
+        shares.append(ocr_workers)
+        return ([], [], []), {}
+
+    monkeypatch.setattr(document_processor, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(document_processor, '_process_page_range', page_range)
+    with DocumentProcessor(pdf_path, use_ocr_cache=False, ocr_workers=4) as processor:
+        processor._extract_parallel(2, str(tmp_path / "images"))
+        list(processor._iter_page_elements(4, str(tmp_path / "images")))
+
+    assert shares[:2] == [2, 2] and set(shares[2:]) == {1}
+
+
+def test_repeated_image_is_extracted_hashed_and_read_once(tmp_path, monkeypatch):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 20), (200, 80, 160)).save(buffer, format='PNG')
+    doc = fitz.open()
+    logo = None
+    for i in range(6):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"page {i} text")
+        if logo is None:
+            logo = page.insert_image(fitz.Rect(72, 100, 272, 200), stream=buffer.getvalue())
+        else:
+            page.insert_image(fitz.Rect(72, 100, 272, 200), xref=logo)
+    pdf_path = str(tmp_path / "logo.pdf")
+    doc.save(pdf_path)
+    doc.close()
+
+    ocr_calls: List[bytes] = []
+    monkeypatch.setattr(document_processor, '_run_tesseract',
+                        lambda image_bytes, *args: ocr_calls.append(image_bytes) or "logo text")
+    monkeypatch.setattr(document_processor, '_default_ocr_cache',
+                        lambda: OCRCache(str(tmp_path / "ocr.sqlite"), settings='test'))
+    with DocumentProcessor(pdf_path, ocr_workers=2) as processor:
+        extracted: List[int] = []
+        hashed: List[bytes] = []
+        extract_image, make_key = processor.doc.extract_image, processor.ocr_cache.make_key
+        processor.doc.extract_image = lambda xref: extracted.append(xref) or extract_image(xref)
+        processor.ocr_cache.make_key = lambda image_bytes: hashed.append(image_bytes) or make_key(image_bytes)
+        _, _, images = processor.process_pages(0, 6, str(tmp_path / "images"))
+        stats = processor.ocr_cache.stats()
+
+    assert [image['page'] for image in images] == [1, 2, 3, 4, 5, 6]
+    assert all(image['content'] == "logo text" for image in images)
+    assert len(extracted) == len(hashed) == len(ocr_calls) == 1
+    assert stats == {'hits': 0, 'misses': 1}
+    assert os.listdir(tmp_path / "images") == ["page1_img1.png"]
+
+
+def test_ocr_cache_batches_access_times_and_evicts_by_them(tmp_path):
+    cache = OCRCache(str(tmp_path / "ocr.sqlite"), max_bytes=300, touch_batch=100)
+    cache.put('a', 'x' * 100)
+    cache.put('b', 'x' * 100)
+    before = cache.conn.total_changes
+    assert cache.get('a') == 'x' * 100
+    assert cache.conn.total_changes == before
+
+    # The pending hit on 'a' is written before eviction, so 'b' is the least recently used.
+    cache.put('c', 'x' * 100)
+    assert cache.get('a') is not None and cache.get('b') is None and cache.get('c') is not None
+    cache.close()
@@ -0,0 +1,73 @@
+import threading
+from typing import List, Optional
+import pytest
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import PreTrainedTokenizerFast, T5Config, T5ForConditionalGeneration
+import config
+import llm_qa
+
+WORDS = "alpha beta gamma delta growth bank sector page answer question context source".split()
+
+
+@pytest.fixture(scope='module')
+def tiny_seq2seq():
+    vocab = {'<pad>': 0, '</s>': 1, '<unk>': 2}
+    vocab.update({word: i + 3 for i, word in enumerate(WORDS)})
+    backend = Tokenizer(models.WordLevel(vocab, unk_token='<unk>'))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token='<pad>', eos_token='</s>',
+                                        unk_token='<unk>', model_max_length=512)
+    torch.manual_seed(0)
+    model = T5ForConditionalGeneration(T5Config(
+        vocab_size=len(vocab), d_model=16, d_ff=32, d_kv=8, num_layers=1, num_heads=2,
+        decoder_start_token_id=0, pad_token_id=0, eos_token_id=1))
+    model.eval()
+    # An untrained model mostly predicts padding; suppress it so answers contain words.
+    model.generation_config.suppress_tokens = [0, 2]
+    return tokenizer, model
+
+
+@pytest.fixture
+def qa(tiny_seq2seq, monkeypatch):
+    monkeypatch.setattr(llm_qa, 'load_seq2seq', lambda model_name, backend: tiny_seq2seq)
+    monkeypatch.setattr(config, 'MAX_OUTPUT_TOKENS', 24)
+    return llm_qa.LLMQA('tiny', batch_size=4, max_wait_ms=300)
+
+
+def test_streamed_and_plain_requests_share_a_batch(qa):
+    prompts = ["alpha beta question", "gamma delta bank sector", "growth page", "answer context source alpha"]
+    pieces: List[List[str]] = [[], []]
+    finished = [threading.Event(), threading.Event()]
+
+    def sink_for(i: int):
+        def sink(piece: Optional[str]) -> None:
+            if piece is None:
+                finished[i].set()
+            else:
+                pieces[i].append(piece)
+        return sink
+
+    futures = [qa.queue.submit(prompts[0], sink_for(0)), qa.queue.submit(prompts[1], sink_for(1)),
+               qa.queue.submit(prompts[2]), qa.queue.submit(prompts[3])]
+    outputs = [future.result(timeout=30) for future in futures]
+
+    assert all(event.wait(5) for event in finished)
+    for i in range(2):
+        assert outputs[i].strip() and ''.join(pieces[i]).strip() == outputs[i].strip()
+    stats = qa.queue_stats()
+    assert stats['batches'] == 1 and stats['streamed'] == 2 and stats['last_batch_size'] == 4
+
+
+def test_stream_answer_matches_generate_answer(qa):
+    chunks = [{'content': "growth in the bank sector", 'source': 'Page 1', 'page': 1, 'type': 'text'}]
+    streamed = ''.join(qa.stream_answer("growth question", chunks)).strip()
+    assert streamed and streamed == qa.generate_answer("growth question", chunks)
+
+
+def test_failed_batch_ends_the_stream(qa, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("out of memory")
+    monkeypatch.setattr(qa.model, 'generate', broken)
+    chunks = [{'content': "alpha", 'source': 'Page 1', 'page': 1, 'type': 'text'}]
+    assert list(qa.stream_answer("alpha", chunks)) == [llm_qa.ERROR_ANSWER]
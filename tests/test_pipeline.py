@@ -0,0 +1,88 @@
+import json
+import os
+from typing import Dict
+import pytest
+import config
+from chunk_store import ColumnarChunkStore
+from conftest import HashEmbeddings, write_pdf
+from document_processor import DocumentProcessor
+from ingest import stream_ingest
+from pipeline import PipelineContext, PipelineRunner, document_stages
+from vector_store import VectorStore
+
+
+@pytest.fixture
+def pipeline_paths(tmp_path, monkeypatch) -> Dict[str, str]:
+    for name, filename in [('EXTRACTED_ELEMENTS_PATH', 'elements.json'), ('SPLIT_CHUNKS_PATH', 'split.json'),
+                           ('CHUNKS_PATH', 'chunks.json'), ('CHUNK_EMBEDDINGS_PATH', 'vectors.npy'),
+                           ('CHUNK_HASHES_PATH', 'vectors.json'), ('OCR_CACHE_PATH', 'ocr.sqlite'),
+                           ('IMAGES_DIR', 'images')]:
+        monkeypatch.setattr(config, name, str(tmp_path / filename))
+    monkeypatch.setattr(config, 'EXTRACTION_WORKERS', 1)
+    repeated = [f"line {i} of the repeated disclaimer text" for i in range(10)]
+    return {
+        'pdf': write_pdf(str(tmp_path / "report.pdf"),
+                         [[f"page one line {i} about fiscal policy" for i in range(25)], repeated, repeated]),
+        'index': str(tmp_path / "index" / "faiss_index"),
+        'state': str(tmp_path / "state.json"),
+    }
+
+
+def run_stages(paths: Dict[str, str]) -> Dict[str, Dict]:
+    context = PipelineContext()
+    context._embeddings = HashEmbeddings()
+    runner = PipelineRunner(paths['state'], context)
+    report = runner.run(document_stages(paths['pdf'], paths['index']))
+    return {row['stage']: row for row in report}
+
+
+def test_dedup_is_its_own_stage_with_counts(pipeline_paths):
+    report = run_stages(pipeline_paths)
+    assert list(report) == ['extract', 'chunk', 'dedup', 'embed', 'index']
+    assert report['dedup']['metrics']['exact'] >= 1
+    assert report['dedup']['metrics']['kept'] + report['dedup']['metrics']['exact'] == report['chunk']['metrics']['chunks']
+    assert os.path.exists(os.path.join(pipeline_paths['index'], "index.faiss"))
+
+    rerun = run_stages(pipeline_paths)
+    assert all(row['status'] == 'skipped' for row in rerun.values())
+    assert rerun['dedup']['metrics'] == report['dedup']['metrics']
+
+
+def test_changing_chunk_size_does_not_reextract(pipeline_paths, monkeypatch):
+    run_stages(pipeline_paths)
+    monkeypatch.setattr(config, 'MAX_CHUNK_SIZE', 200)
+    report = run_stages(pipeline_paths)
+    assert report['extract']['status'] == 'skipped'
+    assert report['chunk']['status'] == 'ran' and report['dedup']['status'] == 'ran'
+
+
+def test_streamed_dedup_counts_are_live(pipeline_paths):
+    with DocumentProcessor(pipeline_paths['pdf'], use_ocr_cache=False) as processor:
+        chunks = processor.iter_chunks()
+        next(chunks)
+        assert processor.dedup_stats['kept'] == 1
+        rest = list(chunks)
+    assert processor.dedup_stats['kept'] == 1 + len(rest) and processor.dedup_stats['exact'] >= 1
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_stream_ingest_spills_chunks_to_disk(pipeline_paths, embeddings, monkeypatch, workers):
+    monkeypatch.setattr(config, 'EXTRACTION_WORKERS', workers)
+    monkeypatch.setattr(config, 'STREAM_PAGES_PER_TASK', 1)
+    store = stream_ingest(pipeline_paths['pdf'], pipeline_paths['index'], batch_size=8,
+                          vector_store=VectorStore(embeddings=embeddings), chunks_path=config.CHUNKS_PATH)
+
+    assert isinstance(store.chunks, ColumnarChunkStore) and store.vectorstore is None
+    with open(config.CHUNKS_PATH, encoding='utf-8') as f:
+        written = json.load(f)
+    assert [chunk['content'] for chunk in store.chunks] == [chunk['content'] for chunk in written]
+    assert [chunk['page'] for chunk in written] == sorted(chunk['page'] for chunk in written)
+    target = written[3]['content']
+    vector = embeddings.embed_documents([target])[0]
+    assert store.search_by_vector(vector, k=1)[0]['chunk']['content'] == target
+
+    reloaded = VectorStore(embeddings=embeddings)
+    reloaded.load(pipeline_paths['index'])
+    assert reloaded.search_by_vector(vector, k=1)[0]['chunk']['content'] == target
+    assert reloaded.search("repeated disclaimer", k=1, mode='hybrid')
+    assert reloaded.remove_document('report.pdf') == len(written)
@@ -0,0 +1,177 @@
+import os
+import pickle
+from typing import Any, Dict, List
+import pytest
+from langchain_community.vectorstores import FAISS
+from faiss_index import INDEX_TYPES, default_index_settings
+from vector_store import VectorStore
+
+INDEX_SETTINGS = dict(default_index_settings(), nlist=4, nprobe=4, pq_m=4, pq_nbits=8, hnsw_m=8)
+
+
+def make_chunks(document: str, count: int) -> List[Dict[str, Any]]:
+    return [
+        {'content': f"{document} paragraph {i} about topic {i % 7}", 'page': i // 10 + 1,
+         'type': 'text', 'source': f"Page {i // 10 + 1}", 'document': document}
+        for i in range(count)
+    ]
+
+
+def assert_aligned(store: VectorStore) -> None:
+    """Every FAISS label must map to the chunk record at the same position."""
+    vectorstore = store.vectorstore
+    assert vectorstore.index.ntotal == len(store.chunks) == len(vectorstore.index_to_docstore_id)
+    for position, chunk in enumerate(store.chunks):
+        document = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        assert document.metadata['chunk_id'] == chunk['chunk_id']
+        assert document.page_content == chunk['content']
+
+
+def top_ids(store: VectorStore, query: str, k: int = 5, **options: Any) -> List[int]:
+    return [result['chunk']['chunk_id'] for result in store.search(query, k=k, **options)]
+
+
+@pytest.mark.parametrize('index_type', ['flat', 'ivf_flat', 'ivf_pq', 'hnsw'])
+def test_add_remove_search_add(embeddings, index_type):
+    store = VectorStore(embeddings=embeddings, index_settings=dict(INDEX_SETTINGS, index_type=index_type))
+    store.create_embeddings(make_chunks('a.pdf', 150) + make_chunks('b.pdf', 150))
+    assert store.built_index_type == index_type
+
+    assert store.remove_document('a.pdf') == 150
+    assert_aligned(store)
+    assert set(store.document_chunks) == {'b.pdf'}
+    for mode in ('dense', 'hybrid'):
+        results = store.search("b.pdf paragraph 42 about topic 0", k=5, mode=mode)
+        assert results and all(result['chunk']['document'] == 'b.pdf' for result in results)
+    filtered = store.search("paragraph", k=5, pages=(2, 2), mode='dense')
+    assert filtered and all(result['chunk']['page'] == 2 for result in filtered)
+
+    store.add_document('c.pdf', make_chunks('c.pdf', 20))
+    assert_aligned(store)
+    query = "c.pdf paragraph 3 about topic 3"
+    expected = next(chunk['chunk_id'] for chunk in store.chunks if chunk['content'] == query)
+    assert expected in top_ids(store, query, mode='dense')
+    assert expected in top_ids(store, query, mode='hybrid')
+    assert len(set(chunk['chunk_id'] for chunk in store.chunks)) == len(store.chunks)
+
+
+@pytest.mark.parametrize('index_type', ['flat', 'ivf_flat'])
+def test_replace_document_keeps_unchanged_chunks(embeddings, index_type):
+    store = VectorStore(embeddings=embeddings, index_settings=dict(INDEX_SETTINGS, index_type=index_type))
+    store.create_embeddings(make_chunks('a.pdf', 200))
+    before = {chunk['content']: chunk['chunk_id'] for chunk in store.chunks}
+
+    edited = make_chunks('a.pdf', 200)
+    edited[5]['content'] = "a.pdf rewritten paragraph"
+    stats = store.replace_document('a.pdf', edited)
+
+    assert stats == {'added': 1, 'removed': 1, 'unchanged': 199}
+    assert_aligned(store)
+    after = {chunk['content']: chunk['chunk_id'] for chunk in store.chunks}
+    assert after["a.pdf paragraph 6 about topic 6"] == before["a.pdf paragraph 6 about topic 6"]
+    assert after["a.pdf rewritten paragraph"] in top_ids(store, "a.pdf rewritten paragraph", mode='dense')
+
+
+def test_legacy_store_with_uuid_docstore_ids_can_be_edited(embeddings, tmp_path):
+    chunks = make_chunks('a.pdf', 30) + make_chunks('b.pdf', 30)
+    path = str(tmp_path / "vector_store")
+    # Older versions let LangChain pick uuid docstore ids and pickled the chunk list without chunk ids.
+    legacy = FAISS.from_texts([chunk['content'] for chunk in chunks], embeddings,
+                              metadatas=[{key: chunk[key] for key in ('page', 'type', 'source')} for chunk in chunks])
+    legacy.save_local(path)
+    with open(f"{path}_chunks.pkl", 'wb') as f:
+        pickle.dump(chunks, f)
+    assert os.path.exists(os.path.join(path, "index.pkl"))
+
+    store = VectorStore(embeddings=embeddings)
+    store.load(path)
+    assert_aligned(store)
+    assert store.remove_document('a.pdf') == 30
+    assert_aligned(store)
+    stats = store.replace_document('b.pdf', make_chunks('b.pdf', 29))
+    assert stats == {'added': 0, 'removed': 1, 'unchanged': 29}
+    assert_aligned(store)
+
+
+def test_save_writes_no_pickled_docstore(embeddings, tmp_path):
+    store = VectorStore(embeddings=embeddings, index_settings=dict(INDEX_SETTINGS, index_type='ivf_flat'))
+    store.create_embeddings(make_chunks('a.pdf', 300))
+    path = str(tmp_path / "vector_store")
+    store.save(path)
+    assert sorted(os.listdir(path)) == ["index.faiss"]
+
+    loaded = VectorStore(embeddings=embeddings)
+    loaded.load(path)
+    assert loaded.built_index_type == 'ivf_flat'
+    assert_aligned(loaded)
+    query = "a.pdf paragraph 17 about topic 3"
+    assert top_ids(loaded, query, mode='dense') == top_ids(store, query, mode='dense')
+
+
+def test_rebuild_leaves_mapped_readers_intact_and_reload_releases_them(embeddings, tmp_path):
+    path = str(tmp_path / "vector_store")
+    writer = VectorStore(embeddings=embeddings)
+    writer.create_embeddings(make_chunks('a.pdf', 40))
+    writer.save(path)
+
+    reader = VectorStore(embeddings=embeddings)
+    reader.load(path, mmap=True)
+    mapped = reader.chunks
+    vector = embeddings.embed_query("a.pdf paragraph 12 about topic 5")
+
+    # Rebuilding in place must replace the files, not rewrite the ones the reader has mapped.
+    writer.create_embeddings(make_chunks('b.pdf', 90))
+    writer.save(path)
+    assert reader.search_by_vector(vector, k=1)[0]['chunk']['content'] == "a.pdf paragraph 12 about topic 5"
+    assert all(chunk['document'] == 'a.pdf' for chunk in reader.chunks)
+
+    reader.load(path, mmap=True)
+    assert mapped.columns == {} and len(mapped) == 0
+    assert len(reader.chunks) == 90 and reader.bm25 is not None
+    assert not [name for name in os.listdir(path) if name.endswith('.tmp')]
+
+
+@pytest.mark.parametrize('index_type', INDEX_TYPES)
+def test_mmap_load_opens_every_index_type(embeddings, tmp_path, index_type):
+    store = VectorStore(embeddings=embeddings, index_settings=dict(INDEX_SETTINGS, index_type=index_type))
+    store.create_embeddings(make_chunks('a.pdf', 300))
+    assert store.built_index_type == index_type
+    path = str(tmp_path / "vector_store")
+    store.save(path)
+
+    loaded = VectorStore(embeddings=embeddings)
+    loaded.load(path, mmap=True)
+    assert loaded.mmap_index is not None and loaded.built_index_type == index_type
+    vector = embeddings.embed_query("a.pdf paragraph 17 about topic 3")
+    expected = [result['chunk']['chunk_id'] for result in store.search_by_vector(vector, k=5)]
+    assert [result['chunk']['chunk_id'] for result in loaded.search_by_vector(vector, k=5)] == expected
+
+
+@pytest.mark.parametrize('index_type', ['ivf_flat', 'ivf_pq'])
+def test_documents_added_one_by_one_train_the_configured_index(embeddings, index_type):
+    store = VectorStore(embeddings=embeddings, index_settings=dict(INDEX_SETTINGS, index_type=index_type))
+    store.add_document('a.pdf', make_chunks('a.pdf', 120))
+    assert store.built_index_type == 'flat'
+
+    store.add_document('b.pdf', make_chunks('b.pdf', 180))
+    assert store.built_index_type == index_type
+    assert_aligned(store)
+    vector = embeddings.embed_query("b.pdf paragraph 42 about topic 0")
+    assert store.search_by_vector(vector, k=1)[0]['chunk']['content'] == "b.pdf paragraph 42 about topic 0"
+
+
+@pytest.mark.parametrize('index_type,count', [('flat', 130), ('ivf_flat', 300), ('ivf_flat', 100), ('hnsw', 130)])
+def test_streaming_to_disk_adds_batches_to_the_index(embeddings, tmp_path, index_type, count):
+    path = str(tmp_path / "vector_store")
+    store = VectorStore(embeddings=embeddings, index_settings=dict(INDEX_SETTINGS, index_type=index_type))
+    assert store.create_embeddings_streaming(iter(make_chunks('a.pdf', count)), batch_size=32, filepath=path) == count
+    # Too few vectors to train IVF falls back to flat, as create_embeddings does.
+    assert store.built_index_type == (index_type if count >= 156 or index_type != 'ivf_flat' else 'flat')
+    assert len(store.chunks) == store.mmap_index.ntotal == count
+
+    loaded = VectorStore(embeddings=embeddings)
+    loaded.load(path)
+    assert_aligned(loaded)
+    for found in (store, loaded):
+        vector = embeddings.embed_query("a.pdf paragraph 57 about topic 1")
+        assert found.search_by_vector(vector, k=1)[0]['chunk']['content'] == "a.pdf paragraph 57 about topic 1"
@@ -1,7 +1,8 @@
 """
 Utility functions for the Multi-Modal RAG system.
 """
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator
 import os
 
 
@@ -54,13 +55,44 @@ def validate_query(query: str, max_length: int = 500) -> str:
     return cleaned
 
 
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups: trim, collapse whitespace, lowercase."""
+    return " ".join(query.split()).lower()
+
+
+def memory_usage_mb() -> float:
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def replace_atomically(path: str) -> Iterator[str]:
+    """Yield a temporary path to write, then move it over path.
+
+    The old file is replaced rather than truncated, so a process that memory-maps it keeps a valid mapping.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def check_system_health() -> Dict[str, Any]:
     """Check system health and return status."""
     import config
 
     status = {
         'vector_store_exists': file_exists(f"{config.VECTOR_STORE_PATH}.faiss") or
-                               os.path.exists(os.path.join(config.VECTOR_STORE_PATH, "index.faiss")),
+                               os.path.exists(os.path.join(config.VECTOR_STORE_PATH, "index.faiss")) or
+                               file_exists(config.CORPUS_MANIFEST_PATH),
         'chunks_exist': file_exists(config.CHUNKS_PATH),
         'pdf_exists': file_exists(config.PDF_PATH),
         'directories_exist': all(os.path.isdir(d) for d in [
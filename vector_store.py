@@ -3,56 +3,412 @@ Vector store module for managing embeddings and similarity search.
 """
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_core.documents import Document
+import hashlib
+import json
+import os
+import copy
 import pickle
-from typing import List, Dict, Any, Optional
+import time
+import faiss
+import numpy as np
+from chunk_store import ColumnarChunkStore, ColumnarChunkWriter
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from utils import count_chunks_by_type, normalize_query, replace_atomically
+from lru_cache import LRUCache
+import config
+import inference_backend
+from faiss_index import (default_index_settings, build_index, apply_search_params, reconstruct_vectors,
+                         filtered_search, min_training_size, read_index_mmap)
+from metadata_filter import MetadataFilterIndex, make_filters, filter_key
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Union
+
+
+def load_embeddings(model_name: str = 'sentence-transformers/all-MiniLM-L6-v2',
+                    backend: str = config.EMBEDDING_BACKEND) -> HuggingFaceEmbeddings:
+    """Load the sentence embedding model used by the vector stores on the configured CPU backend."""
+    return inference_backend.load_embeddings(model_name, backend)
 
 
 class VectorStore:
     """Manages document embeddings using FAISS for similarity search."""
-    def __init__(self, model_name: str = 'sentence-transformers/all-MiniLM-L6-v2') -> None:
-        print(f"Loading embedding model: {model_name}")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+    def __init__(self, model_name: str = 'sentence-transformers/all-MiniLM-L6-v2',
+                 embeddings: Optional[HuggingFaceEmbeddings] = None,
+                 index_settings: Optional[Dict[str, Any]] = None) -> None:
+        if embeddings is None:
+            print(f"Loading embedding model: {model_name}")
+            embeddings = load_embeddings(model_name)
+        self.embeddings = embeddings
         self.vectorstore: Optional[FAISS] = None
-        self.chunks: List[Dict[str, Any]] = []
+        self.chunks: Union[List[Dict[str, Any]], ColumnarChunkStore] = []
+        self.document_chunks: Dict[str, List[int]] = {}
+        self.next_chunk_id: int = 0
+        self.index_settings: Dict[str, Any] = dict(index_settings or default_index_settings())
+        self.built_index_type: Optional[str] = None
+        # A raw index searched without the LangChain wrapper, opened through mmap or built by streaming to
+        # disk; the store is read-only while it is set.
+        self.mmap_index: Optional[faiss.Index] = None
+        self.embedding_cache = LRUCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+        self.search_cache = LRUCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+        self.bm25: Optional[BM25Index] = None
+        self.filter_index: Optional[MetadataFilterIndex] = None
+        # Bumped whenever the indexed chunks change, so downstream caches can tell.
+        self.index_version: int = 0
 
         print("Embedding model loaded successfully")
         
-    def create_embeddings(self, chunks: List[Dict[str, Any]]) -> None:
-        """Create embeddings for chunks and build FAISS index."""
-        if not chunks:
-            print("No chunks provided for embedding")
-            return
+    @staticmethod
+    def content_hash(chunk: Dict[str, Any]) -> str:
+        """Hash the chunk text, which is all the embedding depends on."""
+        return hashlib.sha256(chunk['content'].encode('utf-8')).hexdigest()
+
+    def _prepare_chunks(self, chunks: List[Dict[str, Any]],
+                        document: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Copy chunks and stamp them with a fresh chunk id, content hash and document."""
+        prepared: List[Dict[str, Any]] = []
+        for chunk in chunks:
+            chunk = dict(chunk)
+            if document is not None:
+                chunk['document'] = document
+            chunk['chunk_id'] = self.next_chunk_id
+            chunk['content_hash'] = self.content_hash(chunk)
+            self.next_chunk_id += 1
+            prepared.append(chunk)
+        return prepared
 
-        self.chunks = chunks
+    @staticmethod
+    def _to_documents(chunks: List[Dict[str, Any]]) -> List[Document]:
+        """Convert prepared chunk dicts into LangChain documents."""
         documents: List[Document] = []
-        for i, chunk in enumerate(chunks):
+        for chunk in chunks:
             doc = Document(
                 page_content=chunk['content'],
                 metadata={
                     'page': chunk['page'],
                     'type': chunk['type'],
                     'source': chunk['source'],
-                    'chunk_id': i
+                    'document': chunk.get('document'),
+                    'chunk_id': chunk['chunk_id']
                 }
             )
             documents.append(doc)
-        
-        print("Building FAISS index...")
-        self.vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
-        )
-        
+        return documents
+
+    def _docstore_from_chunks(self) -> None:
+        """Fill the LangChain docstore from the chunk records so position i holds chunk i under str(chunk_id).
+
+        The docstore is not saved; it is rebuilt on load, which also re-keys stores from older versions
+        whose uuid docstore ids remove_document and replace_document cannot address.
+        """
+        ids = [str(chunk['chunk_id']) for chunk in self.chunks]
+        if len(ids) != self.vectorstore.index.ntotal:
+            raise ValueError(f"Index holds {self.vectorstore.index.ntotal} vectors but the chunk store "
+                             f"holds {len(ids)} chunks; rebuild the index")
+        self.vectorstore.docstore = InMemoryDocstore(dict(zip(ids, self._to_documents(list(self.chunks)))))
+        self.vectorstore.index_to_docstore_id = dict(enumerate(ids))
+
+    def _rebuild_document_map(self) -> None:
+        """Recompute the document -> chunk id mapping from the chunk list."""
+        if isinstance(self.chunks, ColumnarChunkStore):
+            self.document_chunks = self.chunks.document_chunk_ids()
+            return
+        self.document_chunks = {}
+        for chunk in self.chunks:
+            document = chunk.get('document')
+            if document is not None:
+                self.document_chunks.setdefault(document, []).append(chunk['chunk_id'])
+
+    def create_embeddings(self, chunks: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None) -> None:
+        """Create embeddings for chunks and build FAISS index; precomputed vectors skip the embedding pass."""
+        if not chunks:
+            print("No chunks provided for embedding")
+            return
+
+        self._release()
+        self.next_chunk_id = 0
+        self.chunks = self._prepare_chunks(chunks)
+        documents = self._to_documents(self.chunks)
+
+        print(f"Building FAISS index ({self.index_settings['index_type']})...")
+        self.vectorstore = self._new_vectorstore(documents, [str(chunk['chunk_id']) for chunk in self.chunks], vectors)
+        self._rebuild_document_map()
+
         print(f"FAISS index with {len(documents)} vectors")
 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar chunks based on query."""
+    def _new_vectorstore(self, documents: List[Document], ids: List[str],
+                         vectors: Optional[np.ndarray] = None) -> FAISS:
+        """Embed documents and build a LangChain FAISS store on an index of the configured type."""
+        texts = [doc.page_content for doc in documents]
+        if vectors is None:
+            vectors = self.embeddings.embed_documents(texts)
+        vectors = np.asarray(vectors, dtype='float32')
+        index, self.built_index_type = build_index(vectors, self.index_settings)
+
+        vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={}
+        )
+        vectorstore.add_embeddings(
+            list(zip(texts, vectors.tolist())),
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids
+        )
+        return vectorstore
+
+    def reindex(self) -> None:
+        """Rebuild the FAISS index with the current settings from the stored vectors, without re-embedding."""
+        if self.vectorstore is None:
+            return
+        vectors = np.ascontiguousarray(reconstruct_vectors(self.vectorstore.index), dtype='float32')
+        index, self.built_index_type = build_index(vectors, self.index_settings)
+        index.add(vectors)
+        self.vectorstore.index = index
+        self.search_cache.clear()
+        print(f"Rebuilt FAISS index as {self.built_index_type} with {index.ntotal} vectors")
+
+    def _add_prepared(self, chunks: List[Dict[str, Any]], train: bool = True) -> None:
+        """Embed prepared chunks and append them to the index; train=False leaves a flat fallback as is."""
+        if not chunks:
+            return
+        self._check_writable()
+        self._index_changed()
+
+        documents = self._to_documents(chunks)
+        ids = [str(chunk['chunk_id']) for chunk in chunks]
         if self.vectorstore is None:
+            self.vectorstore = self._new_vectorstore(documents, ids)
+        else:
+            self.vectorstore.add_documents(documents, ids=ids)
+        self._mutable_chunks().extend(chunks)
+        for chunk in chunks:
+            document = chunk.get('document')
+            if document is not None:
+                self.document_chunks.setdefault(document, []).append(chunk['chunk_id'])
+
+        # A store started on too little data to train falls back to flat; switch to the configured
+        # index as soon as there is enough, or incrementally built stores would stay flat for good.
+        if (train and self.built_index_type != self.index_settings['index_type']
+                and self.vectorstore.index.ntotal >= min_training_size(self.index_settings)):
+            self.reindex()
+
+    def _delete_chunk_ids(self, chunk_ids: Iterable[int]) -> None:
+        """Remove vectors and chunk records for the given chunk ids."""
+        chunk_ids = set(chunk_ids)
+        if not chunk_ids:
+            return
+        self._check_writable()
+        self._index_changed()
+        if self.vectorstore is not None:
+            ids = [str(chunk_id) for chunk_id in chunk_ids]
+            if isinstance(self.vectorstore.index, faiss.IndexFlat):
+                # A flat index shifts later vectors down, matching LangChain's compacted position map.
+                self.vectorstore.delete(ids)
+            else:
+                # IVF remove_ids keeps the old labels and HNSW cannot remove at all; rebuilding keeps
+                # FAISS label == position, which the chunk store, BM25 and filter positions rely on.
+                self._delete_by_rebuild(ids)
+        self.chunks = [chunk for chunk in self._mutable_chunks() if chunk['chunk_id'] not in chunk_ids]
+        self._rebuild_document_map()
+
+    def _release(self) -> None:
+        """Drop the index, chunk store and BM25 arrays before a reload or rebuild.
+
+        Memory-mapped files are unmapped once nothing refers to them, and the old and new copies are
+        never held at the same time.
+        """
+        self.vectorstore = None
+        self.mmap_index = None
+        if isinstance(self.chunks, ColumnarChunkStore):
+            self.chunks.close()
+        self.chunks = []
+        self.document_chunks = {}
+        self._index_changed()
+
+    def _index_changed(self) -> None:
+        """Invalidate cached results, the BM25 index and the filter position sets after the indexed chunks change."""
+        self.search_cache.clear()
+        self.bm25 = None
+        self.filter_index = None
+        self.index_version += 1
+
+    def _mutable_chunks(self) -> List[Dict[str, Any]]:
+        """Materialize a loaded columnar chunk store into a list before modifying it."""
+        if isinstance(self.chunks, ColumnarChunkStore):
+            self.chunks = self.chunks.to_list()
+        return self.chunks
+
+    def chunk_type_counts(self) -> Dict[str, int]:
+        """Return chunk counts per type, precomputed when loaded from a columnar store."""
+        if isinstance(self.chunks, ColumnarChunkStore):
+            return self.chunks.type_counts
+        return count_chunks_by_type(self.chunks)
+
+    def _check_writable(self) -> None:
+        """Refuse to modify a store that was opened read-only through mmap."""
+        if self.mmap_index is not None:
+            raise RuntimeError("Vector store was loaded with mmap=True or streamed to disk and is read-only; "
+                               "reload it with mmap=False to modify it")
+
+    def _delete_by_rebuild(self, ids: List[str]) -> None:
+        """Drop vectors by re-adding the ones that remain to an emptied copy of the trained index."""
+        positions = {docstore_id: position for position, docstore_id in self.vectorstore.index_to_docstore_id.items()}
+        drop = {positions[docstore_id] for docstore_id in ids if docstore_id in positions}
+        vectors = reconstruct_vectors(self.vectorstore.index)
+        keep = [position for position in range(len(vectors)) if position not in drop]
+
+        kept_vectors = np.ascontiguousarray(vectors[keep], dtype='float32')
+        index = faiss.clone_index(self.vectorstore.index)
+        index.reset()
+        index.add(kept_vectors)
+        apply_search_params(index, self.index_settings)
+
+        self.vectorstore.docstore.delete([docstore_id for docstore_id in ids if docstore_id in positions])
+        self.vectorstore.index_to_docstore_id = {
+            new_position: self.vectorstore.index_to_docstore_id[old_position]
+            for new_position, old_position in enumerate(keep)
+        }
+        self.vectorstore.index = index
+
+    def add_chunks(self, chunks: List[Dict[str, Any]]) -> None:
+        """Embed a batch of chunks and append them to the index."""
+        self._add_prepared(self._prepare_chunks(chunks))
+
+    def create_embeddings_streaming(self, chunks: Iterable[Dict[str, Any]], batch_size: int = 64,
+                                    filepath: Optional[str] = None) -> int:
+        """Build the index from a chunk iterator, embedding fixed-size batches as they arrive.
+
+        With filepath, each embedded batch is spilled to the chunk store on disk and dropped from memory,
+        so only the vectors stay resident; the finished store is saved there and left open read-only.
+        """
+        self._release()
+        self.next_chunk_id = 0
+        if filepath is not None:
+            return self._stream_to_disk(chunks, batch_size, filepath)
+        batch: List[Dict[str, Any]] = []
+
+        print(f"Streaming chunks into FAISS index (batch size {batch_size})...")
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                self._add_prepared(self._prepare_chunks(batch), train=False)
+                batch = []
+        self._add_prepared(self._prepare_chunks(batch), train=False)
+
+        # The first batch is usually too small to train an ANN index, so train once at the end.
+        if self.built_index_type != self.index_settings['index_type']:
+            self.reindex()
+
+        print(f"FAISS index with {len(self.chunks)} vectors")
+        return len(self.chunks)
+
+    def _stream_to_disk(self, chunks: Iterable[Dict[str, Any]], batch_size: int, filepath: str) -> int:
+        """Embed batches into the index while their chunk records are appended to the on-disk store.
+
+        Vectors are buffered only until there are enough to train the configured index; every later
+        batch is added as it arrives, so the vector matrix is never held twice.
+        """
+        writer = ColumnarChunkWriter(f"{filepath}_chunks")
+        training_size = max(1, min_training_size(self.index_settings))
+        pending: List[np.ndarray] = []
+        batch: List[Dict[str, Any]] = []
+
+        def flush() -> None:
+            prepared = self._prepare_chunks(batch)
+            embedded = self.embeddings.embed_documents([chunk['content'] for chunk in prepared])
+            vectors = np.ascontiguousarray(embedded, dtype='float32')
+            writer.append(prepared)
+            batch.clear()
+            if self.mmap_index is not None:
+                self.mmap_index.add(vectors)
+                return
+            pending.append(vectors)
+            if sum(len(block) for block in pending) >= training_size:
+                self._build_streamed_index(pending)
+
+        print(f"Streaming chunks into FAISS index (batch size {batch_size}, spilling to {filepath}_chunks)...")
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        self.chunks = writer.close(mmap=True)
+        if self.mmap_index is None:
+            if not pending:
+                print("No chunks provided for embedding")
+                return 0
+            # Too few vectors to train the configured index; build_index falls back to flat.
+            self._build_streamed_index(pending)
+        self.document_chunks = self.chunks.document_chunk_ids()
+        self.save(filepath)
+
+        print(f"FAISS index with {self.mmap_index.ntotal} vectors")
+        return self.mmap_index.ntotal
+
+    def _build_streamed_index(self, pending: List[np.ndarray]) -> None:
+        """Train the streamed index on the buffered vectors, add them, and empty the buffer."""
+        training = np.concatenate(pending)
+        pending.clear()
+        self.mmap_index, self.built_index_type = build_index(training, self.index_settings)
+        self.mmap_index.add(training)
+
+    def add_document(self, document: str, chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Add a document's chunks, or update them if the document is already indexed."""
+        return self.replace_document(document, chunks)
+
+    def remove_document(self, document: str) -> int:
+        """Remove every vector belonging to a document without rebuilding the index."""
+        chunk_ids = self.document_chunks.get(document, [])
+        self._delete_chunk_ids(chunk_ids)
+        print(f"Removed {len(chunk_ids)} vectors for {document}")
+        return len(chunk_ids)
+
+    def replace_document(self, document: str, chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Re-index a document, embedding only chunks whose content hash changed."""
+        self._check_writable()
+        self._index_changed()
+        existing: Dict[str, List[Dict[str, Any]]] = {}
+        owned = set(self.document_chunks.get(document, []))
+        for chunk in self._mutable_chunks():
+            if chunk['chunk_id'] in owned:
+                existing.setdefault(chunk['content_hash'], []).append(chunk)
+
+        unchanged = 0
+        new_chunks: List[Dict[str, Any]] = []
+        for chunk in chunks:
+            matches = existing.get(self.content_hash(chunk))
+            if matches:
+                kept = matches.pop(0)
+                kept.update(page=chunk['page'], type=chunk['type'], source=chunk['source'])
+                if self.vectorstore is not None:
+                    stored = self.vectorstore.docstore.search(str(kept['chunk_id']))
+                    if isinstance(stored, Document):
+                        stored.metadata.update(page=kept['page'], type=kept['type'], source=kept['source'])
+                unchanged += 1
+            else:
+                new_chunks.append(chunk)
+
+        stale_ids = [chunk['chunk_id'] for matches in existing.values() for chunk in matches]
+        self._delete_chunk_ids(stale_ids)
+        self._add_prepared(self._prepare_chunks(new_chunks, document=document))
+
+        stats = {'added': len(new_chunks), 'removed': len(stale_ids), 'unchanged': unchanged}
+        print(f"Updated {document}: {stats['added']} added, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+        return stats
+
+    def search(self, query: str, k: int = 5, mode: Optional[str] = None,
+               types: Optional[Union[str, List[str]]] = None, pages: Optional[Tuple[int, int]] = None,
+               documents: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
+        """Search for similar chunks based on query, densely or fused with BM25 ('hybrid').
+
+        types, pages (inclusive range) and documents restrict the search inside the index.
+        """
+        if self.vectorstore is None and self.mmap_index is None:
             print("Vectorstore not created")
             return []
         if not query or not query.strip():
@@ -60,9 +416,178 @@ class VectorStore:
             return []
         if k < 1:
             k = 1
+        mode = mode or config.SEARCH_MODE
+        if mode not in ('dense', 'hybrid'):
+            raise ValueError(f"Unknown search mode '{mode}', expected 'dense' or 'hybrid'")
+
+        filters = make_filters(types, pages, documents)
+        start = time.perf_counter()
+        key = (normalize_query(query), k, mode, filter_key(filters))
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
 
-        results = self.vectorstore.similarity_search_with_score(query.strip(), k=k)
+        embedding = self.embed_query(query)
+        if mode == 'hybrid':
+            results = self.hybrid_search_by_vector(query, embedding, k, filters)
+        else:
+            results = self.search_by_vector(embedding, k, filters)
+        self.search_cache.put(key, copy.deepcopy(results), time.perf_counter() - start)
+        return results
+
+    def _lexical_index(self) -> BM25Index:
+        """Return the BM25 index, rebuilding it from the chunk texts after the index changed."""
+        if self.bm25 is None:
+            self.bm25 = BM25Index.build(chunk['content'] for chunk in self.chunks)
+        return self.bm25
+
+    def _filter_positions(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Resolve filters to the allowed FAISS positions, or None for an unfiltered search."""
+        if filters is None:
+            return None
+        if self.filter_index is None:
+            self.filter_index = MetadataFilterIndex.from_chunks(self.chunks)
+        return self.filter_index.positions(filters)
+
+    def _search_index(self, vectors: np.ndarray, k: int,
+                      allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Run the raw FAISS search, restricted to the allowed positions when a filter is set."""
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if allowed is None:
+            return self._active_index().search(vectors, k)
+        return filtered_search(self._active_index(), vectors, k, allowed)
+
+    def _distance_to(self, query_vector: np.ndarray, position: int, fallback: float) -> float:
+        """Squared L2 distance to a stored vector, on the same scale as FAISS scores."""
+        try:
+            vector = self._active_index().reconstruct(position)
+        except RuntimeError:
+            return fallback
+        return float(np.sum((vector - query_vector) ** 2))
+
+    def hybrid_candidates(self, query: str, embedding: List[float], candidates: int,
+                          filters: Optional[Dict[str, Any]] = None
+                          ) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
+        """Return the dense (position, distance) and BM25 (position, score) candidate lists, best first."""
+        if self._active_index() is None:
+            return [], []
+        allowed = self._filter_positions(filters)
+        if allowed is not None and len(allowed) == 0:
+            return [], []
+        distances, positions = self._search_index(np.asarray([embedding], dtype='float32'), candidates, allowed)
+        dense = [(int(p), float(d)) for d, p in zip(distances[0], positions[0]) if p >= 0]
+        return dense, self._lexical_index().search(query, candidates, allowed)
+
+    def hybrid_hit(self, position: int, embedding: List[float], distance: Optional[float],
+                   fallback: float) -> Tuple[Document, float]:
+        """Return a fused hit's document and dense distance, computing the distance for lexical-only hits."""
+        if distance is None:
+            distance = self._distance_to(np.asarray(embedding, dtype='float32'), position, fallback)
+        return self._document_at(position), distance
+
+    def hybrid_search_by_vector(self, query: str, embedding: List[float], k: int = 5,
+                                filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Fuse the dense and BM25 rankings with reciprocal rank fusion."""
+        dense, lexical = self.hybrid_candidates(query, embedding, max(k, config.HYBRID_CANDIDATES), filters)
+        fused = reciprocal_rank_fusion([[p for p, _ in dense], [p for p, _ in lexical]], config.RRF_K)[:max(1, k)]
+
+        # Lexical-only hits get their real dense distance so 'score' keeps one meaning.
+        distance_of = dict(dense)
+        worst = max(distance_of.values(), default=0.0)
+        hits = [self.hybrid_hit(position, embedding, distance_of.get(position), worst) for position, _ in fused]
+        results = self._format_results(hits)
+        for result, (_, fusion_score) in zip(results, fused):
+            result['fusion_score'] = fusion_score
+        return results
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing cached embeddings for repeated normalized queries."""
+        start = time.perf_counter()
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(key)
+            self.embedding_cache.put(key, embedding, time.perf_counter() - start)
+        return embedding
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hit rate and latency saved for the embedding and search caches."""
+        return {'embedding': self.embedding_cache.stats(), 'search': self.search_cache.stats()}
+
+    def search_by_vector(self, embedding: List[float], k: int = 5,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search with a precomputed query embedding."""
+        if filters is not None:
+            return self.search_by_vectors(np.asarray([embedding], dtype='float32'), k, filters)[0]
+        if self.mmap_index is not None:
+            return self._search_mmap(embedding, max(1, k))
+        if self.vectorstore is None:
+            return []
+        results = self.vectorstore.similarity_search_with_score_by_vector(embedding, k=max(1, k))
+        return self._format_results(results)
 
+    def _search_mmap(self, embedding: List[float], k: int) -> List[Dict[str, Any]]:
+        """Search the memory-mapped index and read only the hit chunks from the chunk store."""
+        return self.search_by_vectors(np.asarray([embedding], dtype='float32'), k)[0]
+
+    def _active_index(self) -> Optional[faiss.Index]:
+        """Return the raw FAISS index backing the store, whichever way it was loaded."""
+        if self.mmap_index is not None:
+            return self.mmap_index
+        if self.vectorstore is not None:
+            return self.vectorstore.index
+        return None
+
+    def _document_at(self, position: int) -> Document:
+        """Return the document stored at a FAISS position."""
+        if self.vectorstore is not None:
+            return self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+        record = self.chunks[position]
+        content = record.pop('content')
+        return Document(page_content=content, metadata=record)
+
+    def search_by_vectors(self, vectors: np.ndarray, k: int = 5,
+                          filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Run one FAISS matrix search for a batch of query embeddings."""
+        if self._active_index() is None or len(vectors) == 0:
+            return [[] for _ in range(len(vectors))]
+
+        distances, positions = self._search_index(vectors, max(1, k), self._filter_positions(filters))
+        batch_results: List[List[Dict[str, Any]]] = []
+        for row_distances, row_positions in zip(distances, positions):
+            hits = [
+                (self._document_at(int(position)), score)
+                for score, position in zip(row_distances, row_positions)
+                if position >= 0
+            ]
+            batch_results.append(self._format_results(hits))
+        return batch_results
+
+    def search_batch(self, queries: List[str], k: int = 5,
+                     types: Optional[Union[str, List[str]]] = None, pages: Optional[Tuple[int, int]] = None,
+                     documents: Optional[Union[str, List[str]]] = None) -> List[List[Dict[str, Any]]]:
+        """Search many queries with one batched embedding pass and one FAISS matrix search."""
+        batch_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if self._active_index() is None:
+            print("Vectorstore not created")
+            return batch_results
+
+        valid = [i for i, query in enumerate(queries) if query and query.strip()]
+        if not valid:
+            return batch_results
+
+        vectors = np.asarray(
+            self.embeddings.embed_documents([queries[i].strip() for i in valid]),
+            dtype='float32'
+        )
+        filters = make_filters(types, pages, documents)
+        for i, results in zip(valid, self.search_by_vectors(vectors, k, filters)):
+            batch_results[i] = results
+        return batch_results
+
+    @staticmethod
+    def _format_results(results: List[Tuple[Document, float]]) -> List[Dict[str, Any]]:
+        """Convert LangChain (document, score) pairs into ranked result dicts."""
         formatted_results: List[Dict[str, Any]] = []
         for i, (doc, score) in enumerate(results):
             formatted_results.append({
@@ -70,7 +595,9 @@ class VectorStore:
                     'content': doc.page_content,
                     'page': doc.metadata['page'],
                     'type': doc.metadata['type'],
-                    'source': doc.metadata['source']
+                    'source': doc.metadata['source'],
+                    'document': doc.metadata.get('document'),
+                    'chunk_id': doc.metadata.get('chunk_id')
                 },
                 'score': float(score),
                 'rank': i + 1
@@ -80,23 +607,93 @@ class VectorStore:
 
     def save(self, filepath: str = 'vector_store') -> None:
         """Save vector store and chunks to disk."""
-        if self.vectorstore is None:
+        index = self._active_index()
+        if index is None:
             print("No vectorstore to save")
             return
-        self.vectorstore.save_local(filepath)
+        # Only the raw index is written: chunk text and metadata live in the columnar store below,
+        # so LangChain's pickled docstore (index.pkl) would store every chunk a second time.
+        os.makedirs(filepath, exist_ok=True)
+        with replace_atomically(os.path.join(filepath, "index.faiss")) as tmp_path:
+            faiss.write_index(index, tmp_path)
+        stale_docstore = os.path.join(filepath, "index.pkl")
+        if os.path.exists(stale_docstore):
+            os.remove(stale_docstore)
+
+        # self.chunks is kept in FAISS position order, so chunk i belongs to vector i.
+        store = self.chunks
+        if not isinstance(store, ColumnarChunkStore):
+            store = ColumnarChunkStore.from_chunks(store)
+        chunks_dir = f"{filepath}_chunks"
+        # A store opened from (or streamed into) the target directory is already saved there.
+        if store.directory is None or os.path.abspath(store.directory) != os.path.abspath(chunks_dir):
+            store.save(chunks_dir)
+
+        with open(f"{filepath}_index.json", 'w', encoding='utf-8') as f:
+            json.dump(dict(self.index_settings, built_index_type=self.built_index_type), f, indent=2)
 
-        with open(f"{filepath}_chunks.pkl", 'wb') as f:
-            pickle.dump(self.chunks, f)
+        self._lexical_index().save(f"{filepath}_bm25")
 
-    def load(self, filepath: str = 'vector_store') -> None:
+    def _load_bm25(self, filepath: str, mmap: bool) -> None:
+        """Load the saved BM25 index, or leave it to be rebuilt on first hybrid search."""
+        bm25_dir = f"{filepath}_bm25"
+        self.bm25 = BM25Index.load(bm25_dir, mmap=mmap) if BM25Index.exists(bm25_dir) else None
+
+    def _load_index_settings(self, filepath: str) -> None:
+        """Restore the index settings saved next to the index."""
+        settings_path = f"{filepath}_index.json"
+        if os.path.exists(settings_path):
+            with open(settings_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.built_index_type = saved.pop('built_index_type', None)
+            self.index_settings.update(saved)
+        else:
+            self.built_index_type = 'flat'
+
+    def _load_mmap(self, filepath: str) -> None:
+        """Open the index and chunk store read-only through mmap, reading chunks lazily per hit."""
+        self._release()
+        self.mmap_index = read_index_mmap(os.path.join(filepath, "index.faiss"))
+        self._load_index_settings(filepath)
+        apply_search_params(self.mmap_index, self.index_settings)
+
+        self.chunks = ColumnarChunkStore.load(f"{filepath}_chunks", mmap=True)
+        self._load_bm25(filepath, mmap=True)
+        print(f"Memory-mapped vector store with {len(self.chunks)} chunks")
+
+    def load(self, filepath: str = 'vector_store', mmap: bool = False) -> None:
         """Load vector store and chunks from disk."""
-        self.vectorstore = FAISS.load_local(
-            filepath,
-            self.embeddings,
-            allow_dangerous_deserialization=True
+        if mmap and ColumnarChunkStore.exists(f"{filepath}_chunks"):
+            self._load_mmap(filepath)
+            return
+
+        self._release()
+        # The docstore is rebuilt from the chunk records, so no pickle is ever deserialized here.
+        self.vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.read_index(os.path.join(filepath, "index.faiss")),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={}
         )
-        with open(f"{filepath}_chunks.pkl", 'rb') as f:
-            self.chunks = pickle.load(f)
+        self._load_index_settings(filepath)
+        apply_search_params(self.vectorstore.index, self.index_settings)
+
+        if ColumnarChunkStore.exists(f"{filepath}_chunks"):
+            self.chunks = ColumnarChunkStore.load(f"{filepath}_chunks", mmap=False)
+            chunk_ids = self.chunks.columns['chunk_id']
+            self.next_chunk_id = int(chunk_ids.max()) + 1 if len(chunk_ids) else 0
+        else:
+            # Stores saved before the columnar format kept a pickled list of dicts.
+            with open(f"{filepath}_chunks.pkl", 'rb') as f:
+                self.chunks = pickle.load(f)
+            for i, chunk in enumerate(self.chunks):
+                chunk.setdefault('chunk_id', i)
+                if 'content_hash' not in chunk:
+                    chunk['content_hash'] = self.content_hash(chunk)
+            self.next_chunk_id = max((chunk['chunk_id'] for chunk in self.chunks), default=-1) + 1
+        self._docstore_from_chunks()
+        self._rebuild_document_map()
+        self._load_bm25(filepath, mmap=False)
 
         print(f"Loaded vector store with {len(self.chunks)} chunks")
 
@@ -114,4 +711,30 @@ if __name__ == "__main__":
     results = store.search("What is Qatar's economic situation?", k=2)
     print(f"\nSearch Results:")
     for result in results:
-        print(f"Rank {result['rank']}: {result['chunk']['content'][:50]}... (Score: {result['score']:.3f})")
\ No newline at end of file
+        print(f"Rank {result['rank']}: {result['chunk']['content'][:50]}... (Score: {result['score']:.3f})")
+
+    base_questions = [
+        "What is Qatar's economic situation?",
+        "How healthy is the banking sector?",
+        "What does the IMF recommend for fiscal policy?",
+        "What is the economic outlook?",
+    ]
+    # Unique queries and empty caches, so both runs embed and search every query.
+    questions = [f"{question} (variant {i})" for i in range(64) for question in base_questions]
+
+    store.search_cache.clear()
+    store.embedding_cache.clear()
+    start = time.perf_counter()
+    for question in questions:
+        store.search(question, k=2)
+    looped = time.perf_counter() - start
+
+    store.search_cache.clear()
+    store.embedding_cache.clear()
+    start = time.perf_counter()
+    store.search_batch(questions, k=2)
+    batched = time.perf_counter() - start
+
+    print(f"\nThroughput over {len(questions)} queries:")
+    print(f"  search loop:  {len(questions) / looped:.1f} queries/s")
+    print(f"  search_batch: {len(questions) / batched:.1f} queries/s ({looped / batched:.1f}x)")